@@ -0,0 +1,162 @@
+"""
+Versioned cache keys with namespace invalidation.
+
+Every cached value belongs to one or more namespaces ('channels', 'stats',
+'groups'). A namespace has a version number stored in the cache itself;
+the version is part of every key, so bumping it makes all old entries
+unreachable at once without scanning or deleting anything.
+
+Versions are bumped by model signals (see parser/signals.py and
+group_channels/signals.py) and by InvalidatingQuerySet on bulk paths
+(update, bulk_create, bulk_update) which do not send signals.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import models, transaction
+
+from config import counters, timing
+
+log = logging.getLogger(__name__)
+
+CHANNELS = 'channels'
+STATS = 'stats'
+GROUPS = 'groups'
+
+# which namespaces are invalidated by a change of a model
+MODEL_NAMESPACES = {
+    'parser.TelegramChannel': (CHANNELS,),
+    'parser.Category': (CHANNELS, GROUPS),
+    'parser.ChannelStats': (STATS,),
+    'group_channels.Group': (GROUPS,),
+    'group_channels.AutoGroupRule': (GROUPS,),
+}
+
+DEFAULT_TIMEOUT = 60 * 60
+# how many hits/misses to collect in process before writing them to the cache
+STATS_FLUSH_EVERY = 100
+# registry of hit/miss counter names in config/counters.py
+STATS_NAMES = 'stats:names'
+
+_local_stats = Counter()
+
+
+def _version_key(namespace):
+    return f'ns:{namespace}:version'
+
+
+def get_versions(*namespaces):
+    """Current versions of namespaces (one round trip)"""
+    keys = {_version_key(ns): ns for ns in namespaces}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, ns in keys.items():
+        version = found.get(key)
+        if version is None:
+            # Version is lost (eviction, cold cache): start from a value
+            # that can't collide with any version used before
+            version = int(time.time() * 1000)
+            cache.add(key, version, timeout=None)
+            version = cache.get(key, version)
+        versions[ns] = version
+    return versions
+
+
+def make_key(namespaces, *parts):
+    """Build a key that changes whenever any of the namespaces is bumped"""
+    versions = get_versions(*namespaces)
+    prefix = '.'.join(f'{ns}{versions[ns]}' for ns in namespaces)
+    return ':'.join([prefix, *map(str, parts)])
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under the namespaces"""
+    for ns in namespaces:
+        key = _version_key(ns)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+    log.debug('Cache namespaces bumped: %s', namespaces)
+
+
+def invalidate_model(model):
+    """Bump namespaces of a model after the current transaction commits"""
+    namespaces = MODEL_NAMESPACES.get(model._meta.label, ())
+    if namespaces:
+        transaction.on_commit(lambda: bump(*namespaces))
+
+
+def get_or_set(namespaces, parts, default, timeout=DEFAULT_TIMEOUT):
+    """
+    Read value by versioned key or compute it with default() and store.
+    Counts hits and misses per first key part for tuning.
+    """
+    key = make_key(namespaces, *parts)
+    value = cache.get(key)
+    name = str(parts[0]) if parts else 'default'
+    if value is None:
+        _count(name, 'miss')
+        value = default()
+        cache.set(key, value, timeout)
+    else:
+        _count(name, 'hit')
+    return value
+
+
+def _count(name, kind):
+    timing.count_cache(kind)
+    _local_stats[f'{name}:{kind}'] += 1
+    if _local_stats.total() >= STATS_FLUSH_EVERY:
+        flush_stats()
+
+
+def flush_stats():
+    """Write hit/miss counters of this process to the shared cache"""
+    pending = dict(_local_stats)
+    _local_stats.clear()
+    counters.add({f'stats:{name}': value for name, value in pending.items()})
+    counters.register(STATS_NAMES, sorted(pending))
+
+
+def get_stats():
+    """Hit/miss counters of all processes: {name: {'hit': n, 'miss': n}}"""
+    flush_stats()
+    names = counters.names(STATS_NAMES)
+    values = cache.get_many([f'stats:{name}' for name in names])
+    stats = {}
+    for name in names:
+        entry, kind = name.rsplit(':', 1)
+        counts = stats.setdefault(entry, {'hit': 0, 'miss': 0})
+        counts[kind] = values.get(f'stats:{name}', 0)
+    return stats
+
+
+def reset_stats():
+    _local_stats.clear()
+    names = counters.clear(STATS_NAMES)
+    cache.delete_many([f'stats:{name}' for name in names])
+
+
+class InvalidatingQuerySet(models.QuerySet):
+    """QuerySet that bumps cache namespaces on bulk writes which skip signals"""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            invalidate_model(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            invalidate_model(self.model)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            invalidate_model(self.model)
+        return rows
@@ -1,5 +1,7 @@
 from django.conf import settings
 
+from config.users.roles import request_role
+
 
 def user_role(request):
     """
@@ -9,15 +11,8 @@ def user_role(request):
     - is_authenticated: булево значение
     - is_partner: булево значение (только для авторизованных)
     """
-    role = getattr(request, 'role', None)
-
-    if role is None:
-        # Если роль еще не определена, вычисляем ее
-        if not request.user.is_authenticated:
-            role = 'guest'
-        else:
-            role = 'partner' if getattr(request.user, 'is_partner', False) else 'user'
-        request.role = role  # Кэшируем роль в запросе
+    # Роль уже посчитана RoleMiddleware или берётся из кэша
+    role = request_role(request)
 
     context = {
         'user_role': role,
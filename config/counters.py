@@ -0,0 +1,80 @@
+"""
+Counters shared by all processes through the cache.
+
+Web workers, Celery children and management commands count in memory and
+add the totals to the cache (Redis in production) in batches with add().
+Readers also need the names of the counters, which the Django cache
+cannot list, so register() keeps them in a registry: a key per name
+claimed with cache.add and numbered slots handed out by cache.incr. Each
+step is one atomic cache operation, so concurrent flushes never drop each
+other's names, as a read-modify-write of a shared list would.
+"""
+from django.core.cache import cache
+
+
+def add(values, timeout=None):
+    """Прибавить {ключ: число} к общим счётчикам, создавая недостающие"""
+    for key, value in values.items():
+        if not value:
+            continue
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, timeout=timeout):
+                cache.incr(key, value)
+
+
+def _size_key(registry):
+    return f'{registry}:size'
+
+
+def _name_key(registry, name):
+    return f'{registry}:name:{name}'
+
+
+def _slot_key(registry, slot):
+    return f'{registry}:slot:{slot}'
+
+
+def register(registry, names, timeout=None):
+    """Добавить имена в реестр; уже известные пропускаются"""
+    for name in names:
+        if not cache.add(_name_key(registry, name), 1, timeout=timeout):
+            continue
+        cache.add(_size_key(registry), 0, timeout=timeout)
+        slot = cache.incr(_size_key(registry))
+        cache.set(_slot_key(registry, slot), name, timeout=timeout)
+
+
+def names_many(registries):
+    """{реестр: имена в порядке регистрации} за два обращения к кэшу"""
+    sizes = cache.get_many([_size_key(r) for r in registries])
+    slots = {
+        registry: [
+            _slot_key(registry, slot)
+            for slot in range(1, sizes.get(_size_key(registry), 0) + 1)
+        ]
+        for registry in registries
+    }
+    found = cache.get_many([key for keys in slots.values() for key in keys])
+    # слот может быть ещё не записан, если имя регистрируется прямо сейчас
+    return {
+        registry: [found[key] for key in keys if key in found]
+        for registry, keys in slots.items()
+    }
+
+
+def names(registry):
+    return names_many([registry])[registry]
+
+
+def clear(registry):
+    """Удалить реестр; возвращает имена, которые в нём были"""
+    registered = names(registry)
+    size = cache.get(_size_key(registry)) or 0
+    cache.delete_many([
+        _size_key(registry),
+        *(_slot_key(registry, slot) for slot in range(1, size + 1)),
+        *(_name_key(registry, name) for name in registered),
+    ])
+    return registered
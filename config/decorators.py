@@ -3,6 +3,8 @@ from django.http import HttpResponseForbidden, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
 
+from config.users.roles import get_flags, request_role
+
 
 def role_required(allowed_roles, login_url=None, message=None):
     """
@@ -17,8 +19,7 @@ def role_required(allowed_roles, login_url=None, message=None):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             # Определяем роль пользователя
-            if not hasattr(request, 'role'):
-                request.role = get_user_role(request)
+            request_role(request)
 
             # Проверяем доступ
             if request.role in allowed_roles:
@@ -33,14 +34,8 @@ def role_required(allowed_roles, login_url=None, message=None):
 
 
 def get_user_role(request):
-    """Динамически определяем роль пользователя"""
-    if not request.user.is_authenticated:
-        return 'guest'
-    if hasattr(request.user, 'is_partner') and request.user.is_partner:
-        return 'partner'
-    if hasattr(request.user, 'is_channel_moderator') and request.user.is_channel_moderator:
-        return 'channel_moderator'
-    return 'user'
+    """Роль пользователя из общего кэша ролей"""
+    return request_role(request)
 
 
 def handle_access_denied(request, current_role, allowed_roles, login_url=None, message=None):
@@ -113,7 +108,7 @@ def partner_required(view_func=None, login_url=None, message=None):
                 return HttpResponseRedirect(login_url or reverse('login'))
 
             # Затем проверяем партнерский статус
-            if not getattr(request.user, 'is_partner', False):
+            if not get_flags(request.user)['is_partner']:
                 messages.error(request, message or "Доступ только для партнеров")
                 return HttpResponseForbidden("Доступ только для партнеров")
 
@@ -141,7 +136,7 @@ def channel_moderator_required(view_func=None, login_url=None, message=None):
                 return HttpResponseRedirect(login_url or reverse('login'))
 
             # Затем проверяем статус модератора канала
-            if not getattr(request.user, 'is_channel_moderator', False):
+            if not get_flags(request.user)['is_channel_moderator']:
                 messages.error(request, message or "Доступ только для модераторов каналов")
                 return HttpResponseForbidden("Доступ только для модераторов каналов")
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Group, AutoGroupRule
+from .models import AutoGroupRule, Group
 
 # Register your models here.
 
@@ -13,7 +13,7 @@ class AutoGroupRule(admin.StackedInline):
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('name', 'is_editorial', 'order', 'owner')
+    list_display = ('name', 'is_editorial', 'order', 'owner', 'channel_count')
     list_filter = ('is_editorial',)
     search_fields = ('name', 'description')
     ordering = ('order', 'name')
@@ -23,4 +23,4 @@ class GroupAdmin(admin.ModelAdmin):
         ro = super().get_readonly_fields(request, obj) or []
         if obj and hasattr(obj, 'auto_rule'):
             return tuple(set(ro) | {'channels'})
-        return ro
\ No newline at end of file
+        return ro
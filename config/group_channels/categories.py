@@ -0,0 +1,174 @@
+"""
+Sync of auto groups (Group + AutoGroupRule) with the list of categories.
+
+The sync is set-based: existing groups and rules are read with one query
+each, the difference is computed in memory and applied with bulk_create /
+bulk_update. Planning only reads, so a dry run never opens a write
+transaction.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.text import slugify
+from unidecode import unidecode
+
+from config.parser.models import Category
+
+from .models import AutoGroupRule, Group
+from .services import BATCH_SIZE, materialize_rules, refresh_category_counts
+
+START_ORDER = 10
+ORDER_STEP = 10
+SLUG_LENGTH = Group._meta.get_field("slug").max_length
+
+
+def categories_from_table():
+    """Весь справочник категорий"""
+    return list(Category.objects.all())
+
+
+def categories_from_db():
+    """Категории, которые реально встречаются у каналов"""
+    return list(Category.objects.filter(channels__isnull=False).distinct())
+
+
+def default_owner():
+    """Владелец новых автоподборок: первый суперпользователь или пользователь"""
+    User = get_user_model()
+    return (
+        User.objects.filter(is_superuser=True).first()
+        or User.objects.first()
+    )
+
+
+def _with_suffix(base, number):
+    if number == 1:
+        return base[:SLUG_LENGTH]
+    suffix = f"-{number}"
+    return base[:SLUG_LENGTH - len(suffix)] + suffix
+
+
+def unique_slugs(names):
+    """
+    Слаги новых групп: slugify(unidecode(name)), а если он занят другой
+    группой или соседом по пачке (разные названия дают один слаг:
+    «Кино» и «Kino»), то с суффиксом -2, -3, ... Занятые слаги читаются
+    запросом на каждый круг, кругов столько, сколько совпадений подряд.
+    """
+    bases = [slugify(unidecode(name)) or "group" for name in names]
+    numbers = [1] * len(bases)
+    slugs = [None] * len(bases)
+    taken = set()
+    pending = range(len(bases))
+    while pending:
+        candidates = {i: _with_suffix(bases[i], numbers[i]) for i in pending}
+        taken.update(
+            Group.objects.filter(slug__in=set(candidates.values()))
+            .values_list("slug", flat=True)
+        )
+        retry = []
+        for i in pending:
+            if candidates[i] in taken:
+                numbers[i] += 1
+                retry.append(i)
+            else:
+                taken.add(candidates[i])
+                slugs[i] = candidates[i]
+        pending = retry
+    return slugs
+
+
+def plan_sync(categories, start_order=START_ORDER, order_step=ORDER_STEP):
+    """
+    План синхронизации без записи в БД. Группа категории ищется по имени:
+    new_groups — [(категория, order)] групп, которых нет;
+    new_rules — категории, у групп которых нет правила (включая новые);
+    fix_rules — правила с исправленной (ещё не сохранённой) категорией.
+    """
+    categories = list(categories)
+    groups = dict(
+        Group.objects.filter(name__in=[cat.name for cat in categories])
+        .values_list("name", "pk")
+    )
+    rules = {
+        rule.group_id: rule
+        for rule in AutoGroupRule.objects.filter(group_id__in=groups.values())
+        .only("id", "group_id", "category")
+    }
+
+    new_groups, new_rules, fix_rules = [], [], []
+    order = start_order
+    for cat in categories:
+        if cat.name not in groups:
+            new_groups.append((cat, order))
+            order += order_step
+            new_rules.append(cat)
+            continue
+        rule = rules.get(groups[cat.name])
+        if rule is None:
+            new_rules.append(cat)
+        elif rule.category_id != cat.pk:
+            rule.category_id = cat.pk
+            fix_rules.append(rule)
+
+    return {
+        "categories": categories,
+        "groups": groups,
+        "new_groups": new_groups,
+        "new_rules": new_rules,
+        "fix_rules": fix_rules,
+    }
+
+
+def apply_sync(plan, owner):
+    """
+    Применить план пачками в одной транзакции. bulk-операции не шлют
+    post_save, поэтому автоподборки затронутых категорий материализуются
+    и пересчитываются здесь же.
+    """
+    groups = dict(plan["groups"])
+    with transaction.atomic():
+        slugs = unique_slugs([cat.name for cat, _ in plan["new_groups"]])
+        Group.objects.bulk_create(
+            [
+                Group(
+                    name=cat.name,
+                    slug=slug,
+                    owner=owner,
+                    is_editorial=False,
+                    order=order,
+                )
+                for (cat, order), slug in zip(plan["new_groups"], slugs)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        if plan["new_groups"]:
+            # pk после bulk_create возвращают не все бэкенды
+            groups.update(
+                Group.objects
+                .filter(name__in=[cat.name for cat, _ in plan["new_groups"]])
+                .values_list("name", "pk")
+            )
+        AutoGroupRule.objects.bulk_create(
+            [
+                AutoGroupRule(group_id=groups[cat.name], category_id=cat.pk)
+                for cat in plan["new_rules"]
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        AutoGroupRule.objects.bulk_update(
+            plan["fix_rules"], ["category"], batch_size=BATCH_SIZE
+        )
+
+        touched = (
+            {cat.pk for cat in plan["new_rules"]}
+            | {rule.category_id for rule in plan["fix_rules"]}
+        )
+        if touched:
+            materialize_rules(touched)
+            refresh_category_counts(touched)
+
+    return {
+        "created_groups": len(plan["new_groups"]),
+        "created_rules": len(plan["new_rules"]),
+        "updated_rules": len(plan["fix_rules"]),
+    }
@@ -1,5 +1,6 @@
 from django import forms
 
+from config.media import ImageRefField
 from config.parser.models import TelegramChannel
 
 # from config.channel.models import Channel
@@ -32,7 +33,7 @@ class CreateGroupForm(forms.ModelForm):
             }
         )
     )
-    image_url = forms.CharField(
+    image_url = ImageRefField(
         required=False,
         label='Изображение (URL)',
         widget=forms.URLInput(
@@ -76,12 +77,14 @@ class UpdateGroupForm(forms.ModelForm):
             }
         )
     )
-    image_url = forms.CharField(
+    image_url = ImageRefField(
         required=False,
         label='Изображение (URL)',
-        widget=forms.URLInput(
+        # не URLInput: адрес файла хранилища может быть относительным
+        widget=forms.TextInput(
             attrs={
                 'id': 'editGroupImage',
+                'inputmode': 'url',
                 'placeholder': 'https://example.com/image.jpg',
                 'class': 'form-control',
                 'name': 'image_url',
@@ -94,7 +97,7 @@ class UpdateGroupForm(forms.ModelForm):
         fields = ('name', 'description', 'image_url',)
 
 
-class AddChannelForm(forms.ModelForm):
+class AddChannelForm(forms.Form):
     channels = forms.ModelMultipleChoiceField(
         queryset=TelegramChannel.objects.none(),
         label='Добавить каналы',
@@ -107,19 +110,18 @@ class AddChannelForm(forms.ModelForm):
             }
         ),
         required=True,
-        help_text='Удерживайте Ctrl/Cmd, чтобы выбрать несколько',
+        help_text='Начните вводить username или название канала',
     )
 
-    class Meta:
-        model = Group
-        fields = ('channels',)
-
     def __init__(self, *args, channel_qs=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['channels'].queryset = (
-            channel_qs if channel_qs is not None
-            else TelegramChannel.objects.all()
-        )
+        # Варианты подгружаются поиском, поэтому пустая форма не рендерит
+        # каталог; при отправке проверяются только присланные id
+        if self.is_bound:
+            self.fields['channels'].queryset = (
+                channel_qs if channel_qs is not None
+                else TelegramChannel.objects.resolved()
+            )
 
     def clean_channels(self):
         data = self.cleaned_data['channels']
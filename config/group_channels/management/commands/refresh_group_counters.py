@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from config.group_channels.services import (
+    materialize_rules,
+    refresh_category_counts,
+    refresh_group_counts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Материализует автоподборки (materialize=True) и пересчитывает\n"
+        "Group.channel_count для всех подборок.\n"
+        "Ручные подборки — одним UPDATE по таблице связей, "
+        "автоподборки — одним GROUP BY по категориям каналов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip-materialize",
+            action="store_true",
+            help="Только пересчитать счётчики, не трогая M2M автоподборок.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["skip_materialize"]:
+            added, removed = materialize_rules()
+            self.stdout.write(
+                f"Автоподборки: добавлено связей {added} | удалено {removed}"
+            )
+        with transaction.atomic():
+            manual = refresh_group_counts()
+            auto = refresh_category_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Ручных подборок пересчитано: {manual} | "
+            f"автоподборок изменено: {auto}"
+        ))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_channel_count(apps, schema_editor):
+    Group = apps.get_model('group_channels', 'Group')
+    AutoGroupRule = apps.get_model('group_channels', 'AutoGroupRule')
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+    through = Group.channels.through
+
+    counts = dict(
+        through.objects.values('group_id').annotate(cnt=Count('id'))
+        .order_by().values_list('group_id', 'cnt')
+    )
+    category_counts = dict(
+        TelegramChannel.objects.values('category').annotate(cnt=Count('id'))
+        .order_by().values_list('category', 'cnt')
+    )
+    for rule in AutoGroupRule.objects.all():
+        counts[rule.group_id] = category_counts.get(rule.category, 0)
+
+    groups = list(Group.objects.filter(pk__in=counts))
+    for group in groups:
+        group.channel_count = counts[group.pk]
+    Group.objects.bulk_update(groups, ['channel_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group_channels', '0005_group_updated_at'),
+        ('parser', '0003_alter_telegramchannel_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='channel_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество каналов'),
+        ),
+        migrations.RunPython(fill_channel_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_rule_categories(apps, schema_editor):
+    Category = apps.get_model('parser', 'Category')
+    AutoGroupRule = apps.get_model('group_channels', 'AutoGroupRule')
+
+    names = {name.strip() for name in AutoGroupRule.objects.values_list('category', flat=True)}
+    Category.objects.bulk_create(
+        [Category(name=name, order=1000) for name in sorted(names - {''})],
+        ignore_conflicts=True,
+    )
+    ids = dict(Category.objects.values_list('name', 'pk'))
+    for rule in AutoGroupRule.objects.all():
+        name = rule.category.strip()
+        if not name:
+            # Правило без категории ничего не отбирает
+            rule.delete()
+            continue
+        rule.category_ref_id = ids[name]
+        rule.save(update_fields=['category_ref'])
+
+
+def fill_rule_category_names(apps, schema_editor):
+    AutoGroupRule = apps.get_model('group_channels', 'AutoGroupRule')
+    for rule in AutoGroupRule.objects.select_related('category_ref'):
+        rule.category = rule.category_ref.name
+        rule.save(update_fields=['category'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group_channels', '0006_group_channel_count'),
+        ('parser', '0006_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='autogrouprule',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='auto_rules', to='parser.category', verbose_name='Категория'),
+        ),
+        # nullable, чтобы откат мог вернуть колонку до заполнения названиями
+        migrations.AlterField(
+            model_name='autogrouprule',
+            name='category',
+            field=models.CharField(max_length=255, null=True, verbose_name='Категория'),
+        ),
+        migrations.RunPython(fill_rule_categories, fill_rule_category_names),
+        migrations.RemoveField(
+            model_name='autogrouprule',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='autogrouprule',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='autogrouprule',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='auto_rules', to='parser.category', verbose_name='Категория'),
+        ),
+    ]
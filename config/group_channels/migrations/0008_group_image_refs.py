@@ -0,0 +1,86 @@
+import base64
+import binascii
+import hashlib
+import re
+
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Копия нужной части config.media на момент миграции: будущие правки
+# модуля не должны менять то, что делает уже выпущенная миграция
+DATA_URI_RE = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.S)
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+DEFAULT_IMAGES = (
+    'users/img/default-avatar.png',
+    'group_channels/img/default-cover.jpg',
+)
+
+
+def default_digests():
+    digests = set()
+    for name in DEFAULT_IMAGES:
+        path = finders.find(name)
+        if path:
+            with open(path, 'rb') as f:
+                digests.add(hashlib.sha256(f.read()).hexdigest())
+    return digests
+
+
+def store_data_uri(value, defaults):
+    """Ссылка '<sha256>.<ext>' вместо data: URI; остальное как есть"""
+    match = DATA_URI_RE.match(value or '')
+    if not match or match.group(1) not in EXTENSIONS:
+        return value
+    try:
+        payload = re.sub(r'\s+', '', match.group(2))
+        content = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return value
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in defaults:
+        return ''
+    ref = f'{digest}.{EXTENSIONS[match.group(1)]}'
+    path = f'{ref[:2]}/{ref[2:4]}/{ref}'
+    storage = storages['media']
+    if not storage.exists(path):
+        storage.save(path, ContentFile(content))
+    return ref
+
+
+def store_covers(apps, schema_editor):
+    """data: URI обложек -> ссылки на файлы хранилища"""
+    Group = apps.get_model('group_channels', 'Group')
+    defaults = default_digests()
+    changed = []
+    groups = (
+        Group.objects.filter(image_url__startswith='data:')
+        .only('id', 'image_url')
+    )
+    for group in groups.iterator(chunk_size=BATCH_SIZE):
+        group.image_url = store_data_uri(group.image_url, defaults)
+        changed.append(group)
+        if len(changed) >= BATCH_SIZE:
+            Group.objects.bulk_update(changed, ['image_url'])
+            changed = []
+    Group.objects.bulk_update(changed, ['image_url'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group_channels', '0007_autogrouprule_category_fk'),
+    ]
+
+    operations = [
+        # Ссылки остаются рабочими и после отката, см. config.media.url
+        migrations.RunPython(store_covers, migrations.RunPython.noop),
+    ]
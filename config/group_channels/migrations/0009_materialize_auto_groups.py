@@ -0,0 +1,74 @@
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def materialize(apps, schema_editor):
+    """
+    Заполнить M2M автоподборок с materialize=True и пересчитать
+    channel_count всех подборок: страница группы читает состав из M2M
+    сразу после деплоя, не дожидаясь ночной задачи.
+    Логика services.materialize_rules / refresh_*_counts, скопированная
+    сюда, чтобы миграция не зависела от будущих правок сервисов.
+    """
+    Group = apps.get_model('group_channels', 'Group')
+    AutoGroupRule = apps.get_model('group_channels', 'AutoGroupRule')
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+    through = Group.channels.through
+
+    rules = AutoGroupRule.objects.values_list(
+        'group_id', 'category_id', 'materialize'
+    )
+    for group_id, category_id, materialize in rules:
+        wanted = set(
+            TelegramChannel.objects
+            .filter(category_id=category_id, channel_id__isnull=False)
+            .values_list('pk', flat=True)
+        )
+        if materialize:
+            current = set(
+                through.objects.filter(group_id=group_id)
+                .values_list('telegramchannel_id', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(group_id=group_id, telegramchannel_id=pk)
+                 for pk in wanted - current],
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            extra = list(current - wanted)
+            for start in range(0, len(extra), BATCH_SIZE):
+                through.objects.filter(
+                    group_id=group_id,
+                    telegramchannel_id__in=extra[start:start + BATCH_SIZE],
+                ).delete()
+        Group.objects.filter(pk=group_id).update(channel_count=len(wanted))
+
+    counts = dict(
+        through.objects.filter(group__auto_rule__isnull=True)
+        .values('group_id').annotate(cnt=Count('id')).order_by()
+        .values_list('group_id', 'cnt')
+    )
+    changed = []
+    for group in Group.objects.filter(auto_rule__isnull=True).only(
+        'id', 'channel_count'
+    ):
+        count = counts.get(group.pk, 0)
+        if group.channel_count != count:
+            group.channel_count = count
+            changed.append(group)
+    Group.objects.bulk_update(changed, ['channel_count'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group_channels', '0008_group_image_refs'),
+        ('parser', '0007_telegramchannel_photo'),
+    ]
+
+    operations = [
+        # M2M материализованных подборок остаётся и после отката
+        migrations.RunPython(materialize, migrations.RunPython.noop),
+    ]
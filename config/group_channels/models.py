@@ -2,6 +2,8 @@ from django.db import models
 from django.utils.text import slugify
 from unidecode import unidecode
 
+from config import media
+from config.cache import InvalidatingQuerySet
 from config.users.models import User
 
 
@@ -44,6 +46,12 @@ class Group(models.Model):
         blank=True,
         related_name='groups',
     )
+    channel_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество каналов',
+    )
+    # URL или ссылка на файл в хранилище (config/media.py)
     image_url = models.CharField(
         blank=True,
         verbose_name='обложка группы',
@@ -52,6 +60,12 @@ class Group(models.Model):
         auto_now_add=True,
         verbose_name='Создана',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменена',
+    )
+
+    objects = InvalidatingQuerySet.as_manager()
 
     class Meta:
         db_table = 'groups'
@@ -66,6 +80,10 @@ class Group(models.Model):
             self.slug = slugify(unidecode(self.name))
         super().save(*args, **kwargs)
 
+    @property
+    def cover_url(self):
+        return media.url(self.image_url, media.COVER)
+
 class AutoGroupRule(models.Model):
     group = models.OneToOneField(
         Group,
@@ -74,9 +92,11 @@ class AutoGroupRule(models.Model):
         verbose_name='Группа'
     )
 
-    category = models.CharField(
-        max_length=255,
-        verbose_name='Категория'
+    category = models.ForeignKey(
+        'parser.Category',
+        on_delete=models.PROTECT,
+        related_name='auto_rules',
+        verbose_name='Категория',
     )
 
     materialize = models.BooleanField(
@@ -84,6 +104,7 @@ class AutoGroupRule(models.Model):
         verbose_name='Материализовать в M2M',
     )
 
+    objects = InvalidatingQuerySet.as_manager()
 
     class Meta:
         db_table = 'auto_group_rules'
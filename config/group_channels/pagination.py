@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination of group channels.
+
+Pages are selected with WHERE (value, id) < (cursor value, cursor id)
+instead of OFFSET, so the cost of a page doesn't grow with its number.
+Orderings are backed by the (field DESC, id DESC) indexes of
+TelegramChannel.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+SORTS = {
+    'subscribers': 'participants_count',
+    'growth': 'daily_growth',
+}
+DEFAULT_SORT = 'subscribers'
+
+# only what the group page shows
+CHANNEL_FIELDS = ('id', 'username', 'participants_count', 'daily_growth')
+
+
+def get_sort(value):
+    return value if value in SORTS else DEFAULT_SORT
+
+
+def encode_cursor(row, sort):
+    raw = json.dumps([row[SORTS[sort]], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Cursor -> (value, id) or None if it is missing or broken"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(value, int) or not isinstance(pk, int):
+        return None
+    return value, pk
+
+
+def channel_page(channels, sort=DEFAULT_SORT, cursor=None, size=PAGE_SIZE):
+    """
+    One page of channels as dicts with CHANNEL_FIELDS.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    sort = get_sort(sort)
+    field = SORTS[sort]
+    qs = channels.order_by(f'-{field}', '-id')
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        qs = qs.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        )
+
+    # one extra row tells whether there is a next page
+    rows = list(qs.values(*CHANNEL_FIELDS)[:size + 1])
+    next_cursor = (
+        encode_cursor(rows[size - 1], sort) if len(rows) > size else None
+    )
+    return rows[:size], next_cursor
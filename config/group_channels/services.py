@@ -0,0 +1,233 @@
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from config.cache import invalidate_model
+from config.parser.models import TelegramChannel
+
+from .models import AutoGroupRule, Group
+
+BATCH_SIZE = 1000
+SEARCH_LIMIT = 20
+ASSIGN_CHUNK_SIZE = 5000
+
+
+def refresh_group_counts(group_ids=None):
+    """
+    Пересчитать channel_count ручных подборок по таблице связей.
+    Один UPDATE с подзапросом; без group_ids пересчитываются все.
+    """
+    through = Group.channels.through
+    members = (
+        through.objects
+        .filter(group_id=OuterRef('pk'))
+        .order_by()
+        .values('group_id')
+        .annotate(cnt=Count('id'))
+        .values('cnt')
+    )
+    groups = Group.objects.filter(auto_rule__isnull=True)
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+    return groups.update(channel_count=Coalesce(Subquery(members), 0))
+
+
+def refresh_category_counts(categories=None):
+    """
+    Пересчитать channel_count автоподборок по категориям каналов.
+    categories — id категорий; без них пересчитываются все автоподборки.
+    """
+    rules = AutoGroupRule.objects.select_related('group')
+    counts = TelegramChannel.objects.resolved().exclude(category__isnull=True)
+    if categories is not None:
+        categories = [c for c in categories if c]
+        if not categories:
+            return 0
+        rules = rules.filter(category_id__in=categories)
+        counts = counts.filter(category_id__in=categories)
+
+    counts_map = dict(
+        counts.values('category_id').annotate(cnt=Count('id')).order_by()
+        .values_list('category_id', 'cnt')
+    )
+    changed = []
+    for rule in rules:
+        count = counts_map.get(rule.category_id, 0)
+        if rule.group.channel_count != count:
+            rule.group.channel_count = count
+            changed.append(rule.group)
+    Group.objects.bulk_update(changed, ['channel_count'], batch_size=BATCH_SIZE)
+    return len(changed)
+
+
+def group_channels(group):
+    """
+    Каналы подборки. Материализованные автоподборки читаются из M2M,
+    как и ручные; остальные автоподборки — фильтром по категории.
+    """
+    if hasattr(group, 'auto_rule') and not group.auto_rule.materialize:
+        return TelegramChannel.objects.resolved().filter(
+            category_id=group.auto_rule.category_id
+        )
+    return group.channels.all()
+
+
+def free_channels(group):
+    """Каналы, которых ещё нет в подборке (NOT EXISTS вместо anti-join)"""
+    through = Group.channels.through
+    members = through.objects.filter(
+        group_id=group.pk, telegramchannel_id=OuterRef('pk')
+    )
+    return TelegramChannel.objects.resolved().filter(~Exists(members))
+
+
+def search_free_channels(group, query, limit=SEARCH_LIMIT):
+    """
+    Не больше limit каналов вне подборки по префиксу username/названия.
+    На PostgreSQL префиксы идут по индексам UPPER(col) text_pattern_ops
+    (parser/migrations/0009).
+    """
+    query = (query or '').strip().lstrip('@')
+    if not query:
+        return []
+    return list(
+        free_channels(group)
+        .filter(Q(username__istartswith=query) | Q(title__istartswith=query))
+        .order_by('-participants_count', '-id')
+        .values('id', 'username', 'title', 'participants_count')[:limit]
+    )
+
+
+def add_channels_bulk(group, channel_ids=None, filters=None,
+                      chunk_size=ASSIGN_CHUNK_SIZE):
+    """
+    Массовое добавление каналов в ручную подборку.
+    Каналы задаются списком id или сохранённым фильтром (dict lookup'ов
+    TelegramChannel, например {'category__name': 'Спорт', 'language': 'ru'}).
+    Строки таблицы связей пишутся bulk_create(ignore_conflicts=True)
+    пачками, счётчик подборки пересчитывается один раз в конце.
+    Возвращает количество реально добавленных каналов.
+    """
+    if hasattr(group, 'auto_rule'):
+        raise ValueError('Состав автоподборки задаётся правилом')
+    if channel_ids is None and filters is None:
+        raise ValueError('Нужно передать channel_ids или filters')
+
+    through = Group.channels.through
+    if filters is not None:
+        ids = (
+            TelegramChannel.objects.resolved().filter(**filters)
+            .values_list('pk', flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+    else:
+        ids = channel_ids
+
+    added = 0
+    with transaction.atomic():
+        for chunk in _chunks(ids, chunk_size):
+            # Уже связанные каналы, заготовки импорта и несуществующие id
+            # не вставляем и не считаем
+            new = list(
+                free_channels(group).filter(pk__in=chunk)
+                .values_list('pk', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(group_id=group.pk, telegramchannel_id=pk)
+                 for pk in new],
+                batch_size=chunk_size,
+                ignore_conflicts=True,
+            )
+            added += len(new)
+        refresh_group_counts([group.pk])
+    invalidate_model(Group)
+    group.refresh_from_db(fields=['channel_count'])
+    return added
+
+
+def _chunks(items, size=BATCH_SIZE):
+    """Разбить итерируемое (в т.ч. генератор) на списки по size"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def materialize_rules(categories=None):
+    """
+    Синхронизировать M2M автоподборок с materialize=True с категориями
+    (categories — id категорий, без них — все правила).
+    Состав считается разностью множеств: в таблицу связей пишутся только
+    недостающие строки и удаляются только лишние, пачками.
+    Возвращает (добавлено, удалено).
+    """
+    through = Group.channels.through
+    rules = AutoGroupRule.objects.filter(materialize=True)
+    if categories is not None:
+        rules = rules.filter(category_id__in=[c for c in categories if c])
+
+    added = removed = 0
+    for group_id, category in rules.values_list('group_id', 'category_id'):
+        wanted = set(
+            TelegramChannel.objects.resolved().filter(category_id=category)
+            .values_list('pk', flat=True)
+        )
+        current = set(
+            through.objects.filter(group_id=group_id)
+            .values_list('telegramchannel_id', flat=True)
+        )
+        to_add = wanted - current
+        to_remove = current - wanted
+        with transaction.atomic():
+            through.objects.bulk_create(
+                [through(group_id=group_id, telegramchannel_id=pk)
+                 for pk in to_add],
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            for chunk in _chunks(to_remove):
+                through.objects.filter(
+                    group_id=group_id, telegramchannel_id__in=chunk
+                ).delete()
+        added += len(to_add)
+        removed += len(to_remove)
+
+    if added or removed:
+        invalidate_model(Group)
+    return added, removed
+
+
+def materialize_channel(channel_id, old_category, new_category):
+    """
+    Перенести один канал между материализованными автоподборками
+    после смены его категории (id; без полного пересчёта категорий).
+    """
+    categories = [c for c in (old_category, new_category) if c]
+    if not categories:
+        return
+    through = Group.channels.through
+    rules = (
+        AutoGroupRule.objects
+        .filter(materialize=True, category_id__in=categories)
+        .values_list('group_id', 'category_id')
+    )
+    add_to, remove_from = [], []
+    for group_id, category in rules:
+        (add_to if category == new_category else remove_from).append(group_id)
+
+    if remove_from:
+        through.objects.filter(
+            telegramchannel_id=channel_id, group_id__in=remove_from
+        ).delete()
+    if add_to:
+        through.objects.bulk_create(
+            [through(group_id=gid, telegramchannel_id=channel_id)
+             for gid in add_to],
+            ignore_conflicts=True,
+        )
+    if add_to or remove_from:
+        invalidate_model(Group)
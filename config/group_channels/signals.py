@@ -0,0 +1,87 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from config.cache import invalidate_model
+from config.parser.models import TelegramChannel
+
+from .models import AutoGroupRule, Group
+from .services import (
+    materialize_channel,
+    materialize_rules,
+    refresh_category_counts,
+    refresh_group_counts,
+)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=AutoGroupRule)
+@receiver(post_delete, sender=AutoGroupRule)
+def invalidate_group_cache(sender, **kwargs):
+    """Drop cached group pages and category counts"""
+    invalidate_model(sender)
+
+
+@receiver(m2m_changed, sender=Group.channels.through)
+def update_group_channels(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддерживаем channel_count ручных подборок при изменении состава"""
+    if action == 'pre_clear' and reverse:
+        # После clear() со стороны канала список групп уже не получить
+        instance._cleared_group_ids = list(
+            instance.groups.values_list('pk', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        group_ids = [instance.pk]
+    elif action == 'post_clear':
+        group_ids = getattr(instance, '_cleared_group_ids', [])
+    else:
+        group_ids = pk_set or []
+    if group_ids:
+        refresh_group_counts(group_ids)
+    invalidate_model(Group)
+
+
+@receiver(post_save, sender=AutoGroupRule)
+def update_rule_channels(sender, instance, **kwargs):
+    if instance.materialize:
+        materialize_rules([instance.category_id])
+    refresh_category_counts([instance.category_id])
+
+
+@receiver(post_save, sender=TelegramChannel)
+def update_category_counts(sender, instance, created, **kwargs):
+    """
+    Автоподборки меняются только при смене категории канала или когда
+    заготовку импорта нашли в Telegram: заготовки в подборки не входят
+    """
+    old = getattr(instance, '_loaded_category', None)
+    if not getattr(instance, '_loaded_resolved', True):
+        old = None
+    new = instance.category_id if instance.channel_id is not None else None
+    if created or old != new:
+        materialize_channel(instance.pk, old, new)
+        refresh_category_counts({old, new})
+        instance._loaded_category = instance.category_id
+        instance._loaded_resolved = instance.channel_id is not None
+
+
+@receiver(pre_delete, sender=TelegramChannel)
+def remember_channel_groups(sender, instance, **kwargs):
+    # Каскадное удаление связей не отправляет m2m_changed
+    instance._group_ids = list(instance.groups.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=TelegramChannel)
+def update_counts_on_channel_delete(sender, instance, **kwargs):
+    refresh_category_counts([instance.category_id])
+    if getattr(instance, '_group_ids', None):
+        refresh_group_counts(instance._group_ids)
@@ -0,0 +1,37 @@
+import logging
+
+from celery import shared_task
+
+from . import categories as category_sync
+from .services import materialize_rules, refresh_category_counts
+
+log = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_auto_groups(categories=None):
+    """Celery task: sync materialized auto groups and their counters"""
+    added, removed = materialize_rules(categories)
+    changed = refresh_category_counts(categories)
+    log.info(
+        "Auto groups refreshed: +%s/-%s links, %s counters changed",
+        added, removed, changed,
+    )
+
+
+@shared_task
+def sync_categories():
+    """Celery task: create auto groups for new categories found in the DB"""
+    plan = category_sync.plan_sync(category_sync.categories_from_db())
+    if not (plan["new_groups"] or plan["new_rules"] or plan["fix_rules"]):
+        return
+    owner = category_sync.default_owner()
+    if plan["new_groups"] and owner is None:
+        log.warning("Category sync skipped: there is no user to own new groups")
+        return
+    result = category_sync.apply_sync(plan, owner)
+    log.info(
+        "Categories synced: %(created_groups)s groups, %(created_rules)s rules "
+        "created, %(updated_rules)s rules updated",
+        result,
+    )
@@ -2,8 +2,10 @@ from django.urls import path
 
 from config.group_channels.views import (
     AddChannelsView,
+    ChannelSearchView,
     CreateGroupView,
     DeleteGroupView,
+    GroupChannelsView,
     GroupDetailView,
     UpdateGroupView,
 )
@@ -15,5 +17,9 @@ urlpatterns = [
     path('<slug:slug>/update/',        UpdateGroupView.as_view(),  name='group_update'),
     path('<slug:slug>/delete/',        DeleteGroupView.as_view(),  name='group_delete'),
     path('<slug:slug>/add-channels/',  AddChannelsView.as_view(),  name='group_add_channels'),
+    path('<slug:slug>/channel-search/', ChannelSearchView.as_view(),
+         name='group_channel_search'),
+    path('<slug:slug>/channels/',      GroupChannelsView.as_view(),
+         name='group_channels_page'),
     path('<slug:slug>/',               GroupDetailView.as_view(),  name='group_detail'),
 ]
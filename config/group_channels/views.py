@@ -1,13 +1,23 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import Count, Max
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.generic.base import View
 
-from config.parser.models import TelegramChannel
+from config import cache
+from config.mixins import ConditionalGetMixin
 
 from .forms import AddChannelForm, CreateGroupForm, UpdateGroupForm
 from .models import Group
+from .pagination import channel_page, decode_cursor, get_sort
+from .services import (
+    add_channels_bulk,
+    free_channels,
+    group_channels,
+    search_free_channels,
+)
 
 
 class CreateGroupView(View):
@@ -16,8 +26,6 @@ class CreateGroupView(View):
         form = CreateGroupForm(request.POST)
         if form.is_valid():
             group = form.save(commit=False)
-            if not group.image_url:
-                group.image_url = 'data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wCEAAkGBxASEg8SEA8PDxIPDw8PDw8PDw8PDw8PFRIWFhURFRUYHSggGBolGxUVITEhJSkrLi4uFx8zODMtNygtLisBCgoKDg0OGhAQFy0dHR0tLS0tLS0tKy0tLS0tLS0tLS0tLS0tLS0tLS0rKy0tLS0tLS0xLS0tKystLSstLSsrN//AABEIAKgBLAMBIgACEQEDEQH/xAAbAAACAwEBAQAAAAAAAAAAAAACAwABBAUGB//EADwQAAIBAgMFBQUGBQQDAAAAAAABAgMRBCExBRJBUXFhgZGhsQYTIjLBQlJygrLRIyQzc/BTYqLCY5Lh/8QAGgEAAwEBAQEAAAAAAAAAAAAAAQIDAAQFBv/EACkRAAICAQQBBQABBQEAAAAAAAABAhEhAxIxQXEEIjJRYYEUUpHB8BP/2gAMAwEAAhEDEQA/APIlBMo+zPCKsQsowSimWCwGIU2U2U2YYhTZTYDkYagnIFsFyAcgDUG2BKEXqgXIpyAwpC54ZcG11M1SnKOq70bN4reFcUyikzDvFqY6rQT0yfkZZxaeZJ2iiaY9SCbvkzKpDFIKkZoko2CjItZizcGHvMkWBCQTQwtDiJgQkG0MhRiImDFhsYUai4sXTfmGwijg6bF02EEQchqEoZTMTY+DHwZnixsDEpI1QZdTDU55zhGTta7V8uQEGOiI0RZxmUWyih1FFFspmCU2C2WwGgDIjYDkW0wHFmGRTkA5EcXy8wJQlyAOqKlIByKlCXJip34poRsdINzBcxDmC6gjkOoj98m+Z98m+DeHaaFMk7PJmffCUzbjbRc4NFJjm7oS4iNVwOmHGQxq4hDYSCmBoiGxYE0XTYyFYSHQFzRdNjoVhjYaANBU3n1GFYQ1ZimhlJjCsKLsOEsbF5GJsZTYyIqLGBEY4dFiIjYPIxNmmLHXM9PQfEUjI5LKLYI50EbKI2C2AJbYLZTkA5GGSCbAcgXIXKYB0hjkBKQuVQW6gLGURzmC6gh1QHVA5DqI6dnqkzPUw8Xo93zRPeFe8EbTHSaMtSnKOunPgBc2b4irS4ojKP0UT+xe8WpAuJBbYw2MhmpnTH0Hmu0eLFaAki4sZViKRnhgWTTJZIWhsF8IplGKjQ1kgEMp/L3i2hmKaHoCg4fKgGMKPkSnqWtF0ACKPkg6YLLp6jCDBqFMZBmEY2A2mJgNgYmzRTYxMVDVDgMjI5TZVyMphOgpsCTLaBcUYZASkKlMY7AOYCiFSm+T8BUnLk/AfKqKlWFY68CJuX3X4CJVHxujU6wDrCNfpReDI6pTqD5qL1S6rIROjyZKSkUVFe8JvgbjK3RLY1IaphKYgtMykajUoXQqUB+Az3l2XDrUyu242T3U6MI6h80eqAmhuCjecetxIrIzeDRiEZTbiTEyk+RIPBrpr4F3iZGtxtGK7EZZDMETRR+XvYuQ6kvhXiKmN0KuR9L5e8Fh0F8PiDMPQOx1P5QWgqeiKYRRyeSItSQ0REMIOCpghQMIxkdR0RMdRqRich6NBnNFgMjI5DYDkU5C5NhOpIuUxM6pcl2i5bvXqBlEhc6widV8E/Bj3US5Cp1xH5KpfhnnUfJ+DEyrGl1+0XKqnrYlLyUXgzuqV7wY4x6EVC+hOmPaF75amSVFoBoGUHDNFGSbSfEdUw/YYD0NOG9ThLnFN9SunUrTJaj25OJOmLsdHEUjDUiJONDxlZr2PG85fgfqjViYk2HS+GcubUV3ZsPFF4L2EJP3nLqmrZVPOUuSsurMtTU61GluQS46vqJBXKyk3UaMuJZnowvJLm/IZiJDdn09Zdy+ozzIHERtdmNmmuxVCN5LszYZZYI4RqaskuSM8jRUZntdjMWJpgvhQuQ6SEyCBD6ayXQqQcdF0AkEA6OhSLREERjQoAhwMIw46jkKjwGoxOQ80ozGkUhI4MmJnVKk2xMoriw2d6QNSsZ51W9E/AdKcVwQmdcnJ/paK/BE9/7rFPe5MdKsA6pF19lF4FZlWY6Nbmrm+nhFOO9HNPyfIyhu4ZpT28nJuNoV91p6riuaNFbCtGOcLCuMosKakju18Gmk1mmrp9hza9Cx6LY8N/DU2+G9DwbsYMdRsdLSkrOWGpUnH6OBOJ6rAUv4FJ8438WzzlWm20lq3ZdT2dWioQhBfYhGPgkiekqkw+pniKOBjI6nKqq7stW9OZ18c9RWyMNvTc38tPznwGmrdDQltjbOhSo+7pxhyWf4nmzm4yZ08XUONUTlKy1bHlhUJpK8sLZ1DelvPSOnbI2YmY2EFCKS0XmzDiZmS2oa90rM7Tk0lxZ0Ut2KS4IRgqX2nq9Og2tIEVWQydujNWY7Cwsr8/QQo3ZsCvsz4oXUYFCOZJsbRibs3CCmKis0MmyqSCKOF8RjAgswgHIqOpZIBEY1BwBDiYVhwQ2OqF0x1PUxKQ00iIrNdTQ0KQkeTqVTLUrN6eQ2UVxz9Bc6ttBWz1YpCJxlyA92+PqHKo2A2yLoqrDhhm9M+hHhHyAjOSd02nzPSbIUcRFqyVSC+JLjH7yGiovBPV1HBX0eZnRaOj7N1bVlTl8tX4ekvsv6d5vxuzrcDkqLhOEuMJwl4STM4bcoG9akGj0W0cBa+R53F0bH0bbGFVm+eZ4nadPUo/dE4/Sa25Ha9mKP8onzqVfC9voYdpw1PRbJw+5g8OudPff525fU8/tZ6m0+CelPdqyf6zn7CwnvMRHK8ad6ku75fOx3doz1J7O4XcoyqNZ1nl+CN0vO7Mu0quoYIeUt+r+LBxsXeUlGKu27Jdp16dJU4KC4avnLizPszD61Zdqh9ZfTxDxdUKXZWTt7V0YcbVLwVDdW89ZeSAo096V3on4s1zZkryUeFSFV5mKEN59gytK7sOowsDkdYQbyMtWQ6rIRBXYWCKGUIWDmwkKqSNwblgpXZoQulEZJmRmLmxlJC1mx8UFAYMmXTQMhsEYXosKmgJDYIIrCGRASGJGEYyA6itRSRopLLqZkZMZSjmh4vDrXsGMUi3k8LObegO5zGSnyAsyVHsobRpQeW8l1yN62W+RzPdM6uwto+6ko1M6UnaV89y/2l9RljlEtXclcTPWwDXAvY1Z0cRSm/l3lGf4JO0v37j2uP2UrXSy4NcUeT2ngrXyDSksHPp+oWqnF9nsNsbP1yPFbTw9mz6XJe8oUp/fo05Pq4q54ramGvUhG3zVIR8ZJCwlaOL0Ws7cX0ey2rS+H8q9DwW1KLlJRjrOSjH8Tdl6n0fbUcmeS2ThveYylypuVWX5U7f8ALdBpy9rZL0epti5fR3dqQUIqC0hFRXRKy9DxmJourUhTjrUmo35J6vuV33HrtvVNTj+z2HvOrWekFuQ/FL5n3L9Q0cRH9NLZpubNO0WoJQjlGEVGK7ErI8zWg6k1Bcc5PlHizr7Wr6mTB092Dm/mqZ9IcP38B1hHRo+2N9krySSSySVkuSOVXe87I2YmpqZqcbZ8Xr2BOnTVKwoRsklwE15jZMySd2ZlYq2SnEe2VCIqvUsDgPLAqSuNpRsKox5mhmQZYwDNiY5sqpO7su8fSgbkNUg0hdSQc5WFU1d3MKl2MpRGyZEhdSV8vEIOWXDNj0gKcQpswr5Kjmx6F00MCKwoobTQCQ6EcjEpMJI02tkKoxu+mY5gIyY+gsurLD3bJLkaMPSTV3zFsg5dnz+lTXGSR1MDgYTyjKMnyTz8DlRpNjY0JLNXTWaayaAvB601fDo70tjtcDBisBbgen9ltoe/TpVf6kVeMv8AUitb9q8zVtTZ2TyNvzTPO/qZQ1Nkh3srV99hIp5yoydGV+SScX4NLuOTt7B2vkdL2HTjPE0+cYVF1TafqjT7Q4fJk4vbNo5N+z1LS4ef8m3ZUb4PDf2Yrwy+h52WH3sXh4/+eD7oy3voep2RD+Tw/wDa+rOTs+jvY2m/uKpP/i19RIOt38kdKe2Wo/J0duvJnI9k6HxYmry3aS/VL/qdT2glkxexKW5hYvjUlOo+92XkkZOoV9iwlWh5wcP2gq6j4Ufc4enD7TW/P8Us34ZLuEVaXva9OHDf3pfhjm/S3eO25WzZX6R1dRh/JwK0PeVFHg3eXZFZsLGVM8tF6DcJG0Z1HrJ7sei18/Qw4iZVHdHLr6M0832LzBuFUyy8eotuwTpSFYiYulECTuzRBWFLcIqpNJGON5O5depvOy0Q+hAHLGS2qxkVYTiKvBa8ewLEVd1dr0EUYXzZm+kCK7Y2hTNOiKhGxmr1N52WnHtDwLmTJJ7z7DTSiLo0x8pJIyRpPpA1Z26g0oAQTbuzTCIRXhBAxVypO+Q2EQicIOKCiikHFGJthwjdjioRsuocI3aXMxJsdRjZdfQbQheS7MySNGEhk3zyXQVshKWC5G2EbJLsMtON5JdvkbpISTOab6PM4XZDfA1S2RlocTA4itSacJyX+1u8X2NPI95sbFQxNPeSUZxyqQ5Pg1zTDKTidXqZ6mn7rtHlKdOVCpCrHWnJS6riu9XXefQMVSjOClHNSipJ9jV0cLaeAyeR2dgS3sNTX+nvUn+XTysS1XaUjh9Vqb4xn2sHM2BT3MX+OlUj6P6HR29T+FiaFPdxVF83NeMJHQ21D4WI370yE53qxl+F7Oj/ACtFcqUfQwbFp3xNSX3aTX/tJfsdPBf0ILlSh+ky7Eh/ExD7Ka/UTvEid0p/92YPaR5M24uCp0oQ+5CMfBWM+1Ke9VpR51IX6Xu/IftuXwsp/ah1xCJxNjU7zrVH9mKprq836LxOZtipdvj+52tnx3aF/vylLzsvQ4qjvVo8k99/lz9bF48tnfpP3uX0Kx63Ixgvsqz68fM5SzfTP9jdtOpeTMNXKF/vPyX+MouDu0l7V+mSTuxWIlZDIGXEyu7GbOyKySjEvFVLKy1YdPJXMU5bz7xG6RRK2MoQNM5qKv8A5cGjGyM1epvPsWhr2o3yYMbyd3xN1GFhOHgMxFXdVlq/IMVWTSd4QOJrfZXf+xVCmKpQN1OORlnIJPaqQWSM0m5P0LqzvktBlKAROMsOnEOci3kDFBE5yFTiPigYRGWCI2RIdShcCKNW7ZW8TEpMpmjDQyb55ITCF2kuJtmrZLhkBkZvoXa+nE3uNklyE4KneV+EfU0VBGc83mg8FDNvkrd7NDReFhaC7cy2Tbyc7dtnBjszLQdsiTw9eEvsy+Cpy3W1n3a9xCFG7VM6VNzTT7PX47D3TFezisq8OU4zXerf9SEOS/Yzy03/AOckFWhavRf+9ed0bdqx+F9CEB2hO4kwy/hx/tQ/ShWyI/1u2a8l/wDSEA+GCXEjLUjfE0+xzfhFidvv4WQhWPyReHzj4M1eO7RguUI+lziYFZ1ZcoqK73f6EIVjwdej8H5/2cfGO8n1E7SytHkkvAhC56unykZKejfIwrNkIKzrh2MxErRM9GOZCCvkpH4j8TOytzM1KNyyAfyNHETYmoq5kzbIQMgQ+zXRgXXnwXeQg3RNZkDSiaoIhAoWZTzG00QgRJD0rFpEIYiasNTy3n0X7hSIQBK7ZswVKycnxyXTiXUKIKQu5HSw9Ldgub+JgON2lzdiEEOe+zqSjbLkrCWiEERzxZ//2Q=='
             group.owner = request.user
             form.save()
             messages.success(request, 'Группа успешно создана')
@@ -55,45 +63,128 @@ class DeleteGroupView(View):
         return redirect(reverse('users:profile'))
 
 
-class GroupDetailView(View):
-    def get(self, request, *args, **kwargs):
-        slug = kwargs['slug']
-        group = get_object_or_404(Group, slug=slug)
+class GroupDetailView(ConditionalGetMixin, View):
+    def get_group(self):
+        if not hasattr(self, 'group'):
+            self.group = get_object_or_404(
+                Group.objects.select_related('auto_rule__category'),
+                slug=self.kwargs['slug'],
+            )
+        return self.group
 
-        channels = group.channels.all()
-
-        auto_category = None
+    def get_auto_category(self, group):
         if hasattr(group, 'auto_rule'):
-            auto_category = group.auto_rule.category
-            channels = TelegramChannel.objects.filter(category=auto_category) 
+            return group.auto_rule.category.name
+        return None
+
+    def get_channels(self, group):
+        return group_channels(group)
+
+    def get_page(self, group):
+        """
+        Страница каналов по курсору из ?sort=&cursor=. В кэш идёт только
+        первая страница: курсор приходит от клиента, и ключи по нему
+        плодили бы записи без ограничения. Дальние страницы — keyset
+        по индексу, им кэш не нужен.
+        """
+        sort = get_sort(self.request.GET.get('sort'))
+        position = decode_cursor(self.request.GET.get('cursor'))
+        if position is not None:
+            return sort, channel_page(
+                self.get_channels(group), sort, self.request.GET['cursor']
+            )
+        return sort, cache.get_or_set(
+            (cache.CHANNELS, cache.GROUPS),
+            ('group_channels', group.pk, sort),
+            lambda: channel_page(self.get_channels(group), sort),
+        )
+
+    def get_freshness(self):
+        group = self.get_group()
+        stats = self.get_channels(group).aggregate(
+            total=Count('id'), last_parsed=Max('parsed_at')
+        )
+        last_modified = max(
+            filter(None, (group.updated_at, stats['last_parsed']))
+        )
+        key = (
+            group.pk, group.updated_at, self.get_auto_category(group),
+            stats['total'], stats['last_parsed'],
+        )
+        return key, last_modified
 
-        is_owner = request.user.is_authenticated and (group.owner == request.user)
+    def get(self, request, *args, **kwargs):
+        group = self.get_group()
+        sort, (channels, next_cursor) = self.get_page(group)
+
+        auto_category = self.get_auto_category(group)
+
+        is_owner = (
+            request.user.is_authenticated
+            and group.owner_id == request.user.pk
+        )
         add_form = None
         if is_owner and not hasattr(group, 'auto_rule'):
-            free_qs = TelegramChannel.objects.exclude(groups=group)
-            add_form = AddChannelForm(channel_qs=free_qs)
+            add_form = AddChannelForm()
 
         return render(request, 'group_channels/detail.html', {
             'group': group,
             'channels': channels,
+            'sort': sort,
+            'next_cursor': next_cursor,
             'auto_category': auto_category,
             'add_form': add_form,
             'is_owner': is_owner,
         })
 
 
-class AddChannelsView(LoginRequiredMixin, UserPassesTestMixin, View):
+class GroupChannelsView(GroupDetailView):
+    """JSON-подгрузка следующей страницы каналов («Показать ещё»)"""
+
+    def get(self, request, *args, **kwargs):
+        group = self.get_group()
+        _, (channels, next_cursor) = self.get_page(group)
+        return JsonResponse({
+            'channels': [
+                {**ch, 'url': reverse('parser:detail', args=[ch['id']])}
+                for ch in channels
+            ],
+            'next_cursor': next_cursor,
+        })
+
+
+class GroupOwnerMixin(LoginRequiredMixin, UserPassesTestMixin):
     def test_func(self):
-        self.group = get_object_or_404(Group, slug=self.kwargs['slug'])
-        return self.group.owner == self.request.user
+        self.group = get_object_or_404(
+            Group.objects.select_related('auto_rule'), slug=self.kwargs['slug']
+        )
+        return self.group.owner_id == self.request.user.pk
+
+
+class ChannelSearchView(GroupOwnerMixin, View):
+    """Поиск каналов для добавления в подборку (autocomplete)"""
+
+    def get(self, request, slug):
+        return JsonResponse({
+            'results': search_free_channels(self.group, request.GET.get('q')),
+        })
+
 
+class AddChannelsView(GroupOwnerMixin, View):
     def post(self, request, slug):
-        free_qs = TelegramChannel.objects.exclude(groups=self.group)
-        form = AddChannelForm(request.POST, instance=self.group, channel_qs=free_qs)
+        free_qs = free_channels(self.group)
+        form = AddChannelForm(request.POST, channel_qs=free_qs)
 
         if form.is_valid():
-            self.group.channels.add(*form.cleaned_data['channels'])
-            messages.success(request, 'Каналы добавлены')
+            try:
+                add_channels_bulk(
+                    self.group,
+                    channel_ids=[ch.pk for ch in form.cleaned_data['channels']],
+                )
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, 'Каналы добавлены')
         else:
             for msg in form.errors.values():
                 messages.error(request, msg)
@@ -1,7 +1,135 @@
+"""
+Logging settings.
+
+Records are not written in the thread that logs them: QueueHandler only
+puts them into an in-process queue, and one listener thread per process
+formats them and writes to the console and the rotating files. Debug
+records can be sampled (LOG_DEBUG_SAMPLE_RATE), and LOG_FORMAT=json
+switches the files to one JSON object per line.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import weakref
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+LOG_LEVEL = os.getenv('LOG_LEVEL') or (
+    'INFO' if os.getenv('PROD') == 't' else 'DEBUG'
+)
+# доля DEBUG-записей, которые доходят до обработчиков (1 — все)
+DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE') or 1)
+FILE_FORMATTER = 'json' if os.getenv('LOG_FORMAT') == 'json' else 'verbose'
+
+# аргументы этих типов не меняются, пока запись ждёт в очереди
+IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+# обработчики процесса; хуки fork и выхода регистрируются один раз на модуль,
+# а не на каждый экземпляр (dictConfig создаёт их при каждой настройке)
+_queue_handlers = weakref.WeakSet()
+
+
+def _stop_listeners():
+    for handler in list(_queue_handlers):
+        handler._stop_listener()
+
+
+os.register_at_fork(before=_stop_listeners)
+atexit.register(_stop_listeners)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладёт записи в очередь процесса, пишет их поток QueueListener.
+    Слушатель запускается при первой записи в каждом процессе: воркеры
+    gunicorn и Celery после fork получают свою очередь и свой поток.
+    Перед fork слушатель останавливается (дописав очередь), чтобы его
+    поток не держал блокировки файлов, которые унаследует дочерний процесс.
+    """
+
+    _pid = None
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        _queue_handlers.add(self)
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        super().emit(record)
+
+    def _start_listener(self):
+        # вызывается под self.lock (Handler.handle)
+        handlers = self.listener.handlers
+        respect_level = self.listener.respect_handler_level
+        self.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_level
+        )
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def _stop_listener(self):
+        if self._pid == os.getpid():
+            self._pid = None
+            self.listener.stop()
+
+    def prepare(self, record):
+        """
+        Очередь внутри процесса, поэтому запись не копируется и не
+        форматируется здесь. Сообщение собирается сразу, только если
+        среди аргументов есть изменяемые объекты.
+        """
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, IMMUTABLE_ARGS) for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """Пропускает долю rate записей уровня не выше level"""
+
+    def __init__(self, rate=1.0, level='DEBUG'):
+        super().__init__()
+        self.rate = rate
+        self.level = logging.getLevelName(level)
+
+    def filter(self, record):
+        return (
+            record.levelno > self.level
+            or self.rate >= 1
+            or random.random() < self.rate
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'func': record.funcName,
+            'line': record.lineno,
+            'process': record.process,
+        }
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -15,6 +143,11 @@ LOGGING = {
         "require_debug_false": {
             "()": "django.utils.log.RequireDebugFalse",
         },
+        # выборка DEBUG-записей
+        "sample_debug": {
+            "()": "config.logging.SampleFilter",
+            "rate": DEBUG_SAMPLE_RATE,
+        },
     },
 
     "formatters": {
@@ -26,6 +159,9 @@ LOGGING = {
             "format": "{levelname} {asctime} {module} {funcName} (line:{lineno}) - {message}",
             "style": "{",
         },
+        "json": {
+            "()": "config.logging.JsonFormatter",
+        },
     },
 
     "handlers": {
@@ -44,7 +180,7 @@ LOGGING = {
             "filename": BASE_DIR / "django.log",
             "maxBytes": 2 * 1024 * 1024,  # 2 MB максимальный размер
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": FILE_FORMATTER,
         },
 
         # вывод в файл errors.log
@@ -55,7 +191,15 @@ LOGGING = {
             "filename": BASE_DIR / "errors.log",
             "maxBytes": 10 * 1024 * 1024,  # 10 MB максимальный размер
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": FILE_FORMATTER,
+        },
+
+        # все обработчики выше — в фоновом потоке
+        "queue": {
+            "class": "config.logging.QueueHandler",
+            "handlers": ["debug_console", "file", "error_file"],
+            "respect_handler_level": True,
+            "filters": ["sample_debug"],
         },
 
         # письмо на email при критических ошибках
@@ -70,22 +214,22 @@ LOGGING = {
     "loggers": {
         # корневой логгер
         "": {
-            "handlers": ["debug_console", "file", "error_file"],
-            "level": "DEBUG",
+            "handlers": ["queue"],
+            "level": LOG_LEVEL,
         },
 
         # логгер django
         "django": {
-            "handlers": ["debug_console", "file", "error_file"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
 
         # логгер приложения
         "myapp": {
-            "handlers": ["debug_console", "file", "error_file"],
-            "level": "DEBUG",
+            "handlers": ["queue"],
+            "level": LOG_LEVEL,
             "propagate": False,
         },
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,122 @@
+"""
+Outbound mail queue.
+
+CeleryEmailBackend is an EMAIL_BACKEND that doesn't talk to the mail
+server: it serialises the already rendered messages to JSON and enqueues
+them as one Celery task (config.users.tasks.send_queued_mail), so a
+request only pays for a push to Redis. The worker delivers the batch over
+one connection of MAIL_DELIVERY_BACKEND (SMTP in production, console in
+development) and retries only the messages that failed, with exponential
+backoff.
+
+Everything that sends mail through Django (password reset, allauth,
+send_mail) goes through the queue once EMAIL_BACKEND points here.
+"""
+import base64
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+log = logging.getLogger(__name__)
+
+# how many messages go to the mail server over one connection
+BATCH_SIZE = 50
+
+
+def serialize(message):
+    """EmailMessage -> dict, пригодный для JSON-сериализатора Celery"""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            # готовые MIME-части не сериализуются, такие письма редки
+            log.warning('MIME attachment dropped from "%s"', message.subject)
+            continue
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype]
+        )
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [
+            [content, mimetype]
+            for content, mimetype in getattr(message, 'alternatives', [])
+        ],
+        'attachments': attachments,
+        'content_subtype': message.content_subtype,
+    }
+
+
+def deserialize(data):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(alt) for alt in data['alternatives']],
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def deliver(messages):
+    """
+    Отправить сериализованные письма через MAIL_DELIVERY_BACKEND пачками
+    по BATCH_SIZE на одном соединении. Возвращает (отправлено, неотправленные
+    письма в том же виде, последняя ошибка).
+    """
+    sent, failed, error = 0, [], None
+    for start in range(0, len(messages), BATCH_SIZE):
+        batch = messages[start:start + BATCH_SIZE]
+        connection = get_connection(settings.MAIL_DELIVERY_BACKEND)
+        try:
+            connection.open()
+        except Exception as e:
+            failed.extend(batch)
+            error = e
+            continue
+        try:
+            for data in batch:
+                try:
+                    sent += connection.send_messages([deserialize(data)]) or 0
+                except Exception as e:
+                    failed.append(data)
+                    error = e
+        finally:
+            connection.close()
+    return sent, failed, error
+
+
+class CeleryEmailBackend(BaseEmailBackend):
+    """EMAIL_BACKEND, который ставит письма в очередь Celery"""
+
+    def send_messages(self, email_messages):
+        from config.users.tasks import send_queued_mail
+
+        messages = [serialize(m) for m in email_messages if m.recipients()]
+        if not messages:
+            return 0
+        try:
+            send_queued_mail.delay(messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            log.exception('Mail was not queued')
+            return 0
+        return len(messages)
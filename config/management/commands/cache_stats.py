@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from config import cache
+
+
+class Command(BaseCommand):
+    help = "Показывает счётчики попаданий/промахов кэша по всем процессам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Обнулить счётчики после вывода.",
+        )
+
+    def handle(self, *args, **options):
+        stats = cache.get_stats()
+        if not stats:
+            self.stdout.write(self.style.WARNING("Счётчиков пока нет."))
+        for name, counts in sorted(stats.items()):
+            total = counts["hit"] + counts["miss"]
+            ratio = counts["hit"] / total * 100 if total else 0
+            self.stdout.write(
+                f"{name}: попаданий {counts['hit']} | "
+                f"промахов {counts['miss']} | hit ratio {ratio:.1f}%"
+            )
+        if options["reset"]:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Счётчики обнулены."))
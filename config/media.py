@@ -0,0 +1,190 @@
+"""
+Content-addressed media store.
+
+Images (avatars, group covers, channel thumbnails) are stored once under
+the SHA-256 of their bytes, so the same picture uploaded by a thousand
+users takes one file. Models keep only a short reference
+'<sha256>.<ext>'; the file lives at 'ab/cd/<sha256>.<ext>' in the
+storage configured as STORAGES['media'] (local disk by default, any
+Django storage backend, e.g. S3, via MEDIA_STORAGE_BACKEND).
+
+Fields that hold a reference may also contain an external URL entered by
+the user; url() resolves both. An empty value means the default image,
+served as a hashed static file.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import re
+from functools import cache
+
+from django import forms
+from django.contrib.staticfiles import finders
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.templatetags.static import static
+from PIL import Image
+
+STORAGE_ALIAS = 'media'
+
+REF_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{2,5}$')
+PATH_RE = re.compile(
+    r'^([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60}\.[a-z0-9]{2,5})$'
+)
+DATA_URI_RE = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.S)
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+# Pillow format -> extension of the stored file
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# largest image accepted from a form, bytes
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
+# static defaults for empty fields
+AVATAR = 'users/img/default-avatar.png'
+COVER = 'group_channels/img/default-cover.jpg'
+
+# one immutable year: a reference never changes its content
+CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def get_storage():
+    return storages[STORAGE_ALIAS]
+
+
+def is_ref(value):
+    return bool(value) and REF_RE.match(value) is not None
+
+
+def ref_path(ref):
+    """Путь файла в хранилище по ссылке"""
+    return f'{ref[:2]}/{ref[2:4]}/{ref}'
+
+
+def path_ref(path):
+    """Ссылка по пути в хранилище или None, если путь не из хранилища"""
+    match = PATH_RE.match(path or '')
+    return match.group(3) if match else None
+
+
+def make_ref(content, ext):
+    return f'{hashlib.sha256(content).hexdigest()}.{ext}'
+
+
+def store(content, ext):
+    """Сохранить байты (если таких ещё нет) и вернуть ссылку"""
+    ref = make_ref(content, ext)
+    path = ref_path(ref)
+    storage = get_storage()
+    if not storage.exists(path):
+        storage.save(path, ContentFile(content))
+    return ref
+
+
+def decode_data_uri(value):
+    """(байты, расширение) из data:image/...;base64 URI или None"""
+    match = DATA_URI_RE.match(value or '')
+    if not match or match.group(1) not in EXTENSIONS:
+        return None
+    try:
+        # в старых строках base64 разбит пробелами и переносами
+        payload = re.sub(r'\s+', '', match.group(2))
+        content = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return content, EXTENSIONS[match.group(1)]
+
+
+@cache
+def default_digests():
+    """SHA-256 встроенных изображений по умолчанию"""
+    digests = set()
+    for name in (AVATAR, COVER):
+        path = finders.find(name)
+        if path:
+            with open(path, 'rb') as f:
+                digests.add(hashlib.sha256(f.read()).hexdigest())
+    return frozenset(digests)
+
+
+def image_extension(content):
+    """Расширение по содержимому или None, если это не JPEG/PNG/GIF/WebP"""
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.verify()
+            return FORMATS.get(image.format)
+    except Exception:
+        # verify() бросает разные исключения на разных битых форматах
+        return None
+
+
+def url(value, default=None):
+    """URL изображения по значению поля; пустое значение — default из static"""
+    if not value:
+        return static(default) if default else ''
+    if is_ref(value):
+        return get_storage().url(ref_path(value))
+    return value
+
+
+def url_ref(value):
+    """Ссылка по URL файла хранилища (как его выдаёт url()) или None"""
+    match = re.search(r'([0-9a-f]{64}\.[a-z0-9]{2,5})(?:\?.*)?$', value or '')
+    if match and url(match.group(1)) == value:
+        return match.group(1)
+    return None
+
+
+class ImageRefField(forms.CharField):
+    """
+    URL изображения. Вставленный data: URI проверяется Pillow, не больше
+    MAX_IMAGE_SIZE, и сохраняется в хранилище; URL файла хранилища
+    (значение url() в форме редактирования) снова становится ссылкой.
+    Изображение по умолчанию не сохраняется — поле остаётся пустым.
+    """
+    default_error_messages = {
+        'invalid_image': 'Нужно изображение JPEG, PNG, GIF или WebP.',
+        'image_too_large': 'Изображение больше %(max)s МБ.',
+    }
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value.startswith('data:'):
+            return self.store(value)
+        return url_ref(value) or value
+
+    def store(self, value):
+        match = DATA_URI_RE.match(value)
+        # base64 длиннее байтов на треть: не декодируем заведомо большое
+        if match and len(match.group(2)) * 3 // 4 > MAX_IMAGE_SIZE:
+            self.too_large()
+        decoded = decode_data_uri(value)
+        if decoded is None:
+            raise ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            )
+        content, _ = decoded
+        if len(content) > MAX_IMAGE_SIZE:
+            self.too_large()
+        ext = image_extension(content)
+        if ext is None:
+            raise ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            )
+        if hashlib.sha256(content).hexdigest() in default_digests():
+            return ''
+        return store(content, ext)
+
+    def too_large(self):
+        raise ValidationError(
+            self.error_messages['image_too_large'],
+            code='image_too_large',
+            params={'max': MAX_IMAGE_SIZE // (1024 * 1024)},
+        )
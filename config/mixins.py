@@ -1,5 +1,14 @@
-from django.core.exceptions import PermissionDenied, ImproperlyConfigured
+import hashlib
+from calendar import timegm
+
+from django.contrib import messages
 from django.contrib.auth.mixins import AccessMixin
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from config.parser.permissions import get_channel_permissions
+from config.users.roles import get_flags, get_role
 
 
 class RoleRequiredMixin(AccessMixin):
@@ -12,7 +21,7 @@ class RoleRequiredMixin(AccessMixin):
 
     def dispatch(self, request, *args, **kwargs):
         if not hasattr(request, 'role'):
-            # Добавляем определение роли к запросу для удобства
+            # Обычно роль уже выставил RoleMiddleware
             request.role = self._get_user_role(request)
 
         if not self._test_role(request):
@@ -22,9 +31,7 @@ class RoleRequiredMixin(AccessMixin):
 
     def _get_user_role(self, request):
         """Определяем роль пользователя"""
-        if not request.user.is_authenticated:
-            return 'guest'
-        return getattr(request.user, 'role', 'user')  # Используем свойство role из модели
+        return get_role(request.user)
 
     def _test_role(self, request):
         """Проверяем соответствие роли"""
@@ -37,7 +44,8 @@ class RoleRequiredMixin(AccessMixin):
     def handle_no_permission(self):
         """Обработка отказа в доступе"""
         if not self.request.user.is_authenticated:
-            return self.redirect_to_login()  # Перенаправляем гостей на страницу входа
+            # AccessMixin перенаправляет гостей на страницу входа
+            return super().handle_no_permission()
         raise PermissionDenied(self.get_permission_denied_message())
 
 
@@ -62,8 +70,7 @@ class PartnerRequiredMixin(RoleRequiredMixin):
         """Дополнительная проверка активного статуса партнера"""
         return (
                 super()._test_role(request) and
-                hasattr(request.user, 'is_partner') and
-                request.user.is_partner
+                get_flags(request.user)['is_partner']
         )
 
 
@@ -76,8 +83,7 @@ class ChannelModeratorRequiredMixin(RoleRequiredMixin):
         """Дополнительная проверка статуса модератора канала"""
         return (
                 super()._test_role(request) and
-                hasattr(request.user, 'is_channel_moderator') and
-                request.user.is_channel_moderator
+                get_flags(request.user)['is_channel_moderator']
         )
 
 
@@ -94,3 +100,101 @@ class StaffRequiredMixin(RoleRequiredMixin):
         if request.user.is_superuser:
             return 'admin'
         return role
+
+    def _test_role(self, request):
+        """RoleMiddleware уже выставил request.role без учёта персонала"""
+        user = request.user
+        if user.is_authenticated and (user.is_staff or user.is_superuser):
+            return True
+        return super()._test_role(request)
+
+
+class StaffOnlyMixin(StaffRequiredMixin):
+    """Только персонал и суперпользователи, без партнёров"""
+    allowed_roles = ['staff', 'admin']
+
+    def _test_role(self, request):
+        user = request.user
+        return user.is_authenticated and (user.is_staff or user.is_superuser)
+
+
+class ChannelPermissionRequiredMixin(AccessMixin):
+    """
+    Доступ к представлению канала по праву модератора.
+    channel_permission — 'view' | 'edit' | 'delete' | 'manage_moderators'
+    | 'owner', id канала берётся из URL (channel_url_kwarg). Проверка —
+    по карте прав запроса (request.channel_perms), без отдельного запроса
+    в БД.
+    """
+    channel_permission = 'view'
+    channel_url_kwarg = 'pk'
+    permission_denied_message = "Недостаточно прав на этот канал"
+
+    def has_channel_permission(self, channel_id, perm=None):
+        perms = get_channel_permissions(self.request)
+        return perms.has(channel_id, perm or self.channel_permission)
+
+    def dispatch(self, request, *args, **kwargs):
+        channel_id = kwargs.get(self.channel_url_kwarg)
+        if (channel_id is None
+                or not self.has_channel_permission(int(channel_id))):
+            return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Миксин условных GET-запросов (ETag / Last-Modified).
+    Дочерний класс переопределяет get_freshness() и возвращает
+    пару (ключ версии, дата изменения), посчитанную дешёвым запросом.
+    Если клиент прислал актуальные If-None-Match / If-Modified-Since,
+    отвечаем 304 без рендера страницы.
+    """
+
+    def get_freshness(self):
+        """Вернуть (ключ версии, datetime изменения) или None"""
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        # Непоказанные сообщения меняют страницу, поэтому не кэшируем
+        if (request.method not in ('GET', 'HEAD')
+                or len(messages.get_messages(request))):
+            return super().dispatch(request, *args, **kwargs)
+
+        freshness = self.get_freshness()
+        if freshness is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        key, last_modified = freshness
+        etag = self._make_etag(request, key)
+        if last_modified:
+            last_modified = timegm(last_modified.utctimetuple())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+            if last_modified:
+                response.headers.setdefault(
+                    'Last-Modified', http_date(last_modified)
+                )
+            # Разрешаем хранить ответ, но требуем ревалидацию
+            patch_cache_control(response, no_cache=True)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+        return response
+
+    def _make_etag(self, request, key):
+        """Слабый ETag: зависит от данных, пользователя и типа ответа Inertia"""
+        raw = repr((
+            self.__class__.__name__,
+            key,
+            request.user.pk,
+            request.headers.get('X-Inertia'),
+        ))
+        digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+        return f'W/"{digest}"'
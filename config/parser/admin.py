@@ -1,6 +1,51 @@
-from django.contrib import admin
-from .models import TelegramChannel, ChannelStats, ChannelModerator
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
 
+from config.group_channels.models import Group
+from config.group_channels.services import add_channels_bulk
+
+from .models import Category, ChannelModerator, ChannelStats, TelegramChannel
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'order']
+    list_editable = ['order']
+    search_fields = ['name']
+
+
+class AddToGroupActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.filter(auto_rule__isnull=True).order_by('name'),
+        required=False,
+        label='Подборка',
+    )
+
+
+@admin.action(description='Добавить выбранные каналы в подборку')
+def add_to_group(modeladmin, request, queryset):
+    # Поле action формы заполняется админкой, проверяем только подборку
+    try:
+        group = AddToGroupActionForm.base_fields['group'].clean(
+            request.POST.get('group')
+        )
+    except ValidationError:
+        group = None
+    if group is None:
+        modeladmin.message_user(request, 'Выберите подборку', messages.ERROR)
+        return
+    # «Выбрать все» отдаёт весь отфильтрованный queryset: читаем id потоком;
+    # заготовки import_channels в подборки не попадают
+    ids = (
+        queryset.resolved().values_list('pk', flat=True)
+        .iterator(chunk_size=5000)
+    )
+    added = add_channels_bulk(group, channel_ids=ids)
+    modeladmin.message_user(
+        request, f'В подборку «{group}» добавлено каналов: {added}'
+    )
 
 
 @admin.register(TelegramChannel)
@@ -10,6 +55,8 @@ class TelegramChannelAdmin(admin.ModelAdmin):
     search_fields = ['title', 'username', 'description']
     readonly_fields = ['channel_id', 'parsed_at', 'creation_date']
     ordering = ['-parsed_at']
+    action_form = AddToGroupActionForm
+    actions = [add_to_group]
     
     fieldsets = (
         ('Основная информация', {
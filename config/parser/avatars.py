@@ -0,0 +1,159 @@
+"""
+Channel profile photos.
+
+tg_parser gets the photo id with the channel entity for free and
+downloads the photo itself only when the id differs from the stored
+TelegramChannel.photo_id, so regular refreshes cost no extra requests.
+A downloaded photo is cut into square WebP thumbnails of THUMB_SIZES in a
+pool of worker processes — resizing is CPU-bound and would stall the
+event loop shared by the parser workers — and the thumbnails go to the
+content-addressed media store (config/media.py), which serves them with
+immutable cache headers. Thumbnails replaced by a new photo or left by a
+deleted channel are removed once nothing else refers to them: channels
+are counted in ThumbnailRef, which store_thumbnails() increments and
+discard_thumbnails() decrements under the lock of the counter row.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from config import media
+
+from .models import ThumbnailRef
+
+log = logging.getLogger(__name__)
+
+THUMB_SIZES = (64, 320)
+WEBP_QUALITY = 80
+WORKERS = 2
+
+# (модель, поле) вне счётчика ThumbnailRef, которые могут ссылаться на
+# файл миниатюры: URL миниатюры, вставленный в форму подборки или
+# профиля, тоже становится ссылкой
+REF_FIELDS = (
+    ('group_channels.Group', 'image_url'),
+    ('users.User', 'avatar_image'),
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if multiprocessing.current_process().daemon:
+            # Дочерние процессы Celery (prefork) не могут порождать свои
+            _executor = ThreadPoolExecutor(WORKERS)
+        else:
+            _executor = ProcessPoolExecutor(WORKERS)
+    return _executor
+
+
+def make_thumbnails(content, sizes=THUMB_SIZES, quality=WEBP_QUALITY):
+    """Квадратные WebP-миниатюры {размер: байты}; выполняется в пуле"""
+    with Image.open(io.BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        thumbs = {}
+        for size in sizes:
+            thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumb.save(buffer, 'WEBP', quality=quality)
+            thumbs[size] = buffer.getvalue()
+    return thumbs
+
+
+def store_thumbnail(content):
+    """
+    Сохранить миниатюру и прибавить ссылку на неё. Файл пишется, пока
+    строка счётчика заблокирована UPDATE: discard_thumbnails() того же
+    файла ждёт коммита и видит уже увеличенный счётчик.
+    """
+    ref = media.make_ref(content, 'webp')
+    with transaction.atomic():
+        ThumbnailRef.objects.bulk_create(
+            [ThumbnailRef(ref=ref)], ignore_conflicts=True
+        )
+        ThumbnailRef.objects.filter(ref=ref).update(count=F('count') + 1)
+        media.store(content, 'webp')
+    return ref
+
+
+def store_thumbnails(thumbs):
+    return {str(size): store_thumbnail(body) for size, body in thumbs.items()}
+
+
+async def process_photo(data):
+    """
+    Заменить скачанное фото data['photo'] (байты) ссылками на миниатюры
+    data['photo_thumbs']. Если картинку не удалось обработать, ключа
+    photo_thumbs нет, и photo_id канала не меняется — фото скачается
+    при следующем парсинге.
+    """
+    content = data.pop('photo', None)
+    if not content:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        thumbs = await loop.run_in_executor(
+            get_executor(), make_thumbnails, content
+        )
+    except Exception as e:
+        log.warning('Photo of %s not processed: %s', data.get('username'), e)
+        return
+    data['photo_thumbs'] = await sync_to_async(store_thumbnails)(thumbs)
+
+
+def photo_fields(data):
+    """Поля канала, которые нужно обновить по данным парсера"""
+    if 'photo_id' not in data:
+        return {}
+    if not data['photo_id']:
+        # фото у канала удалили
+        return {'photo_id': None, 'photo_thumbs': {}}
+    if 'photo_thumbs' in data:
+        return {
+            'photo_id': data['photo_id'],
+            'photo_thumbs': data['photo_thumbs'],
+        }
+    return {}
+
+
+def ref_in_use(ref):
+    """Ссылаются ли на файл подборки или профили"""
+    return any(
+        apps.get_model(model).objects.filter(**{field: ref}).exists()
+        for model, field in REF_FIELDS
+    )
+
+
+def discard_thumbnails(refs):
+    """
+    Убрать по ссылке канала на каждую миниатюру refs и удалить из
+    хранилища те, на которые больше никто не ссылается. Файлы без
+    счётчика не трогаются.
+    """
+    storage = media.get_storage()
+    for ref in set(refs):
+        if not media.is_ref(ref):
+            continue
+        with transaction.atomic():
+            counter = (
+                ThumbnailRef.objects.select_for_update()
+                .filter(ref=ref).first()
+            )
+            if counter is None:
+                continue
+            counter.count = max(counter.count - 1, 0)
+            if counter.count or ref_in_use(ref):
+                counter.save(update_fields=['count'])
+            else:
+                counter.delete()
+                storage.delete(media.ref_path(ref))
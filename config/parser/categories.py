@@ -0,0 +1,57 @@
+"""
+In-process cache of the Category table.
+
+Categories are a few dozen rows that change rarely, while choices and
+name -> id lookups are needed on every form and import. The table is read
+once per process and kept for CACHE_TTL seconds; saving or deleting a
+Category drops the cache of the current process at once (see signals.py),
+other processes pick the change up when their TTL expires.
+"""
+import time
+
+from .models import Category
+
+CACHE_TTL = 5 * 60
+
+_cache = {'loaded_at': 0.0, 'rows': ()}
+
+
+def _rows():
+    now = time.monotonic()
+    if not _cache['rows'] or now - _cache['loaded_at'] > CACHE_TTL:
+        _cache['rows'] = tuple(Category.objects.values_list('pk', 'name'))
+        _cache['loaded_at'] = now
+    return _cache['rows']
+
+
+def clear_cache():
+    _cache['rows'] = ()
+
+
+def category_choices():
+    """Choices для форм: [(id, название), ...] в порядке справочника"""
+    return list(_rows())
+
+
+def category_names():
+    return {pk: name for pk, name in _rows()}
+
+
+def category_ids(names, create=False):
+    """
+    {название: id} для переданных названий. create=True создаёт
+    недостающие категории одним bulk_create.
+    """
+    names = {(name or '').strip() for name in names} - {''}
+    found = {name: pk for pk, name in _rows() if name in names}
+    missing = names - set(found)
+    if missing and create:
+        Category.objects.bulk_create(
+            [Category(name=name) for name in sorted(missing)],
+            ignore_conflicts=True,
+        )
+        clear_cache()
+        found.update(
+            Category.objects.filter(name__in=missing).values_list('name', 'pk')
+        )
+    return found
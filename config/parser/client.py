@@ -0,0 +1,28 @@
+"""
+Telegram client factory.
+
+parse_channel, the channel import and ParserView take their client from
+get_telegram_client(). TELEGRAM_CLIENT — the dotted path of a callable
+that returns a client — replaces Telethon with something else, e.g. the
+offline stand-in of tests/fake_telegram.py for tests and benchmarks.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from telethon import TelegramClient
+from telethon.sessions import StringSession
+
+
+def get_telegram_client():
+    if settings.TELEGRAM_CLIENT:
+        return import_string(settings.TELEGRAM_CLIENT)()
+    if not settings.TELEGRAM_SESSION_STRING:
+        raise ImproperlyConfigured(
+            'TELEGRAM_SESSION_STRING is not set. '
+            'Please run `uv run python3 manage.py start_telegram_session`'
+        )
+    return TelegramClient(
+        StringSession(settings.TELEGRAM_SESSION_STRING),
+        settings.TELEGRAM_API_ID,
+        settings.TELEGRAM_API_HASH,
+    )
@@ -0,0 +1,152 @@
+"""
+Streaming export of channels with their latest stats and history.
+
+Rows are read with QuerySet.iterator(chunk_size=...) (history is prefetched
+per chunk), encoded line by line into CSV or JSON Lines and optionally
+gzip-compressed on the fly, so memory stays constant for any number of rows.
+The same generators feed StreamingHttpResponse and the export_channels
+management command.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, OuterRef, Prefetch, Subquery
+
+from config.group_channels.services import group_channels
+
+from .models import ChannelStats, TelegramChannel
+
+CHUNK_SIZE = 2000
+# how much encoded output to collect before handing it to the client
+BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+FIELDS = (
+    'channel_id', 'username', 'title', 'category', 'country', 'language',
+    'participants_count', 'average_views', 'daily_growth', 'creation_date',
+    'parsed_at', 'stats_participants_count', 'stats_daily_growth',
+    'stats_parsed_at',
+)
+
+# output column -> attribute of the exported channel
+ATTRS = {'category': 'category_name'}
+
+
+def export_queryset(group=None, category=None, history=False):
+    """
+    Каналы для выгрузки с последней статистикой (подзапросы, без JOIN
+    всей истории). history=True подгружает историю пачками вместе с
+    iterator().
+    """
+    if group is not None:
+        channels = group_channels(group)
+    else:
+        channels = TelegramChannel.objects.resolved()
+    if category:
+        channels = channels.filter(category__name=category)
+
+    latest = ChannelStats.objects.filter(
+        channel=OuterRef('pk')
+    ).order_by('-parsed_at')
+    channels = channels.annotate(
+        category_name=F('category__name'),
+        stats_participants_count=Subquery(
+            latest.values('participants_count')[:1]
+        ),
+        stats_daily_growth=Subquery(latest.values('daily_growth')[:1]),
+        stats_parsed_at=Subquery(latest.values('parsed_at')[:1]),
+    ).only(*FIELDS[:-3]).order_by('pk')
+
+    if history:
+        channels = channels.prefetch_related(Prefetch(
+            'channelstats_set',
+            queryset=ChannelStats.objects
+            .only('channel_id', 'participants_count', 'daily_growth',
+                  'parsed_at')
+            .order_by('parsed_at'),
+            to_attr='history',
+        ))
+    return channels
+
+
+def iter_rows(channels, chunk_size=CHUNK_SIZE):
+    """Каналы -> dict'ы FIELDS (+ history, если она подгружена)"""
+    for channel in channels.iterator(chunk_size=chunk_size):
+        row = {
+            field: getattr(channel, ATTRS.get(field, field))
+            for field in FIELDS
+        }
+        if hasattr(channel, 'history'):
+            row['history'] = [
+                {
+                    'participants_count': stat.participants_count,
+                    'daily_growth': stat.daily_growth,
+                    'parsed_at': stat.parsed_at,
+                }
+                for stat in channel.history
+            ]
+        yield row
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, history=False):
+    writer = csv.writer(_Echo())
+    header = list(FIELDS) + (['history'] if history else [])
+    yield writer.writerow(header)
+    for row in rows:
+        values = [row[field] for field in FIELDS]
+        if history:
+            values.append(json.dumps(row['history'], cls=DjangoJSONEncoder))
+        yield writer.writerow(values)
+
+
+def jsonl_lines(rows, history=False):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеить мелкие строки в куски ~size байт"""
+    parts, length = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(parts)
+            parts, length = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def gzipped(chunks, level=6):
+    """Сжать поток байтов в gzip без накопления в памяти"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(fmt='csv', group=None, category=None, history=False,
+                  compress=False, chunk_size=CHUNK_SIZE):
+    """Выгрузка как генератор кусков байтов"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+    rows = iter_rows(export_queryset(group, category, history), chunk_size)
+    encode = csv_lines if fmt == 'csv' else jsonl_lines
+    chunks = buffered(encode(rows, history))
+    return gzipped(chunks) if compress else chunks
@@ -1,7 +1,13 @@
 from django import forms
+from .categories import category_choices
 from .models import TelegramChannel
 
 
+def _category_choices():
+    # Вызывается при каждом создании формы, справочник берётся из кэша процесса
+    return [('', 'Выберите категорию...')] + category_choices()
+
+
 class ChannelParseForm(forms.Form):
     channel_identifier = forms.CharField(
         label='ID канала username или ссылка',
@@ -13,33 +19,10 @@ class ChannelParseForm(forms.Form):
         })
     )
     
-    category = forms.ChoiceField(
+    category = forms.TypedChoiceField(
         required=True,
-        choices=[('Выберите категорию...' ,'Выберите категорию...',), ('Все категории', 'Все категории',),
-                 ('Новости и СМИ' ,'Новости и СМИ',), ('Юмор и развлечения', 'Юмор и развлечения',),
-                 ('Технологии' ,'Технологии',), ('Экономика', 'Экономика',),
-                 ('Бизнес и стартапы' ,'Бизнес и стартапы',), ('Криптовалюты', 'Криптовалюты',),
-                 ('Путешествия' ,'Путешествия',), ('Маркетинг, PR, реклама', 'Маркетинг, PR, реклама',),
-                 ('Психология' ,'Психология',), ('Дизайн', 'Дизайн',),
-                 ('Политика' ,'Политика',), ('Искусство', 'Искусство',),
-                 ('Право' ,'Право',), ('Образование', 'Образование',),
-                 ('Книги' ,'Книги',), ('Лингвистика', 'Лингвистика',),
-                 ('Карьера' ,'Карьера',), ('Познавательное', 'Познавательное',),
-                 ('Курсы и гайды' ,'Курсы и гайды',), ('Авто', 'Авто',),
-                 ('Спорт' ,'Спорт',), ('Мода и красота', 'Мода и красота',),
-                 ('Здоровье и Фитнес' ,'Здоровье и Фитнес',), ('Медицина', 'Медицина',),
-                 ('Картинки и фото' ,'Картинки и фото',), ('Софт и приложения', 'Софт и приложения',),
-                 ('Видео и фильмы' ,'Видео и фильмы',), ('Музыка', 'Музыка',),
-                 ('Игры' ,'Игры',), ('Еда и кулинария', 'Еда и кулинария',),
-                 ('Цитаты' ,'Цитаты',), ('Рукоделие', 'Рукоделие',),
-                 ('Семья и дети' ,'Семья и дети',), ('Природа', 'Природа',),
-                 ('Интерьер и строительство' ,'Интерьер и строительство',), ('Telegram', 'Telegram',),
-                 ('Инстаграм' ,'Инстаграм',), ('Продажи', 'Продажи',),
-                 ('Транспорт' ,'Транспорт',), ('Религия', 'Религия',),
-                 ('Эзотерика' ,'Эзотерика',), ('Даркнет', 'Даркнет',),
-                 ('Букмекерство' ,'Букмекерство',), ('Шок-контент', 'Шок-контент',),
-                 ('Эротика' ,'Эротика',), ('Для взрослых', 'Для взрослых',),
-                 ('Другое', 'Другое',)],
+        coerce=int,
+        choices=_category_choices,
         label='Категория канала',
         widget=forms.Select(
             attrs={
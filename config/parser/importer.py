@@ -0,0 +1,264 @@
+"""
+Bulk import of channels from CSV / JSON Lines lists.
+
+Import runs in two stages:
+
+1. The file is streamed in batches. Identifiers are normalised to
+   usernames, de-duplicated within the file and against the database
+   (one query per batch) and stored as placeholder rows: TelegramChannel
+   with channel_id = NULL and the category, country and language from
+   the file.
+2. Placeholders are resolved through tg_parser by a fixed pool of
+   asyncio workers sharing one Telegram client. The queue between the
+   database reader and the workers is bounded, so no more than
+   ~2 * concurrency channels are in flight at any time.
+
+Every outcome (created, duplicate, invalid, resolved, failed) is written
+to a CSV report as soon as it happens.
+"""
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import re
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from . import categories, metrics
+from .avatars import process_photo
+from .client import get_telegram_client
+from .models import TelegramChannel
+from .parser import tg_parser
+from .tasks import save_channel_data, save_channel_stats
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CONCURRENCY = 5
+PROGRESS_EVERY = 100
+
+# @name, name, t.me/name, https://t.me/name/123
+USERNAME_RE = re.compile(
+    r'^(?:https?://)?(?:www\.)?(?:t\.me/|telegram\.me/)?@?([A-Za-z][A-Za-z0-9_]{3,31})(?:/\d*)?/?$'
+)
+
+
+class ImportReport:
+    """
+    CSV отчёт об импорте: строка на каждый канал + счётчики статусов.
+    append=True дописывает в существующий отчёт (этап 2 в Celery).
+    """
+
+    def __init__(self, path=None, progress=None, append=False):
+        self.counts = Counter()
+        self.progress = progress
+        self._file = (
+            open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+            if path else None
+        )
+        self._writer = csv.writer(self._file) if self._file else None
+        if self._writer and not self._file.tell():
+            self._writer.writerow(['identifier', 'status', 'detail'])
+
+    def add(self, identifier, status, detail=''):
+        self.counts[status] += 1
+        if self._writer:
+            self._writer.writerow([identifier, status, detail])
+            self._file.flush()
+        total = self.counts.total()
+        if self.progress and total % PROGRESS_EVERY == 0:
+            self.progress(self.summary())
+
+    def summary(self):
+        return ' | '.join(f'{k}: {v}' for k, v in sorted(self.counts.items()))
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def normalize_username(identifier):
+    """Username канала в нижнем регистре или None, если это не username"""
+    match = USERNAME_RE.match((identifier or '').strip())
+    return match.group(1).lower() if match else None
+
+
+def read_rows(path, fmt=None):
+    """
+    Строки файла как dict'ы. Формат берётся из расширения (.csv, .jsonl,
+    в т.ч. .gz), идентификатор — из колонки identifier или username.
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = fmt or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {
+                    'identifier': f'<строка {number}>', 'error': 'битый JSON',
+                }
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def create_placeholders(rows, report, batch_size=BATCH_SIZE):
+    """
+    Этап 1: заготовки каналов. Память — одна пачка строк и множество
+    уже встреченных в файле usernames. Возвращает число созданных строк.
+    """
+    seen = set()
+    created = 0
+    for batch in _batches(rows, batch_size):
+        # новые категории из файла попадают в справочник
+        category_ids = categories.category_ids(
+            (row.get('category') for row in batch), create=True
+        )
+        fresh = {}
+        for row in batch:
+            identifier = row.get('identifier') or row.get('username') or ''
+            if row.get('error'):
+                report.add(identifier, 'invalid', row['error'])
+                continue
+            username = normalize_username(identifier)
+            if username is None:
+                report.add(
+                    identifier, 'invalid', 'не похоже на username канала'
+                )
+            elif username in seen:
+                report.add(identifier, 'duplicate', 'повтор в файле')
+            else:
+                seen.add(username)
+                fresh[username] = row
+
+        # LOWER(username) IN (...) идёт по индексу channel_username_lower_idx
+        existing = set(
+            TelegramChannel.objects.annotate(lower_username=Lower('username'))
+            .filter(lower_username__in=list(fresh))
+            .values_list('lower_username', flat=True)
+        )
+        placeholders = []
+        for username, row in fresh.items():
+            if username in existing:
+                report.add(username, 'duplicate', 'уже в базе')
+                continue
+            placeholders.append(TelegramChannel(
+                username=username,
+                title=username,
+                category_id=category_ids.get(
+                    (row.get('category') or '').strip()
+                ),
+                country=row.get('country') or None,
+                language=row.get('language') or None,
+            ))
+        # Заготовки в подборки не входят: их туда добавит post_save
+        # в save_resolved, когда канал найдётся
+        TelegramChannel.objects.bulk_create(placeholders, batch_size=batch_size)
+        for channel in placeholders:
+            report.add(channel.username, 'created')
+        created += len(placeholders)
+    return created
+
+
+def _unresolved_page(after_pk, size):
+    return list(
+        TelegramChannel.objects
+        .filter(channel_id__isnull=True, pk__gt=after_pk)
+        .order_by('pk')
+        .values_list('pk', 'username')[:size]
+    )
+
+
+def save_resolved(pk, data):
+    """Записать данные парсера в заготовку; ValueError — канал не найден"""
+    if not data.get('channel_id') or not data.get('title'):
+        raise ValueError('канал не найден или недоступен')
+    if TelegramChannel.objects.filter(channel_id=data['channel_id']).exists():
+        # Тот же канал уже есть под другим идентификатором
+        TelegramChannel.objects.filter(pk=pk).delete()
+        raise ValueError(f'канал {data["channel_id"]} уже в базе')
+    with transaction.atomic():
+        channel = TelegramChannel.objects.get(pk=pk)
+        channel.channel_id = data['channel_id']
+        if data.get('username') and data['username'] != '-':
+            channel.username = data['username']
+        save_channel_data(channel, data)
+        save_channel_stats(channel, data)
+
+
+async def resolve_placeholders(client, report, concurrency=CONCURRENCY,
+                               limit=10, batch_size=BATCH_SIZE):
+    """
+    Этап 2: найти заготовки в Telegram. concurrency воркеров читают из
+    ограниченной очереди, так что одновременно в работе не больше
+    ~2 * concurrency каналов независимо от размера импорта.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            pk, username = item
+            try:
+                data = await tg_parser(username, client, limit)
+                await process_photo(data)
+                await sync_to_async(save_resolved)(pk, data)
+            except (ValueError, IntegrityError) as e:
+                report.add(username, 'failed', str(e))
+            except Exception as e:
+                log.error('Import of %s failed: %s', username, e, exc_info=True)
+                report.add(username, 'failed', repr(e))
+            else:
+                report.add(username, 'resolved')
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    # Заготовки, которые не удалось найти, остаются; идём по pk, чтобы
+    # не выбирать их повторно в этом же проходе
+    last_pk = 0
+    while True:
+        page = await sync_to_async(_unresolved_page)(last_pk, batch_size)
+        if not page:
+            break
+        for item in page:
+            await queue.put(item)
+        last_pk = page[-1][0]
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+
+def resolve_all(report, concurrency=CONCURRENCY, limit=10):
+    """Синхронная обёртка этапа 2 для команды и Celery"""
+    async def run():
+        client = get_telegram_client()
+        await client.connect()
+        try:
+            await resolve_placeholders(client, report, concurrency, limit)
+        finally:
+            await client.disconnect()
+
+    try:
+        asyncio.run(run())
+    finally:
+        metrics.flush()
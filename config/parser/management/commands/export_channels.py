@@ -0,0 +1,61 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.group_channels.models import Group
+from config.parser import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоковая выгрузка каналов с последней статистикой в CSV или JSONL.\n"
+        "Память не растёт с количеством строк: каналы читаются пачками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(export.FORMATS), default="csv",
+            help="Формат выгрузки (по умолчанию csv).",
+        )
+        parser.add_argument("--group", help="Slug подборки.")
+        parser.add_argument("--category", help="Категория каналов.")
+        parser.add_argument(
+            "--history", action="store_true",
+            help="Добавить историю статистики каждого канала.",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Сжать выгрузку в gzip.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=export.CHUNK_SIZE,
+            help="Сколько каналов читать из БД за раз.",
+        )
+        parser.add_argument(
+            "-o", "--output", help="Файл выгрузки (по умолчанию stdout).",
+        )
+
+    def handle(self, *args, **options):
+        group = None
+        if options["group"]:
+            group = (
+                Group.objects.select_related("auto_rule")
+                .filter(slug=options["group"]).first()
+            )
+            if group is None:
+                raise CommandError(f"Подборка {options['group']} не найдена")
+
+        chunks = export.stream_export(
+            options["format"], group, options["category"], options["history"],
+            compress=options["gzip"], chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as f:
+                size = sum(f.write(chunk) for chunk in chunks)
+            self.stderr.write(self.style.SUCCESS(
+                f"Выгружено в {options['output']}: {size} байт"
+            ))
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
@@ -0,0 +1,85 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.parser import importer
+from config.parser.tasks import resolve_imported_channels
+
+
+class Command(BaseCommand):
+    help = (
+        "Импорт списка каналов из CSV/JSONL (identifier или username, "
+        "category, country, language).\n"
+        "Файл читается потоком, дубликаты отсекаются одним запросом на пачку, "
+        "заготовки каналов создаются bulk_create и затем находятся в Telegram "
+        "ограниченным пулом параллельных запросов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv / .jsonl (можно .gz).")
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"],
+            help="Формат файла, если его не видно по расширению.",
+        )
+        parser.add_argument(
+            "--report", default="import_report.csv",
+            help=(
+                "CSV-отчёт: статус по каждому каналу "
+                "(по умолчанию import_report.csv)."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=importer.BATCH_SIZE,
+            help="Размер пачки чтения и вставки.",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=importer.CONCURRENCY,
+            help="Сколько каналов парсить одновременно.",
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--no-resolve", action="store_true",
+            help="Только создать заготовки, без запросов в Telegram.",
+        )
+        mode.add_argument(
+            "--celery", action="store_true",
+            help=(
+                "Поставить поиск заготовок в очередь Celery; воркер "
+                "допишет результаты в тот же отчёт (путь должен быть "
+                "доступен воркеру)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency должен быть не меньше 1")
+
+        report = importer.ImportReport(
+            options["report"], progress=self.stdout.write
+        )
+        try:
+            try:
+                rows = importer.read_rows(options["path"], options["format"])
+                created = importer.create_placeholders(
+                    rows, report, options["batch_size"]
+                )
+            except OSError as e:
+                raise CommandError(f"Не удалось прочитать файл: {e}")
+            self.stdout.write(
+                f"Создано заготовок: {created} ({report.summary()})"
+            )
+
+            if options["celery"]:
+                resolve_imported_channels.delay(
+                    options["concurrency"],
+                    report_path=os.path.abspath(options["report"]),
+                )
+                self.stdout.write("Поиск каналов поставлен в очередь Celery")
+            elif not options["no_resolve"]:
+                importer.resolve_all(report, options["concurrency"])
+        finally:
+            report.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {report.summary()}. Отчёт: {options['report']}"
+        ))
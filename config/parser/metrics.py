@@ -0,0 +1,223 @@
+"""
+Parser telemetry.
+
+Counters and histograms for parse_channel: Telegram RPC latency by
+method, FloodWait errors and the seconds Telegram asked to wait, time
+spent writing the result to the database, time a task waited in the
+Celery queue and the whole parse. Telethon sleeps through short FloodWaits
+itself (flood_sleep_threshold), so those show up as RPC latency rather
+than as FloodWait errors.
+
+Every process (Celery prefork children, the import command, web workers)
+collects observations in memory and adds them to shared counters in the
+cache (Redis in production, see config/counters.py) — every FLUSH_EVERY
+observations and at the end of each task. render() reads the shared counters and
+returns them in the Prometheus text format; MetricsView serves it.
+"""
+import threading
+import time
+from collections import Counter as _Counter
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from telethon.errors import FloodWaitError
+
+from config import counters
+
+PREFIX = 'tgms_parser_'
+# registry of series names in config/counters.py
+SERIES = 'metrics:series'
+# how many observations to collect in process before writing them to the cache
+FLUSH_EVERY = 100
+
+REGISTRY = []
+
+_lock = threading.Lock()
+_pending = _Counter()
+_observations = 0
+
+
+def _escape(value):
+    value = str(value).replace('\\', r'\\').replace('"', r'\"')
+    return value.replace('\n', r'\n')
+
+
+def _series(name, labels):
+    """Имя ряда в формате Prometheus: name{label="value",...}"""
+    if not labels:
+        return name
+    pairs = ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return f'{name}{{{pairs}}}'
+
+
+def _add(series, fields):
+    global _observations
+    with _lock:
+        for field, value in fields.items():
+            _pending[(series, field)] += value
+        _observations += 1
+        due = _observations >= FLUSH_EVERY
+    if due:
+        flush()
+
+
+class Counter:
+    """Монотонный счётчик; дробные значения хранятся в микро-единицах"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def inc(self, value=1, **labels):
+        _add(_series(self.name, labels), {'value': int(value * 1e6)})
+
+    def fields(self):
+        return ('value',)
+
+    def samples(self, series, values):
+        yield series, values.get('value', 0) / 1e6
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (секунды)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if value <= bound),
+            len(self.buckets),
+        )
+        _add(_series(self.name, labels), {
+            f'b{index}': 1, 'sum': int(value * 1e6), 'count': 1,
+        })
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def fields(self):
+        return (
+            *(f'b{i}' for i in range(len(self.buckets) + 1)), 'sum', 'count',
+        )
+
+    def samples(self, series, values):
+        # series: name{labels} -> name_bucket{labels,le="..."}
+        name, _, labels = series.partition('{')
+        labels = labels.rstrip('}')
+        prefix = f'{labels},' if labels else ''
+        cumulative = 0
+        bounds = [*(f'{b:g}' for b in self.buckets), '+Inf']
+        for i, bound in enumerate(bounds):
+            cumulative += values.get(f'b{i}', 0)
+            yield f'{name}_bucket{{{prefix}le="{bound}"}}', cumulative
+        suffix = f'{{{labels}}}' if labels else ''
+        yield f'{name}_sum{suffix}', values.get('sum', 0) / 1e6
+        yield f'{name}_count{suffix}', values.get('count', 0)
+
+
+RPC_SECONDS = Histogram(
+    'rpc_seconds', 'Telegram RPC latency by method.',
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60), labels=('method',),
+)
+FLOOD_WAITS = Counter(
+    'flood_waits_total', 'FloodWait errors by method.', labels=('method',),
+)
+FLOOD_WAIT_SECONDS = Counter(
+    'flood_wait_seconds_total', 'Seconds Telegram asked to wait, by method.',
+    labels=('method',),
+)
+PERSIST_SECONDS = Histogram(
+    'persist_seconds', 'Time to save parsed channel data and stats.',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'queue_wait_seconds', 'Time parse_channel waited in the Celery queue.',
+    (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+PARSE_SECONDS = Histogram(
+    'parse_seconds', 'End-to-end parse_channel duration by status.',
+    (1, 2, 5, 10, 20, 30, 60, 120, 300, 600), labels=('status',),
+)
+
+
+@contextmanager
+def rpc(method):
+    """Замерить вызов Telegram API; FloodWaitError считается и пробрасывается"""
+    start = time.perf_counter()
+    try:
+        yield
+    except FloodWaitError as e:
+        FLOOD_WAITS.inc(method=method)
+        FLOOD_WAIT_SECONDS.inc(e.seconds, method=method)
+        raise
+    finally:
+        RPC_SECONDS.observe(time.perf_counter() - start, method=method)
+
+
+def _key(series, field):
+    return f'metrics:{series}:{field}'
+
+
+def flush():
+    """Записать наблюдения процесса в общий кэш"""
+    global _observations
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _observations = 0
+    counters.add({_key(*key): value for key, value in pending.items()})
+    counters.register(SERIES, sorted({series for series, _ in pending}))
+
+
+def render():
+    """Все метрики всех процессов в текстовом формате Prometheus"""
+    flush()
+    names = counters.names(SERIES)
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        own = [
+            s for s in names
+            if s == metric.name or s.startswith(metric.name + '{')
+        ]
+        keys = [_key(s, field) for s in own for field in metric.fields()]
+        values = cache.get_many(keys)
+        for series in own:
+            fields = {
+                field: values.get(_key(series, field), 0)
+                for field in metric.fields()
+            }
+            for sample, value in metric.samples(series, fields):
+                lines.append(f'{sample} {value!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+    names = counters.clear(SERIES)
+    keys = [
+        _key(series, field)
+        for series in names
+        for metric in REGISTRY
+        if series == metric.name or series.startswith(metric.name + '{')
+        for field in metric.fields()
+    ]
+    cache.delete_many(keys)
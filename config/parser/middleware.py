@@ -0,0 +1,15 @@
+from config.parser.permissions import attach
+
+
+class ChannelPermissionsMiddleware:
+    """
+    request.channel_perms: права модератора на каналы, загружаются
+    при первом обращении
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        attach(request)
+        return self.get_response(request)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:26
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_daily_growth(apps, schema_editor):
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+    ChannelStats = apps.get_model('parser', 'ChannelStats')
+    latest = (
+        ChannelStats.objects
+        .filter(channel=OuterRef('pk'))
+        .order_by('-parsed_at')
+        .values('daily_growth')[:1]
+    )
+    TelegramChannel.objects.update(daily_growth=Coalesce(Subquery(latest), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0003_alter_telegramchannel_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramchannel',
+            name='daily_growth',
+            field=models.IntegerField(default=0, verbose_name='Прирост за день'),
+        ),
+        migrations.RunPython(fill_daily_growth, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='telegramchannel',
+            index=models.Index(fields=['-participants_count', '-id'], name='channel_subscribers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramchannel',
+            index=models.Index(fields=['-daily_growth', '-id'], name='channel_growth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramchannel',
+            index=models.Index(fields=['category', '-participants_count', '-id'], name='channel_cat_subscribers_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0004_telegramchannel_daily_growth_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramchannel',
+            name='channel_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True, verbose_name='ID канала'),
+        ),
+    ]
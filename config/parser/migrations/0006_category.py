@@ -0,0 +1,96 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Категории из прежнего списка choices ChannelParseForm
+DEFAULT_CATEGORIES = [
+    'Новости и СМИ', 'Юмор и развлечения', 'Технологии', 'Экономика',
+    'Бизнес и стартапы', 'Криптовалюты', 'Путешествия',
+    'Маркетинг, PR, реклама', 'Психология', 'Дизайн', 'Политика',
+    'Искусство', 'Право', 'Образование', 'Книги', 'Лингвистика', 'Карьера',
+    'Познавательное', 'Курсы и гайды', 'Авто', 'Спорт', 'Мода и красота',
+    'Здоровье и Фитнес', 'Медицина', 'Картинки и фото', 'Софт и приложения',
+    'Видео и фильмы', 'Музыка', 'Игры', 'Еда и кулинария', 'Цитаты',
+    'Рукоделие', 'Семья и дети', 'Природа', 'Интерьер и строительство',
+    'Telegram', 'Инстаграм', 'Продажи', 'Транспорт', 'Религия', 'Эзотерика',
+    'Даркнет', 'Букмекерство', 'Шок-контент', 'Эротика', 'Для взрослых',
+    'Другое',
+]
+
+
+def fill_categories(apps, schema_editor):
+    Category = apps.get_model('parser', 'Category')
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+
+    Category.objects.bulk_create(
+        [
+            Category(name=name, order=(i + 1) * 10)
+            for i, name in enumerate(DEFAULT_CATEGORIES)
+        ],
+        ignore_conflicts=True,
+    )
+    raw_names = [
+        name for name in
+        TelegramChannel.objects.values_list('category', flat=True).distinct()
+        if name and name.strip()
+    ]
+    Category.objects.bulk_create(
+        [Category(name=name, order=1000) for name in sorted({n.strip() for n in raw_names})],
+        ignore_conflicts=True,
+    )
+    ids = dict(Category.objects.values_list('name', 'pk'))
+    # Один UPDATE на значение категории, а не на канал
+    for raw in raw_names:
+        TelegramChannel.objects.filter(category=raw).update(category_ref=ids[raw.strip()])
+
+
+def fill_category_names(apps, schema_editor):
+    Category = apps.get_model('parser', 'Category')
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+    for pk, name in Category.objects.values_list('pk', 'name'):
+        TelegramChannel.objects.filter(category_ref=pk).update(category=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0005_alter_telegramchannel_channel_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Название')),
+                ('order', models.PositiveSmallIntegerField(default=0, verbose_name='Порядок')),
+            ],
+            options={
+                'verbose_name': 'Категория',
+                'verbose_name_plural': 'Категории',
+                'ordering': ['order', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='telegramchannel',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='channels', to='parser.category', verbose_name='Категория канала'),
+        ),
+        migrations.RunPython(fill_categories, fill_category_names),
+        migrations.RemoveIndex(
+            model_name='telegramchannel',
+            name='channel_cat_subscribers_idx',
+        ),
+        migrations.RemoveField(
+            model_name='telegramchannel',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='telegramchannel',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AddIndex(
+            model_name='telegramchannel',
+            index=models.Index(fields=['category', '-participants_count', '-id'], name='channel_cat_subscribers_idx'),
+        ),
+    ]
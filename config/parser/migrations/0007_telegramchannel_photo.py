@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0006_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramchannel',
+            name='photo_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='ID фото'),
+        ),
+        migrations.AddField(
+            model_name='telegramchannel',
+            name='photo_thumbs',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Миниатюры фото'),
+        ),
+    ]
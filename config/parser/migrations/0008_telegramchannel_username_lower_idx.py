@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:07
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0007_telegramchannel_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telegramchannel',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='channel_username_lower_idx'),
+        ),
+    ]
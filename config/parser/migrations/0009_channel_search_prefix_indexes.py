@@ -0,0 +1,50 @@
+"""
+Prefix indexes for the channel search of group pages
+(group_channels.services.search_free_channels).
+
+On PostgreSQL username__istartswith / title__istartswith compile to
+UPPER("col"::text) LIKE UPPER('abc%'). A btree over the same expression
+with text_pattern_ops serves such a LIKE as an index range scan
+whatever the database collation; UPPER() returns text, hence text_ rather
+than varchar_pattern_ops. The indexes are built CONCURRENTLY so the
+channel table stays writable, which needs a non-atomic migration.
+
+SQLite (development, tests) has no operator classes and its LIKE is
+case-insensitive by itself, so nothing is created there.
+"""
+from django.db import migrations
+
+INDEXES = (
+    ('channel_username_upper_prefix_idx', 'username'),
+    ('channel_title_upper_prefix_idx', 'title'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "parser_telegramchannel" '
+            f'(UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('parser', '0008_telegramchannel_username_lower_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
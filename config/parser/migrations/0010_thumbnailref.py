@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_refs(apps, schema_editor):
+    TelegramChannel = apps.get_model('parser', 'TelegramChannel')
+    ThumbnailRef = apps.get_model('parser', 'ThumbnailRef')
+    counts = Counter()
+    thumbs = TelegramChannel.objects.exclude(photo_thumbs={}).values_list(
+        'photo_thumbs', flat=True
+    )
+    for value in thumbs.iterator(chunk_size=2000):
+        counts.update((value or {}).values())
+    ThumbnailRef.objects.bulk_create(
+        [ThumbnailRef(ref=ref, count=count) for ref, count in counts.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0009_channel_search_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailRef',
+            fields=[
+                ('ref', models.CharField(max_length=80, primary_key=True, serialize=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ссылки на миниатюру',
+                'verbose_name_plural': 'Ссылки на миниатюры',
+            },
+        ),
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+    ]
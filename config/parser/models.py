@@ -1,28 +1,116 @@
 from django.db import models
+from django.db.models.functions import Lower
+
+from config import media
+from config.cache import InvalidatingQuerySet
 from config.users.models import User
 
 
+class Category(models.Model):
+    """
+    Справочник категорий каналов: каналы и автоподборки ссылаются
+    на него по ключу
+    """
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(
+        max_length=255, unique=True, verbose_name='Название'
+    )
+    order = models.PositiveSmallIntegerField(default=0, verbose_name='Порядок')
+
+    class Meta:
+        verbose_name = 'Категория'
+        verbose_name_plural = 'Категории'
+        ordering = ['order', 'name']
+
+    def __str__(self):
+        return self.name
+
+
+class TelegramChannelQuerySet(InvalidatingQuerySet):
+
+    def resolved(self):
+        """Без заготовок import_channels, ещё не найденных в Telegram"""
+        return self.filter(channel_id__isnull=False)
+
+
 class TelegramChannel(models.Model):
-    channel_id = models.BigIntegerField(unique=True, verbose_name='ID канала')
+    # NULL — заготовка из import_channels, ещё не найденная в Telegram
+    channel_id = models.BigIntegerField(
+        unique=True, null=True, blank=True, verbose_name='ID канала'
+    )
     # invite_link = models.URLField(max_length=255, blank=True, null=True, verbose_name='Инвайт ссылка')
     username = models.CharField(max_length=255, blank=True, null=True, verbose_name='Username')
     title = models.CharField(max_length=255, verbose_name='Название канала')
     description = models.TextField(blank=True, null=True, verbose_name='Описание канала')
     # linked_chat_id = models.BigIntegerField(blank=True, null=True, verbose_name='ID чата канала')
     participants_count = models.IntegerField(default=0, verbose_name='Количество подписчиков')
-    # photo_url = models.URLField(max_length=512, blank=True, null=True, verbose_name='Ссылка на фото')
+    # id фото в Telegram: фото скачивается заново, только когда он меняется
+    photo_id = models.BigIntegerField(
+        blank=True, null=True, verbose_name='ID фото'
+    )
+    # {'64': ссылка, '320': ссылка} — WebP-миниатюры в config/media.py
+    photo_thumbs = models.JSONField(
+        blank=True, default=dict, verbose_name='Миниатюры фото'
+    )
     parsed_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата парсинга')
     pinned_messages = models.JSONField(blank=True, null=True, default=list, verbose_name='Закрепленное сообщение')
     creation_date = models.DateTimeField(null=True, blank=True, verbose_name='Дата создания')
     last_messages = models.JSONField(blank=True, null=True, default=list, verbose_name='Последние сообщения')
     average_views = models.IntegerField(default=0, verbose_name='Среднее количество просмотров')
-    category = models.CharField(blank=True, null=True, db_index=True, verbose_name='Категория канала')
+    daily_growth = models.IntegerField(
+        default=0, verbose_name='Прирост за день'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name='channels',
+        verbose_name='Категория канала',
+    )
     country = models.CharField(blank=True, null=True, verbose_name='Страна канала')
     language = models.CharField(blank=True, null=True, verbose_name='Язык канала')
 
+    objects = TelegramChannelQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Telegram канал'
         verbose_name_plural = 'Telegram каналы'
+        indexes = [
+            # keyset pagination of group pages by subscribers and growth
+            models.Index(
+                fields=['-participants_count', '-id'],
+                name='channel_subscribers_idx',
+            ),
+            models.Index(
+                fields=['-daily_growth', '-id'], name='channel_growth_idx'
+            ),
+            models.Index(
+                fields=['category', '-participants_count', '-id'],
+                name='channel_cat_subscribers_idx',
+            ),
+            # import_channels and ParserView look channels up by lower-cased
+            # username
+            models.Index(
+                Lower('username'), name='channel_username_lower_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Категория на момент загрузки: по ней пересчитываются автоподборки
+        instance._loaded_category = instance.__dict__.get('category_id')
+        instance._loaded_resolved = (
+            instance.__dict__.get('channel_id') is not None
+        )
+        # Миниатюры на момент загрузки: заменённые удаляются из хранилища
+        instance._loaded_thumbs = instance.__dict__.get('photo_thumbs')
+        return instance
+
+    def photo_url(self, size=64):
+        """URL миниатюры фото или пустая строка, если фото нет"""
+        return media.url((self.photo_thumbs or {}).get(str(size)))
 
     def last_stat(self):
         """Получение последней статистики канала"""
@@ -81,6 +169,8 @@ class ChannelStats(models.Model):
     daily_growth = models.IntegerField(default=0, verbose_name="Прирост за день")
     parsed_at = models.DateTimeField(auto_now_add=True)
 
+    objects = InvalidatingQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Статистика канала"
         verbose_name_plural = "Статистика каналов"
@@ -91,5 +181,23 @@ class ChannelStats(models.Model):
         return f"{self.channel} - {self.parsed_at}"
 
 
+class ThumbnailRef(models.Model):
+    """
+    Счётчик ссылок каналов на файл миниатюры в хранилище (config/media.py).
+    Файл удаляется, только когда счётчик дошёл до нуля; счётчик меняется
+    под блокировкой строки, поэтому удаление не теряет файл, который
+    параллельно сохраняет парсер для другого канала.
+    """
+    ref = models.CharField(max_length=80, primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Ссылки на миниатюру'
+        verbose_name_plural = 'Ссылки на миниатюры'
+
+    def __str__(self):
+        return f'{self.ref} ({self.count})'
+
+
 # Create your models here.
 
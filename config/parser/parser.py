@@ -1,7 +1,6 @@
 import asyncio
 import logging
 import random
-import time
 
 from telethon import TelegramClient
 from telethon.errors import (
@@ -13,19 +12,31 @@ from telethon.errors import (
 )
 from telethon.tl.functions.channels import GetFullChannelRequest
 
+from .metrics import rpc
+
 log = logging.getLogger(__name__)
 
+# pause before every channel, seconds
+ANTI_FLOOD_PAUSE = 1
+
 
-async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
+async def tg_parser(
+    url: str, client: TelegramClient, limit: int = 10,
+    photo_id: int | None = None,
+) -> dict:
     """
     Telegram channel parser function. Retrieves channel data including:
-    name, ID, description, subscriber count, pinned message, and recent posts.
+    name, ID, description, subscriber count, pinned message, recent posts
+    and profile photo.
 
     Parameters:
         url (str): URL of the Telegram channel in any valid format
                    (e.g., `https://t.me/example`, `t.me/example`, `@example`, `example`)
         client (TelegramClient): A Telegram client instance from the `telethon` library
         limit (int): Number of messages to parse (default: 10)
+        photo_id (int): Id of the already stored profile photo; the photo
+                        is downloaded (as bytes in data["photo"]) only when
+                        the channel's current photo id differs
 
     Returns:
         data (dict): A dictionary containing the parsed Telegram channel data
@@ -34,14 +45,17 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
         This function requires a registered Telegram API application to work.
     """
     data = {}
+    channel = None
     full_channel = None
     pinned_messages = None
 
     try:
-        # Anti-flood - remove when dedicated number is assigned
-        time.sleep(1)
+        # Anti-flood - remove when dedicated number is assigned.
+        # Non-blocking, so concurrent parses don't stall each other
+        await asyncio.sleep(ANTI_FLOOD_PAUSE)
         # Gets channel information
-        channel = await client.get_entity(url)
+        with rpc("get_entity"):
+            channel = await client.get_entity(url)
 
         data["title"] = channel.title  # Channel title
         data["channel_id"] = channel.id  # Channel id
@@ -51,7 +65,8 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
         data["creation_date"] = channel.date.isoformat() if channel.date else None
         # Fetches last channel posts
 
-        last_messages = await client.get_messages(channel, limit=limit * 3)
+        with rpc("get_messages"):
+            last_messages = await client.get_messages(channel, limit=limit * 3)
         # Calculates average views of recent posts
         data["last_messages"] = [
             {"post_id": post.id, "post_text": post.text, "post_views": post.views}
@@ -75,24 +90,25 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
         await asyncio.sleep(e.seconds + random.uniform(1.0, 2.0))
 
     except ChannelInvalidError:
-        log.warning(f"This channel is private or unavailable: {url}")
+        log.warning("This channel is private or unavailable: %s", url)
 
     except UsernameNotOccupiedError:
-        log.error(f"Username does not exist: {url}")
+        log.error("Username does not exist: %s", url)
 
     except AuthKeyError:
 
         log.critical("AUTH SESSION FAILURE")
 
     except Exception as e:
-        log.error(f"ERROR - {e}")
+        log.error("ERROR - %s", e)
 
 
 
     if channel:
         try:
             # Fetch complete channel information
-            full_channel = await client(GetFullChannelRequest(channel))
+            with rpc("GetFullChannelRequest"):
+                full_channel = await client(GetFullChannelRequest(channel))
 
         except FloodWaitError as e:
 
@@ -104,7 +120,7 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
             log.warning("Failed to access full channel information")
 
         except Exception as e:
-            log.error(f"ERROR - {e}")
+            log.error("ERROR - %s", e)
 
         if full_channel:
             # Fetching channel participants count
@@ -119,9 +135,10 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
             pinned_message_id = full_channel.full_chat.pinned_msg_id
             # Fetching pinned message
             if pinned_message_id:
-                pinned_messages = await client.get_messages(
-                    channel, ids=pinned_message_id
-                )
+                with rpc("get_messages"):
+                    pinned_messages = await client.get_messages(
+                        channel, ids=pinned_message_id
+                    )
             data["pinned_messages"] = [
                 {
                     "text": pinned_messages.message
@@ -131,5 +148,26 @@ async def tg_parser(url: str, client: TelegramClient, limit: int = 10) -> dict:
                 }
             ]
 
-    log.debug(f"Channel successfully parsed: {data}")
+        # Profile photo id comes with the entity, the photo itself is
+        # downloaded only when it changed
+        data["photo_id"] = getattr(
+            getattr(channel, "photo", None), "photo_id", None
+        )
+        if data["photo_id"] and data["photo_id"] != photo_id:
+            try:
+                with rpc("download_profile_photo"):
+                    data["photo"] = await client.download_profile_photo(
+                        channel, file=bytes, download_big=True
+                    )
+            except FloodWaitError as e:
+                log.error("Anti-flood triggered, waiting required")
+                await asyncio.sleep(e.seconds + random.uniform(1.0, 2.0))
+            except Exception as e:
+                log.error("ERROR - %s", e)
+
+    # only identifiers: the whole dict (posts, photo bytes) is too big to log
+    log.debug(
+        "Channel successfully parsed: %s (%s)",
+        data.get("username"), data.get("channel_id"),
+    )
     return data
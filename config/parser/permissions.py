@@ -0,0 +1,105 @@
+"""
+Права модераторов на каналы, загруженные одним запросом на запрос.
+
+ChannelModerator хранит флаги по паре (пользователь, канал). Вместо
+запроса на каждую проверку все права пользователя читаются один раз
+в словарь {id канала: битовая маска}; проверка — поиск в словаре и AND.
+Карта висит на request.channel_perms и загружается лениво, при первом
+обращении; пользователи без модераторских прав запроса не делают вовсе
+(флаг модератора берётся из кэша ролей).
+"""
+from django.utils.functional import SimpleLazyObject
+
+from config.users.roles import get_flags
+
+from .models import ChannelModerator
+
+VIEW = 1
+EDIT = 2
+DELETE = 4
+MANAGE_MODERATORS = 8
+OWNER = 16
+
+PERMISSIONS = {
+    'view': VIEW,
+    'edit': EDIT,
+    'delete': DELETE,
+    'manage_moderators': MANAGE_MODERATORS,
+    'owner': OWNER,
+}
+# владелец канала может всё
+OWNER_MASK = VIEW | EDIT | DELETE | MANAGE_MODERATORS | OWNER
+
+
+def to_mask(perm):
+    """'edit' / EDIT -> битовая маска"""
+    if isinstance(perm, int):
+        return perm
+    try:
+        return PERMISSIONS[perm]
+    except KeyError:
+        raise ValueError(f'Неизвестное право на канал: {perm}')
+
+
+class ChannelPermissions:
+    """Неизменяемая карта прав одного пользователя"""
+    __slots__ = ('_masks',)
+
+    def __init__(self, masks=None):
+        self._masks = masks or {}
+
+    @classmethod
+    def for_user(cls, user):
+        if (not user.is_authenticated
+                or not get_flags(user)['is_channel_moderator']):
+            return cls()
+        rows = ChannelModerator.objects.filter(user_id=user.pk).values_list(
+            'channel_id', 'is_owner', 'can_edit', 'can_delete',
+            'can_manage_moderators',
+        )
+        masks = {}
+        for channel_id, is_owner, can_edit, can_delete, can_manage in rows:
+            if is_owner:
+                masks[channel_id] = OWNER_MASK
+                continue
+            masks[channel_id] = (
+                VIEW
+                | (EDIT if can_edit else 0)
+                | (DELETE if can_delete else 0)
+                | (MANAGE_MODERATORS if can_manage else 0)
+            )
+        return cls(masks)
+
+    def has(self, channel_id, perm='view'):
+        mask = to_mask(perm)
+        return self._masks.get(channel_id, 0) & mask == mask
+
+    def channel_ids(self, perm='view'):
+        """id каналов, на которые у пользователя есть право"""
+        mask = to_mask(perm)
+        return [pk for pk, value in self._masks.items() if value & mask == mask]
+
+    def __contains__(self, channel_id):
+        return channel_id in self._masks
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __bool__(self):
+        return bool(self._masks)
+
+
+def attach(request):
+    """Повесить на запрос ленивую карту прав"""
+    request.channel_perms = SimpleLazyObject(
+        lambda: ChannelPermissions.for_user(request.user)
+    )
+    return request.channel_perms
+
+
+def get_channel_permissions(request):
+    """Карта прав запроса; работает и без ChannelPermissionsMiddleware"""
+    perms = getattr(request, 'channel_perms', None)
+    if perms is None:
+        perms = attach(request)
+    return perms
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.cache import invalidate_model
+
+from . import avatars, categories
+from .models import Category, ChannelStats, TelegramChannel
+
+
+@receiver(post_save, sender=TelegramChannel)
+@receiver(post_delete, sender=TelegramChannel)
+@receiver(post_save, sender=ChannelStats)
+@receiver(post_delete, sender=ChannelStats)
+def invalidate_channel_cache(sender, **kwargs):
+    """Drop cached channel lists, counts and fragments"""
+    invalidate_model(sender)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    """Drop category choices of this process and pages showing category names"""
+    categories.clear_cache()
+    invalidate_model(sender)
+
+
+@receiver(post_save, sender=TelegramChannel)
+def discard_replaced_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """Remove the thumbnails of a replaced photo from the media store"""
+    if update_fields is not None and 'photo_thumbs' not in update_fields:
+        return
+    loaded = getattr(instance, '_loaded_thumbs', None) or {}
+    current = instance.photo_thumbs or {}
+    instance._loaded_thumbs = dict(current)
+    stale = set(loaded.values()) - set(current.values())
+    if stale:
+        transaction.on_commit(lambda: avatars.discard_thumbnails(stale))
+
+
+@receiver(post_delete, sender=TelegramChannel)
+def discard_channel_thumbnails(sender, instance, **kwargs):
+    """Remove the thumbnails of a deleted channel from the media store"""
+    refs = list((instance.photo_thumbs or {}).values())
+    if refs:
+        transaction.on_commit(lambda: avatars.discard_thumbnails(refs))
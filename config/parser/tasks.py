@@ -5,12 +5,12 @@ import time
 
 from asgiref.sync import sync_to_async
 from celery import shared_task
-from django.conf import settings
 from django.db import DatabaseError, IntegrityError
 from django.utils import timezone
-from telethon import TelegramClient
-from telethon.sessions import StringSession
 
+from . import metrics
+from .avatars import photo_fields, process_photo
+from .client import get_telegram_client
 from .models import ChannelStats, TelegramChannel
 from .parser import tg_parser
 
@@ -18,41 +18,65 @@ log = logging.getLogger(__name__)
 
 
 @shared_task
-def parse_channel(channel_id):
-    """Celery task for channel parse"""
+def parse_channel(channel_id, enqueued_at=None):
+    """
+    Celery task for channel parse.
+    enqueued_at - time.time() when the task was queued, for queue wait metrics
+    """
+    started = time.perf_counter()
+    if enqueued_at is not None:
+        metrics.QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - enqueued_at))
+    status = 'error'
+    try:
+        status = _parse_channel(channel_id)
+    finally:
+        metrics.PARSE_SECONDS.observe(
+            time.perf_counter() - started, status=status
+        )
+        metrics.flush()
+
+
+def _parse_channel(channel_id):
+    """Parse and save one channel, returns status for metrics"""
     try:
         channel = TelegramChannel.objects.get(channel_id=channel_id)
     except TelegramChannel.DoesNotExist:
-        log.error(f"Channel with ID {channel_id} does not exist in database")
-        return
+        log.error("Channel with ID %s does not exist in database", channel_id)
+        return 'missing'
     except DatabaseError as e:
-        log.error(f'Database error while fetching channel -;'
-                  f'{channel_id} - {e}')
-        return
+        log.error('Database error while fetching channel -; %s - %s',
+                  channel_id, e)
+        return 'error'
 
     async def run_parser(channel_obj):
         """Secondary func for async parsing"""
-        async with TelegramClient(
-            StringSession(settings.TELEGRAM_SESSION_STRING),
-            settings.TELEGRAM_API_ID,
-            settings.TELEGRAM_API_HASH,
-        ) as client:
+        async with get_telegram_client() as client:
             try:
                 # make connection with Telegram
                 await client.connect()
-                data = await tg_parser(channel_obj.username, client)
+                data = await tg_parser(
+                    channel_obj.username, client, photo_id=channel_obj.photo_id
+                )
+                await process_photo(data)
                 # using sync_to_async to avoid Django ORM errors (cause ORM is sync)
-                await sync_to_async(save_channel_data)(channel_obj, data)
-                await sync_to_async(save_channel_stats)(channel_obj, data)
+                with metrics.PERSIST_SECONDS.time():
+                    await sync_to_async(save_channel_data)(channel_obj, data)
+                    await sync_to_async(save_channel_stats)(channel_obj, data)
             except (DatabaseError, IntegrityError) as e:
-                log.error(f'Database safe error for {channel_obj.username} - {e}')
+                log.error(
+                    'Database safe error for %s - %s', channel_obj.username, e
+                )
+                return 'db_error'
             except Exception as e:
-                log.error(f'Unexpected error: - {e}', exc_info=True)
+                log.error('Unexpected error: - %s', e, exc_info=True)
+                return 'error'
+        return 'ok'
 
     try:
-        asyncio.run(run_parser(channel))
+        return asyncio.run(run_parser(channel))
     except ConnectionError as e:
-        log.error(f"Connection failed for {channel_id}: {e}")
+        log.error("Connection failed for %s: %s", channel_id, e)
+        return 'connection_error'
 
 
 def save_channel_data(channel, data):
@@ -63,9 +87,11 @@ def save_channel_data(channel, data):
     channel.pinned_messages = data.get("pinned_messages", [])
     channel.last_messages = data.get("last_messages", [])
     channel.average_views = data.get("average_views", 0)
+    for field, value in photo_fields(data).items():
+        setattr(channel, field, value)
     channel.parsed_at = timezone.now()
     channel.save()
-    log.info(f"Data from channel {channel.title} successfully saved")
+    log.info("Data from channel %s successfully saved", channel.title)
 
 
 def save_channel_stats(channel, data):
@@ -88,25 +114,49 @@ def save_channel_stats(channel, data):
         daily_growth=daily_growth,
         parsed_at=current_date,
     )
+    # growth is kept on the channel too, for sorting group pages
+    channel.daily_growth = daily_growth
+    channel.save(update_fields=["daily_growth"])
     log.info(
-        f"Stats for channel {channel.title} saved: participants={current_count}, growth={daily_growth}"
+        "Stats for channel %s saved: participants=%s, growth=%s",
+        channel.title, current_count, daily_growth,
     )
 
 
 @shared_task
 def parse_all_channels():
     """Task for Celery: parse all channels from database"""
-    channels = TelegramChannel.objects.all()
+    # placeholders from import_channels are resolved by
+    # resolve_imported_channels
+    channels = TelegramChannel.objects.filter(channel_id__isnull=False)
     if not channels:
         log.warning("There are no channels")
         return
 
     for channel in channels:
         # start task for parsing
-        parse_channel.delay(channel.channel_id)
+        parse_channel.delay(channel.channel_id, enqueued_at=time.time())
         # add pause between parsing, 15s + random value
         pause = 15 + random.uniform(0, 5)
         log.info(
-            f"Started task for channel {channel.channel_id}, next one in {pause:.2f} s"
+            "Started task for channel %s, next one in %.2f s",
+            channel.channel_id, pause,
         )
         time.sleep(pause)
+
+
+@shared_task
+def resolve_imported_channels(concurrency=5, report_path=None):
+    """
+    Task for Celery: resolve placeholders created by import_channels,
+    appending the outcomes to the report at report_path
+    """
+    from .importer import ImportReport, resolve_all
+
+    report = ImportReport(report_path, append=True)
+    try:
+        resolve_all(report, concurrency)
+    finally:
+        report.close()
+    log.info("Imported channels resolved: %s", report.summary())
+    return dict(report.counts)
@@ -0,0 +1,20 @@
+from django import template
+
+from config.parser.permissions import get_channel_permissions
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def channel_can(context, channel, perm='view'):
+    """
+    {% channel_can channel "edit" as can_edit %}
+    channel — объект канала или его id. Проверка идёт по карте прав
+    запроса, так что список из сотен каналов не делает запросов в БД.
+    Модерируется ли канал вообще: {% if channel.pk in request.channel_perms %}
+    """
+    request = context.get('request')
+    if request is None:
+        return False
+    channel_id = getattr(channel, 'pk', channel)
+    return get_channel_permissions(request).has(channel_id, perm)
@@ -7,5 +7,7 @@ app_name = 'parser'
 urlpatterns = [
     path('', views.ParserView.as_view(), name='parser'),
     path('list', views.ParserListView.as_view(), name='list'),
+    path('export/', views.ChannelExportView.as_view(), name='export'),
+    path('metrics', views.MetricsView.as_view(), name='metrics'),
     path('<int:pk>/', views.ParserDetailView.as_view(), name='detail'),
 ]
\ No newline at end of file
@@ -1,17 +1,31 @@
 import logging
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 from django.contrib import messages
-from django.core.exceptions import ImproperlyConfigured
-
+from django.db.models import Count, Max
+from django.db.models.functions import Lower
+from django.forms.models import model_to_dict
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.views.generic import DetailView, FormView, ListView
-from telethon import TelegramClient
-from telethon.sessions import StringSession
-
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.generic import DetailView, FormView, ListView, View
+
+from config import cache
+from config.group_channels.models import Group
+from config.mixins import (
+    ConditionalGetMixin,
+    StaffOnlyMixin,
+    StaffRequiredMixin,
+)
+from config.parser import export, metrics
+from config.parser.avatars import photo_fields, process_photo
+from config.parser.client import get_telegram_client
 from config.parser.forms import ChannelParseForm
+from config.parser.importer import normalize_username
 from config.parser.models import ChannelStats, TelegramChannel
 from config.parser.parser import tg_parser
 
@@ -29,28 +43,36 @@ class ParserView(FormView):
 
     def get_telegram_client(self):
         """Get Telegram client for parser work"""
-        if not settings.TELEGRAM_SESSION_STRING:
-            raise ImproperlyConfigured(
-                'TELEGRAM_SESSION_STRING\
-                    (needed by Telethon to parse data from Telegram)\
-                        is not set. Please run\
-                            `uv run python3 manage.py set_sessions_string`'
-            )
-        return TelegramClient(
-            StringSession(settings.TELEGRAM_SESSION_STRING),
-            settings.TELEGRAM_API_ID,
-            settings.TELEGRAM_API_HASH,
-        )
+        return get_telegram_client()
 
     async def async_tg_parser(self, url, limit=10):
         """Parser wrapper"""
+        photo_id = await sync_to_async(self.stored_photo_id)(url)
         client = self.get_telegram_client()
         await client.connect()
         try:
-            return await tg_parser(url, client, limit)
+            data = await tg_parser(url, client, limit, photo_id=photo_id)
+            await process_photo(data)
+            return data
         finally:
             await client.disconnect()
 
+    def stored_photo_id(self, identifier):
+        """photo_id канала, если он уже в базе: фото тогда не скачивается"""
+        identifier = identifier.strip()
+        username = normalize_username(identifier)
+        if username:
+            channels = TelegramChannel.objects.annotate(
+                lower_username=Lower('username')
+            ).filter(lower_username=username)
+        elif identifier.lstrip('-').isdigit():
+            # ID в формате Bot API: -100<id канала>
+            channel_id = identifier.removeprefix('-100').lstrip('-')
+            channels = TelegramChannel.objects.filter(channel_id=channel_id)
+        else:
+            return None
+        return channels.values_list('photo_id', flat=True).first()
+
     def save_channel(self, data):
         """Create or update channel"""
         channel, created = TelegramChannel.objects.update_or_create(
@@ -65,14 +87,15 @@ class ParserView(FormView):
                 'average_views': data['average_views'],
                 'language': data['language'],
                 'country': data['country'],
-                'category': data['category'],
+                'category_id': data['category'],
+                **photo_fields(data),
             }
         )
 
         if created:
-            log.info(f"New channel created: {channel.title}")
+            log.info("New channel created: %s", channel.title)
         else:
-            log.info(f"Channel updated: {channel.title}")
+            log.info("Channel updated: %s", channel.title)
 
         return channel, created
 
@@ -97,13 +120,14 @@ class ParserView(FormView):
             parsed_at=current_date,
         )
 
-        # Update parsing date for Telegram channel
+        # Update parsing date and growth for Telegram channel
         channel.parsed_at = current_date
+        channel.daily_growth = daily_growth
 
-        channel.save(update_fields=["parsed_at"])
+        channel.save(update_fields=["parsed_at", "daily_growth"])
         log.info(
-            f"For channel: {channel.title} parsed stat; "
-            f"- participants: {current_count} growth: {daily_growth}"
+            "For channel: %s parsed stat; - participants: %s growth: %s",
+            channel.title, current_count, daily_growth,
         )
 
 
@@ -114,8 +138,8 @@ class ParserView(FormView):
         language = form.cleaned_data['language']
         country = form.cleaned_data['country']
         category = form.cleaned_data['category']
-        log.info(f'Начинаем обработку данных для канала; '
-                 f'- {identifier} лимит - {limit}')
+        log.info('Начинаем обработку данных для канала; - %s лимит - %s',
+                 identifier, limit)
         try:
             # Start async parsing function
             async_parser = async_to_sync(self.async_tg_parser)
@@ -124,8 +148,8 @@ class ParserView(FormView):
                                 'country': country,
                                 'category': category})
             
-            log.info(f'Парсинг завершен для канала;'
-                     f'- {parsed_data['title']} ({parsed_data['channel_id']}')
+            log.info('Парсинг завершен для канала;- %s (%s)',
+                     parsed_data['title'], parsed_data['channel_id'])
 
             # Saving data
             channel, created = self.save_channel(parsed_data)
@@ -146,13 +170,35 @@ class ParserView(FormView):
             return self.form_invalid(form)
 
 
-class ParserListView(ListView):
-    model = TelegramChannel
+class ParserListView(ConditionalGetMixin, ListView):
+    queryset = TelegramChannel.objects.resolved().select_related('category')
     token = 'TEMP_TOKEN'
 
+    def get_freshness(self):
+        """
+        Version of the list: channel count, last parse date and the
+        channels cache namespace, which Category changes bump too
+        (the list shows category names)
+        """
+        stats = self.queryset.aggregate(
+            total=Count('id'), last_parsed=Max('parsed_at')
+        )
+        version = cache.get_versions(cache.CHANNELS)[cache.CHANNELS]
+        key = (stats['total'], stats['last_parsed'], version)
+        return key, stats['last_parsed']
+
     def get(self, request, *args, **kwargs):
-        channels = self.get_queryset()
-    
+        self.object_list = self.get_queryset()
+        channels = []
+        for channel in self.object_list:
+            row = model_to_dict(channel)
+            # Категория отдаётся названием, как было до справочника Category
+            row['category'] = (
+                channel.category.name if channel.category else None
+            )
+            row['image_url'] = channel.photo_url()
+            channels.append(row)
+
         return inertia_render(
             request,
             'ChannelAnalytics',
@@ -163,10 +209,110 @@ class ParserListView(ListView):
         )
 
 
-class ParserDetailView(DetailView):
+class ParserDetailView(ConditionalGetMixin, DetailView):
     model = TelegramChannel
     template_name = 'parser/channel_detail.html'
     context_object_name = "channel"
+    queryset = TelegramChannel.objects.select_related('category')
+
+    def get_freshness(self):
+        """
+        Version of the page: channel and its latest stats parse dates and
+        the channels cache namespace, which Category changes bump too
+        (the page shows the category name)
+        """
+        stats = TelegramChannel.objects.filter(pk=self.kwargs['pk']).aggregate(
+            last_parsed=Max('parsed_at'),
+            last_stat=Max('channelstats__parsed_at'),
+        )
+        dates = [d for d in stats.values() if d]
+        if not dates:
+            # Unknown channel: let DetailView answer 404
+            return None
+        version = cache.get_versions(cache.CHANNELS)[cache.CHANNELS]
+        return (*stats.values(), version), max(dates)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Version for {% cache %} fragments of the page
+        context['fragment_version'] = cache.make_key(
+            (cache.CHANNELS, cache.STATS), 'channel_detail'
+        )
+        return context
+
+
+class ChannelExportView(StaffRequiredMixin, View):
+    """
+    Потоковая выгрузка каналов: ?format=csv|jsonl&group=<slug>&category=
+    &history=1. ?gzip=1 отдаёт файл .gz, иначе ответ сжимается на лету,
+    если клиент принимает gzip.
+    """
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in export.FORMATS:
+            raise Http404('Неизвестный формат выгрузки')
+
+        group = None
+        if request.GET.get('group'):
+            group = get_object_or_404(
+                Group.objects.select_related('auto_rule'),
+                slug=request.GET['group'],
+            )
+        history = request.GET.get('history') == '1'
+        as_file = request.GET.get('gzip') == '1'
+        encode = (
+            as_file or 'gzip' in request.headers.get('Accept-Encoding', '')
+        )
+
+        response = StreamingHttpResponse(
+            export.stream_export(
+                fmt, group, request.GET.get('category'), history,
+                compress=encode,
+            ),
+            content_type='application/gzip' if as_file else export.FORMATS[fmt],
+        )
+        filename = f'channels-{timezone.now():%Y%m%d}.{fmt}'
+        if as_file:
+            filename += '.gz'
+        elif encode:
+            response.headers['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+class MetricsView(StaffOnlyMixin, View):
+    """
+    Метрики парсера в текстовом формате Prometheus (config/parser/metrics.py).
+    Кроме персонала, доступны по заголовку Authorization: Bearer <METRICS_TOKEN>
+    — так их забирает Prometheus. Без сессии и верного токена ответ 401,
+    а не редирект на страницу входа.
+    """
+
+    def _test_role(self, request):
+        token = settings.METRICS_TOKEN
+        auth = request.headers.get('Authorization', '')
+        if token and constant_time_compare(auth, f'Bearer {token}'):
+            return True
+        return super()._test_role(request)
+
+    def handle_no_permission(self):
+        if self.request.user.is_authenticated:
+            return super().handle_no_permission()
+        response = HttpResponse(
+            'Unauthorized\n', status=401, content_type='text/plain'
+        )
+        response.headers['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
 
 
 # Create your views here.
\ No newline at end of file
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from urllib.parse import urlsplit
 from .logging import LOGGING
 import os
 from celery.schedules import crontab
@@ -28,6 +29,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 TELEGRAM_API_ID = os.getenv('TELEGRAM_API_ID')
 TELEGRAM_API_HASH = os.getenv('TELEGRAM_API_HASH')
 TELEGRAM_SESSION_STRING = os.getenv('TELEGRAM_SESSION_STRING')
+# dotted path of a callable returning a client used instead of Telethon
+# (config/parser/client.py), e.g. tests.fake_telegram.FakeTelegramClient
+TELEGRAM_CLIENT = os.getenv('TELEGRAM_CLIENT')
 
 # Telegram settings check
 # SESSIONS_STRING is not necessary, because working with sole db can be too
@@ -51,8 +55,75 @@ CELERY_BEAT_SCHEDULE = {
         "task": "config.parser.tasks.parse_all_channels",  # path to task
         "schedule": crontab(hour=11, minute=40),
     },
+    # auto groups for categories that appeared in the DB
+    "sync-categories-every-night": {
+        "task": "config.group_channels.tasks.sync_categories",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    # safety net for bulk category changes that bypass signals
+    "refresh-auto-groups-every-night": {
+        "task": "config.group_channels.tasks.refresh_auto_groups",
+        "schedule": crontab(hour=3, minute=0),
+    },
 }
 
+# Cache settings
+# Redis is already running for Celery, cache uses its own database there.
+# Without CACHE_REDIS_URL in development local memory cache is used
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL') or (
+    'redis://localhost:6379/1' if os.getenv('PROD') == 't' else ''
+)
+# Sessions need a Redis database of their own: cache.clear() is FLUSHDB
+# and would drop them together with the data cache.
+# By default the same server as the cache, database 2
+SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL') or (
+    urlsplit(CACHE_REDIS_URL)._replace(path='/2').geturl()
+    if CACHE_REDIS_URL else ''
+)
+if CACHE_REDIS_URL and SESSION_REDIS_URL == CACHE_REDIS_URL:
+    raise ImproperlyConfigured(
+        'SESSION_REDIS_URL must point to another Redis database '
+        'than CACHE_REDIS_URL'
+    )
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'tgms',
+            'TIMEOUT': 60 * 60,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': SESSION_REDIS_URL,
+            'KEY_PREFIX': 'tgms-sessions',
+            'TIMEOUT': None,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tgms-local',
+            'TIMEOUT': 60 * 60,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tgms-sessions',
+            'TIMEOUT': None,
+        },
+    }
+
+# Sessions
+# cached_db reads sessions from the cache and writes through to the DB,
+# so a cache flush or eviction only costs one DB read per session.
+# Own cache alias in its own Redis database (SESSION_REDIS_URL):
+# clearing the data cache doesn't touch sessions.
+SESSION_ENGINE = (
+    os.getenv('SESSION_ENGINE') or 'django.contrib.sessions.backends.cached_db'
+)
+SESSION_CACHE_ALIAS = 'sessions'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -103,13 +174,22 @@ ACCOUNT_AUTHENTICATION_METHOD = 'email'
 ACCOUNT_USERNAME_REQUIRED = False
 LOGIN_REDIRECT_URL = '/'  # Куда перенаправлять после входа
 
+# Bearer token for Prometheus at /parser/metrics (staff can open it anyway)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Server-Timing headers and per-endpoint timings (config/timing.py)
+SERVER_TIMING = os.getenv('SERVER_TIMING') == 't'
+
 MIDDLEWARE = [
+    # first: its total includes the other middleware; off unless SERVER_TIMING=t
+    'config.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'config.users.middleware.RoleMiddleware',
+    'config.parser.middleware.ChannelPermissionsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -221,6 +301,32 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded and fetched images, see config/media.py
+MEDIA_URL = os.getenv('MEDIA_URL') or '/media/'
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT') or BASE_DIR / 'media')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # hashed file names after collectstatic; dev server serves files as is
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+            if os.getenv('PROD') == 't'
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+    # content-addressed images; any storage backend, e.g.
+    # MEDIA_STORAGE_BACKEND=storages.backends.s3.S3Storage
+    'media': {
+        'BACKEND': (
+            os.getenv('MEDIA_STORAGE_BACKEND')
+            or 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -229,12 +335,31 @@ AUTH_USER_MODEL = 'users.User'
 
 if os.getenv('PROD') == 't':
     # ALLOWED_HOSTS = ['example.com']
-    # will configure SMTP in future
-    ...
+    # Mail is queued to Celery (config/mail.py), the worker sends it via SMTP
+    EMAIL_BACKEND = os.getenv('EMAIL_BACKEND') or 'config.mail.CeleryEmailBackend'
+    MAIL_DELIVERY_BACKEND = (
+        os.getenv('MAIL_DELIVERY_BACKEND')
+        or 'django.core.mail.backends.smtp.EmailBackend'
+    )
+    EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+    EMAIL_PORT = int(os.getenv('EMAIL_PORT') or 25)
+    EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+    EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+    EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS') == 't'
+    EMAIL_TIMEOUT = 30
+    DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL') or 'webmaster@localhost'
 else:
     ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
-    # Email settings for development - emails will be printed to console
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    # Email settings for development - emails will be printed to console.
+    # EMAIL_BACKEND=config.mail.CeleryEmailBackend prints them in the worker
+    EMAIL_BACKEND = (
+        os.getenv('EMAIL_BACKEND')
+        or 'django.core.mail.backends.console.EmailBackend'
+    )
+    MAIL_DELIVERY_BACKEND = (
+        os.getenv('MAIL_DELIVERY_BACKEND')
+        or 'django.core.mail.backends.console.EmailBackend'
+    )
     
 
 # Inertia settings    
@@ -0,0 +1,296 @@
+"""
+Per-request timings.
+
+ServerTimingMiddleware (opt-in, SERVER_TIMING=t) measures every request:
+SQL queries (count and time, through connection.execute_wrapper), hits
+and misses of the versioned cache (config/cache.py), template rendering,
+the view and the whole request including middleware. The numbers go to
+the Server-Timing response header, which browser dev tools show next to
+the request, and to a per-endpoint histogram of response times shared by
+all processes through the cache (config/counters.py). The histogram keeps
+the last WINDOWS windows of WINDOW seconds and is served to staff by
+TimingStatsView. Requests are collected in process and written to the
+cache by a background thread, so no request waits for the round trips.
+
+With SERVER_TIMING off the middleware drops out of the chain at startup
+(MiddlewareNotUsed) and the hooks find no active request, so the only
+cost left is one context variable lookup per cache read.
+"""
+import contextvars
+import functools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from config import counters
+
+# upper bounds of the response time buckets, ms (the last one is open)
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+WINDOW = 5 * 60
+WINDOWS = 12
+# how many requests to collect in process before writing them to the cache
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 10
+
+# fields summed per endpoint and window; *_us are microseconds
+FIELDS = ('count', 'total_us', 'view_us', 'db_us', 'db_n', 'tpl_us',
+          'hit', 'miss')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+_lock = threading.Lock()
+_local = Counter()
+_local_requests = 0
+_last_flush = time.monotonic()
+_flush_scheduled = False
+_flusher = None
+
+
+class Timings:
+    """Счётчики одного запроса; время в секундах"""
+
+    __slots__ = ('db', 'db_n', 'hit', 'miss', 'tpl', 'view', 'total',
+                 '_depth')
+
+    def __init__(self):
+        self.db = self.tpl = self.view = self.total = 0.0
+        self.db_n = self.hit = self.miss = self._depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.db_n += 1
+
+    def header(self):
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.db_n} queries"',
+            f'cache;desc="{self.hit} hits, {self.miss} misses"',
+            f'tpl;dur={self.tpl * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+def count_cache(kind):
+    """Попадание ('hit') или промах ('miss') кэша в текущем запросе"""
+    timings = _current.get()
+    if timings is not None:
+        setattr(timings, kind, getattr(timings, kind) + 1)
+
+
+def _instrument_templates():
+    """Считать время рендера шаблонов; вложенный рендер не считается дважды"""
+    from django.template.backends.django import Template
+
+    render = Template.render
+    if getattr(render, 'timed', False):
+        return
+
+    @functools.wraps(render)
+    def timed_render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return render(self, context, request)
+        timings._depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timings._depth -= 1
+            if not timings._depth:
+                timings.tpl += time.perf_counter() - start
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+class ServerTimingMiddleware:
+    """
+    Server-Timing и гистограмма по эндпоинтам. Ставится первым в
+    MIDDLEWARE, чтобы total включал остальные middleware. Для потоковых
+    ответов измеряется время до первого байта.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        timings = Timings()
+        request._timing_view_start = None
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        end = time.perf_counter()
+        timings.total = end - start
+        if request._timing_view_start is not None:
+            timings.view = end - request._timing_view_start
+        response.headers['Server-Timing'] = timings.header()
+        record(endpoint_name(request), timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_start = time.perf_counter()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+def _bucket(ms):
+    for bound in BUCKETS:
+        if ms <= bound:
+            return str(bound)
+    return 'inf'
+
+
+def record(endpoint, timings):
+    """Добавить запрос в гистограмму текущего окна"""
+    global _local_requests
+    window = int(time.time() // WINDOW)
+    prefix = (window, endpoint)
+    with _lock:
+        _local[(*prefix, 'count')] += 1
+        _local[(*prefix, f'le_{_bucket(timings.total * 1000)}')] += 1
+        _local[(*prefix, 'total_us')] += int(timings.total * 1e6)
+        _local[(*prefix, 'view_us')] += int(timings.view * 1e6)
+        _local[(*prefix, 'db_us')] += int(timings.db * 1e6)
+        _local[(*prefix, 'db_n')] += timings.db_n
+        _local[(*prefix, 'tpl_us')] += int(timings.tpl * 1e6)
+        _local[(*prefix, 'hit')] += timings.hit
+        _local[(*prefix, 'miss')] += timings.miss
+        _local_requests += 1
+        due = not _flush_scheduled and (
+            _local_requests >= FLUSH_EVERY
+            or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        )
+    if due:
+        _schedule_flush()
+
+
+def _schedule_flush():
+    """Записать счётчики в кэш в фоновом потоке, не задерживая ответ"""
+    global _flush_scheduled, _flusher
+    with _lock:
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+        if _flusher is None:
+            _flusher = ThreadPoolExecutor(1, thread_name_prefix='timing')
+    _flusher.submit(flush)
+
+
+def _key(window, endpoint, field):
+    return f'timing:{window}:{endpoint}:{field}'
+
+
+def _registry(window):
+    return f'timing:{window}:endpoints'
+
+
+def flush():
+    """Записать счётчики процесса в общий кэш"""
+    global _local_requests, _last_flush, _flush_scheduled
+    with _lock:
+        pending = dict(_local)
+        _local.clear()
+        _local_requests = 0
+        _last_flush = time.monotonic()
+        _flush_scheduled = False
+    # окно живёт, пока попадает в статистику
+    timeout = WINDOW * (WINDOWS + 1)
+    endpoints = {}
+    for window, endpoint, _ in pending:
+        endpoints.setdefault(window, set()).add(endpoint)
+    counters.add(
+        {_key(*key): value for key, value in pending.items()}, timeout
+    )
+    for window, names in endpoints.items():
+        counters.register(_registry(window), sorted(names), timeout)
+
+
+def _percentile(histogram, count, q):
+    """
+    Верхняя граница корзины (мс), в которую попадает квантиль q;
+    None — квантиль выше последней границы
+    """
+    threshold = count * q
+    seen = 0
+    for bound in BUCKETS:
+        seen += histogram[str(bound)]
+        if seen >= threshold:
+            return bound
+    return None
+
+
+def get_stats(windows=WINDOWS):
+    """
+    Статистика всех процессов за последние windows окон:
+    {эндпоинт: {count, avg_ms, p50_ms, ..., histogram}}
+    """
+    flush()
+    current = int(time.time() // WINDOW)
+    window_ids = range(current - windows + 1, current + 1)
+    names = counters.names_many([_registry(w) for w in window_ids])
+    fields = FIELDS + tuple(f'le_{b}' for b in (*BUCKETS, 'inf'))
+    keys = [
+        _key(w, endpoint, field)
+        for w in window_ids
+        for endpoint in names[_registry(w)]
+        for field in fields
+    ]
+    values = cache.get_many(keys)
+    totals = {}
+    for key, value in values.items():
+        endpoint, field = key.split(':', 2)[2].rsplit(':', 1)
+        totals.setdefault(endpoint, Counter())[field] += value
+
+    stats = {}
+    for endpoint, total in sorted(totals.items()):
+        count = total['count']
+        if not count:
+            continue
+        histogram = {
+            str(bound): total[f'le_{bound}'] for bound in (*BUCKETS, 'inf')
+        }
+        lookups = total['hit'] + total['miss']
+        stats[endpoint] = {
+            'count': count,
+            'avg_ms': round(total['total_us'] / count / 1000, 1),
+            'p50_ms': _percentile(histogram, count, 0.5),
+            'p95_ms': _percentile(histogram, count, 0.95),
+            'p99_ms': _percentile(histogram, count, 0.99),
+            'avg_view_ms': round(total['view_us'] / count / 1000, 1),
+            'avg_db_ms': round(total['db_us'] / count / 1000, 1),
+            'avg_queries': round(total['db_n'] / count, 1),
+            'avg_template_ms': round(total['tpl_us'] / count / 1000, 1),
+            'cache_hits': total['hit'],
+            'cache_misses': total['miss'],
+            'cache_hit_ratio': (
+                round(total['hit'] / lookups, 3) if lookups else None
+            ),
+            'histogram_ms': histogram,
+        }
+    return stats
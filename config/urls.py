@@ -14,11 +14,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
-from config.views import IndexView
+from config.views import IndexView, MediaView, TimingStatsView
 
 urlpatterns = [
     path('', IndexView.as_view(), name='main_index'),
@@ -27,5 +28,14 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('parser/', include('config.parser.urls')),
     path('admin/', admin.site.urls),
+    path('stats/timing/', TimingStatsView.as_view(), name='timing_stats'),
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain'))
 ]
+
+# Локальное хранилище изображений; с внешним MEDIA_URL (CDN, S3) файлы
+# отдаются не через Django
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(
+        path(f"{settings.MEDIA_URL.strip('/')}/<path:path>",
+             MediaView.as_view(), name='media')
+    )
@@ -7,6 +7,8 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'config.users'
     def ready(self):
+        from . import signals  # noqa: F401
+
         @receiver(social_account_added)
         def handle_yandex_login(sender, request, sociallogin, **kwargs):
             if sociallogin.account.provider == 'yandex':
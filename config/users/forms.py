@@ -7,6 +7,8 @@ from django.contrib.auth.forms import (
     UserCreationForm,
 )
 
+from config.media import ImageRefField
+
 from .models import User
 
 
@@ -87,7 +89,7 @@ class UserRegForm(UserCreationForm):
             }
         )
     )
-    avatar_image = forms.CharField(
+    avatar_image = ImageRefField(
         required=False,
         label='URL аватара',
         widget=forms.TextInput(attrs={'name': 'avatar_image',
@@ -145,7 +147,7 @@ class UserUpdateForm(UserChangeForm):
         widget=forms.Textarea(attrs={'class': 'form-control',
                                       'placeholder': 'О себе',
                                       'rows': 3}))
-    avatar_image = forms.CharField(
+    avatar_image = ImageRefField(
         required=False,
         label='URL аватара',
         widget=forms.TextInput(attrs={'name': 'avatar_image',
@@ -157,7 +159,7 @@ class AvatarChange(UserChangeForm):
     class Meta:
         model = User
         fields = ('avatar_image',)
-    avatar_image = forms.CharField(
+    avatar_image = ImageRefField(
         required=False,
         label='URL аватара',
         widget=forms.TextInput(attrs={'id': 'avatarUrl',
@@ -1,7 +1,4 @@
-from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
-
-User = get_user_model()
+from config.users.roles import request_role
 
 
 class RoleMiddleware:
@@ -9,18 +6,8 @@ class RoleMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        if not request.user.is_authenticated:
-            request.role = 'guest'
-        else:
-            try:
-                if hasattr(request.user, 'partner_profile') and request.user.partner_profile.status == 'active':
-                    request.role = 'partner'
-                elif hasattr(request.user, 'is_channel_moderator') and request.user.is_channel_moderator:
-                    request.role = 'channel_moderator'
-                else:
-                    request.role = 'user'
-            except ObjectDoesNotExist:
-                request.role = 'user'
+        # Роль берётся из кэша resolver'а, запрос в БД — только при промахе
+        request_role(request)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
@@ -1,11 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from config import media
+
+from . import roles
+
 ROLE_MAXLENGTH = 150
 BIO_MAXLENGTH = 200
 
 # Create your models here.
 class User(AbstractUser):
+    # URL или ссылка на файл в хранилище (config/media.py)
     avatar_image = models.CharField(verbose_name='url изображения профиля', blank=True, null=True)
     role = models.CharField(verbose_name='роль',
                             max_length=150)
@@ -38,13 +43,22 @@ class User(AbstractUser):
     @property
     def role(self):
         """Динамическое определение роли для удобства использования."""
-        if not self.is_authenticated:
-            return 'guest'
-        if self.is_partner:
-            return 'partner'
-        if self.is_channel_moderator:
-            return 'channel_moderator'
-        return 'user'
+        return roles.get_role(self)
+
+    @property
+    def avatar_url(self):
+        return media.url(self.avatar_image, media.AVATAR)
+
+
+class PartnerProfileQuerySet(models.QuerySet):
+    """update() не шлёт post_save: роли пользователей сбрасываем сами"""
+
+    def update(self, **kwargs):
+        user_ids = list(self.values_list('user_id', flat=True))
+        rows = super().update(**kwargs)
+        if rows:
+            roles.invalidate_many(user_ids)
+        return rows
 
 
 class PartnerProfile(models.Model):
@@ -91,6 +105,8 @@ class PartnerProfile(models.Model):
         null=True
     )
 
+    objects = PartnerProfileQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Профиль партнёра'
         verbose_name_plural = 'Профили партнёров'
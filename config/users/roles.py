@@ -0,0 +1,88 @@
+"""
+Единственный источник роли пользователя.
+
+Роль (guest / user / partner / channel_moderator) и флаги, из которых она
+выводится, считаются одним запросом и кэшируются на пользователя на
+ROLE_TTL секунд. Сигналы PartnerProfile и ChannelModerator (см. signals.py)
+и PartnerProfile.objects.update() сбрасывают запись после коммита, так что
+в установившемся режиме страницы не делают ни одного запроса ради роли.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+ROLE_TTL = 10 * 60
+
+GUEST = 'guest'
+USER = 'user'
+PARTNER = 'partner'
+CHANNEL_MODERATOR = 'channel_moderator'
+
+
+def _key(user_id):
+    return f'user_role:{user_id}'
+
+
+def _load_flags(user_id):
+    """(активный партнёр, модератор канала) одним запросом"""
+    from config.parser.models import ChannelModerator
+
+    from .models import PartnerProfile, User
+
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(
+            partner=Exists(PartnerProfile.objects.filter(
+                user_id=OuterRef('pk'), status='active'
+            )),
+            moderator=Exists(ChannelModerator.objects.filter(user_id=OuterRef('pk'))),
+        )
+        .values_list('partner', 'moderator')
+        .first()
+    )
+    return tuple(row) if row else (False, False)
+
+
+def get_flags(user):
+    """{'is_partner': ..., 'is_channel_moderator': ...} из кэша"""
+    if not user.is_authenticated:
+        return {'is_partner': False, 'is_channel_moderator': False}
+    key = _key(user.pk)
+    flags = cache.get(key)
+    if flags is None:
+        flags = _load_flags(user.pk)
+        cache.set(key, flags, ROLE_TTL)
+    is_partner, is_moderator = flags
+    return {'is_partner': is_partner, 'is_channel_moderator': is_moderator}
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return GUEST
+    flags = get_flags(user)
+    if flags['is_partner']:
+        return PARTNER
+    if flags['is_channel_moderator']:
+        return CHANNEL_MODERATOR
+    return USER
+
+
+def request_role(request):
+    """Роль запроса: считается один раз и хранится в request.role"""
+    if not hasattr(request, 'role'):
+        request.role = get_role(request.user)
+    return request.role
+
+
+def invalidate(user_id):
+    invalidate_many([user_id])
+
+
+def invalidate_many(user_ids):
+    """
+    Сбросить роли после коммита текущей транзакции: сброс до коммита
+    позволил бы параллельному запросу закэшировать старую роль
+    """
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.parser.models import ChannelModerator
+
+from . import roles
+from .models import PartnerProfile
+
+
+@receiver(post_save, sender=PartnerProfile)
+@receiver(post_delete, sender=PartnerProfile)
+@receiver(post_save, sender=ChannelModerator)
+@receiver(post_delete, sender=ChannelModerator)
+def invalidate_user_role(sender, instance, **kwargs):
+    """Статус партнёра или модератора изменился — роль считается заново"""
+    roles.invalidate(instance.user_id)
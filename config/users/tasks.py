@@ -0,0 +1,36 @@
+import logging
+import random
+
+from celery import shared_task
+
+from config import mail
+
+log = logging.getLogger(__name__)
+
+MAX_RETRIES = 6
+# 30 s, 1 min, 2 min, ... до ~16 минут
+RETRY_DELAY = 30
+
+
+@shared_task(bind=True, max_retries=MAX_RETRIES)
+def send_queued_mail(self, messages):
+    """Celery task: deliver mail queued by config.mail.CeleryEmailBackend"""
+    sent, failed, error = mail.deliver(messages)
+    if not failed:
+        log.info("Mail sent: %s message(s)", sent)
+        return sent
+    if self.request.retries >= self.max_retries:
+        log.error(
+            "Mail dropped after %s retries: %s message(s), last error: %s",
+            self.request.retries, len(failed), error,
+        )
+        return sent
+    countdown = RETRY_DELAY * 2 ** self.request.retries
+    log.warning(
+        "Mail sent: %s, failed: %s (%s), retry in %s s",
+        sent, len(failed), error, countdown,
+    )
+    # повторяются только неотправленные письма
+    raise self.retry(
+        args=(failed,), countdown=countdown + random.uniform(0, RETRY_DELAY)
+    )
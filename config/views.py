@@ -1,9 +1,21 @@
+import mimetypes
+from math import ceil
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseNotModified,
+    JsonResponse,
+)
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
 from django.views.generic.base import View
+
+from config import cache, media, timing
 from config.group_channels.models import Group
-from django.db.models import Count
-from config.parser.models import TelegramChannel
-from math import ceil
+from config.mixins import StaffOnlyMixin
+
 
 class IndexView(View):
     CATS_COLUMNS = 4 
@@ -11,22 +23,23 @@ class IndexView(View):
 
 
     def get(self, request, *args, **kwargs):
+        # Количество каналов берём из Group.channel_count, без JOIN с каналами
         editorial = (
             Group.objects
                  .filter(is_editorial=True)
-                 .annotate(ch_count=Count('channels'))
+                 .order_by('order', 'name')
         )
 
         auto_qs = (
             Group.objects
                  .filter(auto_rule__isnull=False)
-                 .select_related('auto_rule')
                  .order_by('order', 'name')
         )
-        auto_groups = list(auto_qs)
 
         page_size = self.CATS_COLUMNS * self.ROWS_PER_COL
-        total = len(auto_groups)
+        total = cache.get_or_set(
+            (cache.GROUPS,), ('auto_groups_total',), auto_qs.count
+        )
         total_pages = max(1, ceil(total / page_size))
 
         try:
@@ -35,24 +48,9 @@ class IndexView(View):
             page = 1
         page = max(1, min(page, total_pages))
 
+        # LIMIT/OFFSET в БД вместо загрузки всех автоподборок
         start = (page - 1) * page_size
-        end = start + page_size
-        page_groups = auto_groups[start:end]
-
-        categories = [g.auto_rule.category for g in page_groups]
-        if categories:
-            counts_qs = (
-                TelegramChannel.objects
-                    .filter(category__in=categories)
-                    .values('category')
-                    .annotate(cnt=Count('id'))
-            )
-            counts_map = {row['category']: row['cnt'] for row in counts_qs}
-        else:
-            counts_map = {}
-
-        for g in page_groups:
-            g.cat_count = counts_map.get(g.auto_rule.category, 0)
+        page_groups = list(auto_qs[start:start + page_size])
 
         cols = []
         for i in range(self.CATS_COLUMNS):
@@ -71,3 +69,53 @@ class IndexView(View):
             'cats_next_page': page + 1,
         }
         return render(request, 'index.html', context)
+
+
+class MediaView(View):
+    """
+    Файлы контентно-адресуемого хранилища (config/media.py). Содержимое
+    по ссылке никогда не меняется, поэтому ответ кэшируется навсегда,
+    а ETag — сам хеш.
+    """
+
+    def get(self, request, path):
+        ref = media.path_ref(path)
+        if ref is None:
+            raise Http404
+        etag = f'"{ref.split(".")[0]}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            storage = media.get_storage()
+            if not storage.exists(path):
+                raise Http404
+            response = FileResponse(
+                storage.open(path),
+                content_type=mimetypes.guess_type(ref)[0],
+            )
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=media.CACHE_MAX_AGE, immutable=True
+        )
+        return response
+
+
+class TimingStatsView(StaffOnlyMixin, View):
+    """
+    Время ответа по эндпоинтам за последний час (config/timing.py):
+    среднее, перцентили по гистограмме, SQL, шаблоны и кэш.
+    ?windows=N — сколько последних окон по timing.WINDOW секунд.
+    """
+
+    def get(self, request):
+        try:
+            windows = int(request.GET.get('windows', timing.WINDOWS))
+        except ValueError:
+            windows = timing.WINDOWS
+        windows = max(1, min(windows, timing.WINDOWS))
+        return JsonResponse({
+            'enabled': settings.SERVER_TIMING,
+            'window_seconds': timing.WINDOW,
+            'windows': windows,
+            'endpoints': timing.get_stats(windows),
+        })
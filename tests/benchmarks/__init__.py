@@ -0,0 +1,54 @@
+'''
+Benchmarks that need a database.
+Every benchmark is a script: python -m tests.benchmarks.<name>
+It runs against a throwaway test database (test_<NAME> / in-memory sqlite),
+never against the configured one.
+'''
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+def setup_django() -> Callable[[], None]:
+    '''
+    Configure Django and create the test database.
+    Returns a function that destroys it.
+    '''
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+
+    def teardown() -> None:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    return teardown
+
+
+@contextmanager
+def measure(label: str) -> Iterator[dict]:
+    '''
+    Print wall time and number of SQL queries of the block
+    '''
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    result: dict = {}
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
+    result['queries'] = len(queries)
+    print(f'{label:<40} {result["seconds"]:>8.2f}s '
+          f'{result["queries"]:>8} queries')
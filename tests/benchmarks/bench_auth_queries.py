@@ -0,0 +1,88 @@
+'''
+DB queries per authenticated request with database and cached_db sessions
+for UserProfileView, IndexView and GroupDetailView.
+
+python -m tests.benchmarks.bench_auth_queries [--requests 20]
+'''
+import argparse
+
+from tests.benchmarks import setup_django
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        run(args.requests)
+    finally:
+        teardown()
+
+
+def check(name: str, response) -> None:
+    '''
+    Queries of a failed request count only up to the error and say
+    nothing about sessions: stop instead of reporting them
+    '''
+    if not 200 <= response.status_code < 400:
+        raise SystemExit(f'{name}: HTTP {response.status_code}, no result')
+
+
+def run(requests: int) -> None:
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    from config.group_channels.models import Group
+    from config.parser.models import TelegramChannel
+    from config.users.models import User
+
+    user = User.objects.create_user('bench', 'bench@example.com', 'bench')
+    group = Group.objects.create(name='bench', owner=user)
+    TelegramChannel.objects.bulk_create([
+        TelegramChannel(channel_id=i, username=f'bench{i}', title=f'Bench {i}')
+        for i in range(100)
+    ])
+    group.channels.add(*TelegramChannel.objects.all())
+
+    urls = {
+        'UserProfileView': reverse('users:profile'),
+        'IndexView': reverse('main_index'),
+        'GroupDetailView': reverse(
+            'group_channels:group_detail', args=[group.slug]
+        ),
+    }
+
+    print(f'{"view":<20}'
+          + ''.join(f'{e.rsplit(".", 1)[1]:>12}' for e in ENGINES))
+    results = {name: [] for name in urls}
+    for engine in ENGINES:
+        with override_settings(SESSION_ENGINE=engine):
+            caches['sessions'].clear()
+            client = Client()
+            client.force_login(user)
+            for name, url in urls.items():
+                # first request warms caches (roles, pages, session)
+                check(name, client.get(url))
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(requests):
+                        check(name, client.get(url))
+                results[name].append(len(queries) / requests)
+
+    for name, per_engine in results.items():
+        print(f'{name:<20}'
+              + ''.join(f'{value:>12.1f}' for value in per_engine))
+    print('queries per request, steady state')
+
+
+if __name__ == '__main__':
+    main()
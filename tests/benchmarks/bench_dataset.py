@@ -0,0 +1,79 @@
+'''
+Load-test dataset builder (tests/dataset.py): generation alone with one
+worker vs the process pool, then a full build into the test database.
+
+python -m tests.benchmarks.bench_dataset [--channels 20000] [--days 365]
+'''
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from tests import dataset
+from tests.benchmarks import measure, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', type=int, default=20_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    for copy in (False, True):
+        generate(args.channels, args.days, args.workers, copy)
+    teardown = setup_django()
+    try:
+        run(args.channels, args.days, args.workers)
+    finally:
+        teardown()
+
+
+def generate(channels: int, days: int, workers: int, copy: bool) -> None:
+    '''
+    Rows/s of generation only, without a database. copy: chunks come
+    back as CSV text (the COPY path) rather than row tuples
+    '''
+    spec = dataset.Spec(
+        seed=1, users=0, channels=channels, groups=0, days=days,
+        until=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        first_ids={'users': 1, 'channels': 1, 'groups': 1}, copy=copy,
+    )
+    tasks = list(dataset._chunks(
+        'channels', channels, max(1, dataset.CHUNK_ROWS // (days + 2))
+    ))
+    for n in sorted({1, workers}):
+        executor = (
+            ProcessPoolExecutor(n, mp_context=get_context('spawn'))
+            if n > 1 else dataset._Inline()
+        )
+        start = time.perf_counter()
+        rows = 0
+        for parts in dataset._ordered(
+            executor, dataset._generate,
+            ((kind, spec, *rest) for kind, *rest in tasks), window=n * 2,
+        ):
+            rows += sum(part[3] for part in parts)
+        seconds = time.perf_counter() - start
+        if n > 1:
+            executor.shutdown()
+        label = f'generate {"CSV" if copy else "rows"}, {n} workers'
+        print(f'{label:<40} {seconds:>8.2f}s '
+              f'{rows / seconds:>10.0f} rows/s')
+
+
+def run(channels: int, days: int, workers: int) -> None:
+    with measure(f'build, {workers} workers') as result:
+        written = dataset.build(
+            channels=channels, days=days, users=channels // 10,
+            groups=channels // 100, workers=workers,
+        )
+    written.pop('seconds')
+    rows = sum(written.values())
+    print(f'{rows} rows, {rows / result["seconds"]:.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+'''
+Fixture generation: DataGenerator one value at a time (rstr.xeger) vs
+batch mode, per field type, and generate_all with a process pool.
+
+python -m tests.benchmarks.bench_fixtures [--sizes 10000 1000000]
+
+The one-at-a-time mode is measured on at most --serial-max values and
+scaled linearly above that (marked "est."): a million of them take
+hours. Emails are left out of the per-field table: few values of that
+rule pass EmailValidator, in either mode.
+'''
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+FIELDS = ('text', 'int', 'url', 'datetime')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10_000, 1_000_000])
+    parser.add_argument('--serial-max', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--families-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    # validators format their messages with settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    # every failed value is a warning in the one-at-a-time mode
+    logging.disable(logging.WARNING)
+
+    for size in args.sizes:
+        fields(size, args.serial_max)
+    families(args.families_size, args.workers)
+
+
+def _time(generator, name: str) -> tuple:
+    cfg = generator.fixtures_generators[name]
+    start = time.perf_counter()
+    values = cfg['generator'](
+        rule=cfg['rule'], data_type=cfg['data_type'],
+        validator=cfg['validator'],
+    )
+    return time.perf_counter() - start, len(values)
+
+
+def fields(size: int, serial_max: int) -> None:
+    from tests.data_generator import DataGenerator
+
+    print(f'{size} values')
+    for name in FIELDS:
+        measured = min(size, serial_max)
+        serial, _ = _time(DataGenerator(measured), name)
+        serial *= size / measured
+        batch, made = _time(DataGenerator(size, batch=True, seed=1), name)
+        note = ' est.' if measured < size else ''
+        print(f'  {name:<10} serial {serial:>9.2f}s{note:<5} '
+              f'batch {batch:>8.2f}s  x{serial / batch:>6.1f}  ({made} made)')
+
+
+def families(size: int, workers: int) -> None:
+    from tests.generate_fixtures import ModelAndFormFixtureGenerator
+
+    print(f'generate_all, {size} records per fixture')
+    # batch mode only: the one-at-a-time emails alone take minutes
+    for n in sorted({1, workers}):
+        with tempfile.TemporaryDirectory() as path:
+            generator = ModelAndFormFixtureGenerator(
+                size, batch=True, seed=1, path=path
+            )
+            start = time.perf_counter()
+            generator.generate_all(workers=n)
+            seconds = time.perf_counter() - start
+        print(f'  {f"{n} workers":<24} {seconds:>8.2f}s')
+
+
+if __name__ == '__main__':
+    main()
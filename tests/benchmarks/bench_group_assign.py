@@ -0,0 +1,66 @@
+'''
+Assigning many channels to a group:
+group.channels.add(*channels) vs services.add_channels_bulk.
+
+python -m tests.benchmarks.bench_group_assign [--channels 50000]
+'''
+import argparse
+
+from tests.benchmarks import measure, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', type=int, default=50_000)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        run(args.channels)
+    finally:
+        teardown()
+
+
+def run(size: int) -> None:
+    from config.group_channels.models import Group
+    from config.group_channels.services import add_channels_bulk
+    from config.parser.models import Category, TelegramChannel
+    from config.users.models import User
+
+    owner = User.objects.create_user('bench', 'bench@example.com', 'bench')
+    sport, news = (
+        Category.objects.get_or_create(name=name)[0]
+        for name in ('Спорт', 'Новости')
+    )
+    TelegramChannel.objects.bulk_create(
+        [
+            TelegramChannel(
+                channel_id=i, username=f'bench{i}', title=f'Bench {i}',
+                category=sport if i % 2 else news,
+            )
+            for i in range(size)
+        ],
+        batch_size=5000,
+    )
+    print(f'{size} channels')
+
+    slow = Group.objects.create(name='m2m add', owner=owner)
+    with measure('group.channels.add(*channels)'):
+        slow.channels.add(*TelegramChannel.objects.all())
+
+    fast = Group.objects.create(name='bulk ids', owner=owner)
+    ids = list(TelegramChannel.objects.values_list('pk', flat=True))
+    with measure('add_channels_bulk(channel_ids=...)'):
+        add_channels_bulk(fast, channel_ids=ids)
+
+    saved = Group.objects.create(name='bulk filter', owner=owner)
+    with measure('add_channels_bulk(filters=...)'):
+        add_channels_bulk(saved, filters={'category': sport})
+
+    for group in (slow, fast, saved):
+        group.refresh_from_db()
+        print(f'{group.name:<40} {group.channel_count:>8} channels')
+
+
+if __name__ == '__main__':
+    main()
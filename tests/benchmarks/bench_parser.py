@@ -0,0 +1,155 @@
+'''
+Parser pipeline over the offline Telegram stand-in (tests/fake_telegram.py)
+at several concurrency levels:
+
+- tg_parser: channels parsed by concurrent tasks sharing one client;
+  latency is per channel, end to end
+- import: resolve_placeholders, the import's worker pool, with thumbnails
+  and database writes; latency is per RPC
+
+python -m tests.benchmarks.bench_parser [--channels 200]
+    [--concurrency 1 5 20 50] [--latency 0.05] [--flood-rate 0.01]
+
+The parser's own anti-flood pause before every channel (1 s) is off
+unless --pause is given: the benchmark measures what the pipeline can
+do, not the throttle.
+'''
+import argparse
+import asyncio
+import time
+
+from tests.benchmarks import setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 5, 20, 50])
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='median RPC latency, seconds (log-normal)')
+    parser.add_argument('--sigma', type=float, default=0.5)
+    parser.add_argument('--flood-rate', type=float, default=0.0)
+    parser.add_argument('--flood-seconds', type=int, nargs=2, default=[1, 3])
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help='anti-flood pause of tg_parser, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        run(args)
+    finally:
+        teardown()
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(label: str, channels: int, seconds: float, latencies: list,
+           telegram) -> None:
+    print(f'{label:<24} {channels / seconds:>8.1f} ch/s '
+          f'p50 {percentile(latencies, 0.5) * 1000:>7.0f}ms '
+          f'p99 {percentile(latencies, 0.99) * 1000:>7.0f}ms '
+          f'{telegram.rpc_count() / channels:>5.2f} rpc/ch '
+          f'{sum(telegram.flood_waits.values()):>4} flood '
+          f'{sum(telegram.errors.values()):>4} err')
+
+
+async def parse_concurrently(usernames: list, concurrency: int,
+                             telegram) -> list:
+    from config.parser.parser import tg_parser
+    from tests.fake_telegram import FakeTelegramClient
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def parse(username):
+        async with semaphore:
+            start = time.perf_counter()
+            await tg_parser(username, client)
+            latencies.append(time.perf_counter() - start)
+
+    async with FakeTelegramClient(telegram) as client:
+        await asyncio.gather(*(parse(username) for username in usernames))
+    return latencies
+
+
+async def resolve(concurrency: int, telegram):
+    from config.parser.importer import ImportReport, resolve_placeholders
+    from tests.fake_telegram import FakeTelegramClient
+
+    report = ImportReport()
+    async with FakeTelegramClient(telegram) as client:
+        await resolve_placeholders(client, report, concurrency)
+    return report
+
+
+def run(args) -> None:
+    import logging
+
+    from config.parser import parser
+    from config.parser.models import TelegramChannel
+    from tests.fake_telegram import Behaviour, Corpus, FakeTelegram, lognormal
+
+    # every missing channel and injected error is logged by the parser
+    logging.disable(logging.CRITICAL)
+    parser.ANTI_FLOOD_PAUSE = args.pause
+    size = args.channels * len(args.concurrency)
+    telegram = FakeTelegram(
+        Corpus(args.seed, size=size),
+        Behaviour(
+            latency={'default': lognormal(args.latency, args.sigma)},
+            flood_wait_rate=args.flood_rate,
+            flood_wait_seconds=tuple(args.flood_seconds),
+            error_rate=args.error_rate,
+        ),
+        seed=args.seed,
+    )
+    print(f'{args.channels} channels, RPC latency {args.latency * 1000:.0f}ms '
+          f'median, flood {args.flood_rate:.1%}, errors {args.error_rate:.1%}, '
+          f'pause {args.pause}s')
+
+    print('tg_parser')
+    for concurrency in args.concurrency:
+        telegram.reset()
+        usernames = telegram.corpus.usernames(args.channels)
+        start = time.perf_counter()
+        latencies = asyncio.run(
+            parse_concurrently(usernames, concurrency, telegram)
+        )
+        report(f'  concurrency {concurrency}', args.channels,
+               time.perf_counter() - start, latencies, telegram)
+
+    print('import (resolve_placeholders)')
+    for i, concurrency in enumerate(args.concurrency):
+        telegram.reset()
+        usernames = telegram.corpus.usernames(
+            args.channels, start=1 + i * args.channels
+        )
+        # placeholders the previous round could not resolve would be
+        # retried here and skew the round's count and timings
+        TelegramChannel.objects.filter(channel_id__isnull=True).delete()
+        TelegramChannel.objects.bulk_create([
+            TelegramChannel(username=username, title=username)
+            for username in usernames
+        ])
+        start = time.perf_counter()
+        result = asyncio.run(resolve(concurrency, telegram))
+        seconds = time.perf_counter() - start
+        rpc_latencies = [
+            latency for values in telegram.latencies.values()
+            for latency in values
+        ]
+        report(f'  concurrency {concurrency}', args.channels, seconds,
+               rpc_latencies, telegram)
+        print(f'  {"":<22} {result.summary()}')
+
+
+if __name__ == '__main__':
+    main()
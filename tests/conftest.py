@@ -0,0 +1,50 @@
+'''
+pytest setup for the Django tests.
+
+With pytest-django installed it creates the test database itself;
+without it (CI installs only pytest and pytest-cov) the session fixture
+below does the same with Django's own test utilities.
+'''
+import os
+
+import pytest
+
+from tests import query_budget
+
+
+def pytest_configure(config) -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    # test modules import models at collection time
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    config.pluginmanager.register(query_budget, 'query_budget')
+
+
+def pytest_collection_modifyitems(config, items) -> None:
+    if config.pluginmanager.hasplugin('django'):
+        return
+    # as Django's runner does: TransactionTestCase empties the tables
+    # after every test, so those tests go last
+    from django.test import TestCase, TransactionTestCase
+
+    def flushes(item) -> bool:
+        cls = getattr(item, 'cls', None)
+        return (cls is not None and issubclass(cls, TransactionTestCase)
+                and not issubclass(cls, TestCase))
+
+    items.sort(key=flushes)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def django_test_database(request):
+    if request.config.pluginmanager.hasplugin('django'):
+        yield
+        return
+    from tests.benchmarks import setup_django
+
+    teardown = setup_django()
+    yield
+    teardown()
@@ -1,11 +1,22 @@
 from rstr import xeger
+from rstr.xeger import STAR_PLUS_LIMIT
 from re import sub
 import json
 import django.core.validators
 from django.core.exceptions import ValidationError
 import logging
 import os
+import random
+import re
+import string
 from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Iterable
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_parse
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +26,10 @@ DEFAULT_TEXT_LEN = 50
 DEFAULT_INT_LEN = 10
 NUM_OF_FIXTURES = 10
 INVALID_DATA_LEN = 20
+# batch mode: how many candidates are generated and validated at once
+BATCH_SIZE = 10_000
+# batch mode: records written to disk at once
+WRITE_CHUNK = 1000
 
 class DataValidator:
     @staticmethod
@@ -66,6 +81,133 @@ class DataValidator:
         raise ValidationError('Invalid datetime format')
 
 
+# batch mode: regexes are parsed once and turned into functions that
+# build a random match, instead of rstr parsing and walking the pattern
+# for every value. Same rules as rstr.xeger: * and + repeat at most
+# STAR_PLUS_LIMIT times, negated sets and . pick from string.printable
+def _category_chars(category) -> str:
+    rgx = {
+        sre_parse.CATEGORY_DIGIT: r'\d',
+        sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+        sre_parse.CATEGORY_SPACE: r'\s',
+        sre_parse.CATEGORY_NOT_SPACE: r'\S',
+        sre_parse.CATEGORY_WORD: r'\w',
+        sre_parse.CATEGORY_NOT_WORD: r'\W',
+    }[category]
+    return ''.join(c for c in string.printable if re.fullmatch(rgx, c))
+
+
+def _set_chars(items) -> str:
+    # chars of [...]: literals, ranges, categories, maybe negated
+    chars = []
+    negate = False
+    for op, value in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            chars.append(chr(value))
+        elif op is sre_parse.RANGE:
+            chars.extend(chr(i) for i in range(value[0], value[1] + 1))
+        elif op is sre_parse.CATEGORY:
+            chars.extend(_category_chars(value))
+        else:
+            raise ValueError(f'unsupported in set: {op}')
+    if negate:
+        return ''.join(c for c in string.printable if c not in set(chars))
+    return ''.join(dict.fromkeys(chars))  # keep order, drop duplicates
+
+
+def _node_chars(op, value):
+    # chars a single-char node picks from, None if node is not one char
+    if op is sre_parse.IN:
+        return _set_chars(value)
+    if op is sre_parse.ANY:
+        return string.printable.replace('\n', '')
+    if op is sre_parse.CATEGORY:
+        return _category_chars(value)
+    if op is sre_parse.NOT_LITERAL:
+        return string.printable.replace(chr(value), '')
+    return None
+
+
+def _compile_seq(nodes) -> Callable[[random.Random], str]:
+    parts = [_compile_node(op, value) for op, value in nodes]
+    parts = [part for part in parts if part is not None]
+    if len(parts) == 1:
+        return parts[0]
+    return lambda rng: ''.join([part(rng) for part in parts])
+
+
+def _compile_node(op, value):
+    if op is sre_parse.LITERAL:
+        char = chr(value)
+        return lambda rng: char
+    if op in (sre_parse.AT, sre_parse.ASSERT_NOT):
+        return None
+    chars = _node_chars(op, value)
+    if chars is not None:
+        return lambda rng: rng.choice(chars)
+    if op is sre_parse.SUBPATTERN:
+        return _compile_seq(value[-1])
+    if op is sre_parse.ASSERT:
+        return _compile_seq(value[1])
+    if op is sre_parse.BRANCH:
+        options = [_compile_seq(seq) for seq in value[1]]
+        return lambda rng: rng.choice(options)(rng)
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        low, high, seq = value
+        high = min(high, STAR_PLUS_LIMIT)
+        # a repeated single char (the common case: [...]{1,50}, \d{1,10})
+        # is one rng.choices call instead of a loop
+        while len(seq) == 1 and seq[0][0] is sre_parse.SUBPATTERN:
+            seq = seq[0][1][-1]
+        if len(seq) == 1 and _node_chars(*seq[0]) is not None:
+            chars = _node_chars(*seq[0])
+            return lambda rng: ''.join(
+                rng.choices(chars, k=rng.randint(low, high))
+            )
+        part = _compile_seq(seq)
+        return lambda rng: ''.join(
+            [part(rng) for _ in range(rng.randint(low, high))]
+        )
+    raise ValueError(f'unsupported regex node: {op}')
+
+
+@lru_cache(maxsize=None)
+def compile_regex(rgx: str) -> Callable[[random.Random], str]:
+    '''
+    rgx -> function(rng) that returns one random string matching it
+    regex features rstr supports but this does not (backreferences)
+    fall back to rstr
+    '''
+    try:
+        return _compile_seq(sre_parse.parse(rgx))
+    except ValueError:
+        return lambda rng: xeger(rgx)
+
+
+def validate_bulk(validator, values: list) -> tuple:
+    '''
+    (valid values, number of invalid) - one pass over a batch,
+    django validators are built once instead of per value
+    '''
+    check = _BULK_VALIDATORS.get(validator, validator)
+    valid = []
+    for value in values:
+        try:
+            check(value)
+        except ValidationError:
+            continue
+        valid.append(value)
+    return valid, len(values) - len(valid)
+
+
+_BULK_VALIDATORS = {
+    DataValidator.validate_url: django.core.validators.URLValidator(),
+    DataValidator.validate_email: django.core.validators.EmailValidator(),
+}
+
+
 class DataGenerator:
     '''
     class to generate random data (only valid except generate_invalid_data)
@@ -76,11 +218,21 @@ class DataGenerator:
         func: check that randomly generated data is validateable
 
     output: lists with data_size num of elements
+
+    batch=True: regexes are compiled once (compile_regex), candidates are
+    generated and validated BATCH_SIZE at a time with a random.Random
+    seeded by seed (same seed - same data), failures are logged once per
+    batch instead of once per value
     '''
 
-    def __init__(self, num_of_fixtures = NUM_OF_FIXTURES) -> None:
+    def __init__(self, num_of_fixtures=NUM_OF_FIXTURES, batch: bool = False,
+                 seed=None, path: str = FIXTURES_DIR_PATH) -> None:
         # how many fixtures to make
         self.data_size = num_of_fixtures
+        self.batch = batch
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.path = path
         self.rules = {
             'limited': {
                 # for eaxmple https://example.com/image.jpg
@@ -162,6 +314,11 @@ class DataGenerator:
             return tuple(data)
         if max_len:
             rgx = f'(?:{rgx}){{1,{max_len}}}'
+        if self.batch:
+            return self._generate_batch(
+                rgx, data_type, validator, remove_whitespace, ensure_unique,
+                max_attempts_multiplier,
+            )
 
         attempts = 0
         # avoid not enough generations when validation is strict - simply make more generations
@@ -180,7 +337,9 @@ class DataGenerator:
             except Exception as e:
                 logger.warning(f'Casting to {data_type} failed: {e}')
 
-            if ensure_unique and elem not in seen:
+            if ensure_unique:
+                if elem in seen:
+                    continue
                 seen.add(elem)
 
             valid = True
@@ -194,6 +353,62 @@ class DataGenerator:
                 data.append(elem)
         return tuple(data)
 
+    def _generate_batch(self, rgx: str, data_type, validator,
+                        remove_whitespace: bool, ensure_unique: bool,
+                        max_attempts_multiplier: int) -> tuple:
+        # same as the loop in _generate_data, but a batch at a time
+        generate = compile_regex(rgx)
+        rng = self.random
+        data = []
+        seen = set() if ensure_unique else None
+        attempts = 0
+        max_attempts = self.data_size * max_attempts_multiplier
+        while len(data) < self.data_size and attempts < max_attempts:
+            need = self.data_size - len(data)
+            # a bit more than needed, some will fail validation
+            size = min(
+                BATCH_SIZE, max_attempts - attempts, need + need // 4 + 1
+            )
+            attempts += size
+            batch = [generate(rng) for _ in range(size)]
+            if remove_whitespace:
+                batch = [elem.strip() for elem in batch]
+            if data_type is not str:
+                batch = self._cast_bulk(batch, data_type)
+            if ensure_unique:
+                batch = [e for e in batch if not (e in seen or seen.add(e))]
+            if callable(validator):
+                batch, failed = validate_bulk(validator, batch)
+                if failed:
+                    logger.warning(
+                        f'Validation by {validator} failed for {failed} values'
+                    )
+            data.extend(batch[:need])
+        return tuple(data)
+
+    @staticmethod
+    def _cast_bulk(batch: list, data_type) -> list:
+        try:
+            return [data_type(elem) for elem in batch]
+        except Exception:
+            pass
+        # some value does not cast - keep it as is, like _generate_data
+        cast = []
+        failed = 0
+        for elem in batch:
+            try:
+                elem = data_type(elem)
+            except Exception:
+                failed += 1
+            cast.append(elem)
+        logger.warning(f'Casting to {data_type} failed for {failed} values')
+        return cast
+
+    def _xeger(self, rgx: str) -> str:
+        if self.batch:
+            return compile_regex(rgx)(self.random)
+        return xeger(rgx)
+
     # kwargs because there is too many args and just accept all of them
     def generate_urls(self, rule: str=None, data_type=str, validator=None, **kwargs) -> tuple:
         # sadly, cannot do generate_urls(self, rule: str=self.fixture_generators),
@@ -226,7 +441,10 @@ class DataGenerator:
             ...  # honestly i have no energy for this. regex for json is too big for now
         def rand_str(max_line_len: int = DEFAULT_TEXT_LEN) -> str:
             # random printable string without leading/trailing whitespace
-            s = xeger(self.rules['unlimited']['text'] + '{1,' + str(max_line_len) + '}')
+            s = self._xeger(
+                self.rules['unlimited']['text']
+                + '{1,' + str(max_line_len) + '}'
+            )
             return sub(r'^\s+|\s+$', '', s) or 'x'
         # produce a list (not nested) of small dicts per entry
         items = []
@@ -257,7 +475,7 @@ class DataGenerator:
         # only restriction is data_size
         rule = self.fixtures_generators['invalid']['rule'] if not rule else rule
         rgx = f'(?:{rule}){{1,{max_len}}}'
-        return tuple(xeger(rgx) for _ in range(self.data_size))
+        return tuple(self._xeger(rgx) for _ in range(self.data_size))
 
     def generate_fixtures(self) -> None:
         '''
@@ -280,14 +498,35 @@ class DataGenerator:
             )
 
     # fixture saved as json file
-    def save_fixture(self, fixture_name: str, valid_data, invalid_data, fixture_path=FIXTURES_DIR_PATH) -> None:
-        data = {
-            'valid': valid_data,
-            'invalid': invalid_data,
-        }
+    # valid_data and invalid_data can be any iterables (generators too):
+    # records are written as they come, WRITE_CHUNK at a time,
+    # so a million of them never sit in memory as one json string
+    def save_fixture(self, fixture_name: str, valid_data: Iterable,
+                     invalid_data: Iterable, fixture_path=None) -> None:
+        fixture_path = self.path if fixture_path is None else fixture_path
         os.makedirs(fixture_path, exist_ok=True)
-        fixture_path = f'{FIXTURES_DIR_PATH}/{fixture_name}.json'
+        fixture_path = f'{fixture_path}/{fixture_name}.json'
         with open(fixture_path, 'w', encoding='utf-8') as f:
-            # default=str handles datetime objects
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            f.write('{\n')
+            for key, records in (('valid', valid_data),
+                                 ('invalid', invalid_data)):
+                f.write(f'  "{key}": [')
+                self._write_records(f, records)
+                f.write('\n  ]' + (',\n' if key == 'valid' else '\n'))
+            f.write('}\n')
         return None
+
+    @staticmethod
+    def _write_records(f, records: Iterable) -> None:
+        # default=str handles datetime objects
+        encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+        chunk = []
+        separator = '\n    '
+        for record in records:
+            chunk.append(encode(record))
+            if len(chunk) == WRITE_CHUNK:
+                f.write(separator + ',\n    '.join(chunk))
+                separator = ',\n    '
+                chunk = []
+        if chunk:
+            f.write(separator + ',\n    '.join(chunk))
@@ -0,0 +1,447 @@
+'''
+Large synthetic dataset for load testing and benchmarks.
+
+python -m tests.dataset --channels 1000000 --days 730 --users 100000
+
+Builds users, channels with years of daily ChannelStats, and groups
+filled with channels in the configured database (DATABASE_URL): it only
+adds rows and never deletes. Benchmarks call build() on their throwaway
+test database instead.
+
+Rows are generated in chunks by a process pool; every chunk has its own
+random stream derived from the seed and the chunk number, so the same
+seed, sizes and --until produce the same rows whatever the number of
+workers. The parent process writes chunks in order as they arrive: with
+COPY on PostgreSQL, with bulk_create elsewhere. Primary keys are assigned
+up front (after the largest existing one) so stats and group membership
+rows can point at channels without reading them back.
+'''
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, Optional
+
+# rows per chunk handed to a worker (stats count: a channel with two years
+# of daily stats is 731 rows)
+CHUNK_ROWS = 50_000
+# Telegram ids of generated channels start here, far from real ones
+CHANNEL_ID_BASE = 9 * 10**12
+PASSWORD = 'load-Pa55word'
+STAFF_SHARE = 0.001
+POSTS_PER_CHANNEL = 5
+
+ADJECTIVES = (
+    'Новые', 'Главные', 'Быстрые', 'Честные', 'Умные', 'Свежие', 'Тихие',
+    'Daily', 'Open', 'Smart', 'Hot', 'Best', 'Fresh', 'Real', 'Deep',
+)
+NOUNS = (
+    'новости', 'заметки', 'обзоры', 'идеи', 'истории', 'цифры', 'факты',
+    'news', 'notes', 'digest', 'insights', 'market', 'tech', 'talks',
+)
+WORDS = (
+    'канал', 'сегодня', 'рынок', 'новый', 'обзор', 'рост', 'город', 'люди',
+    'проект', 'время', 'данные', 'неделя', 'итоги', 'вопрос', 'ответ',
+    'день', 'цена', 'команда', 'запуск', 'планы', 'подписчики', 'видео',
+    'today', 'update', 'release', 'price', 'team', 'launch', 'data',
+    'growth', 'story', 'thread', 'report', 'week', 'people', 'city',
+)
+COUNTRIES = ('RU', 'KZ', 'BY', 'UZ', 'UA', 'US', 'DE', 'GB', None)
+LANGUAGES = ('ru', 'en', 'kk', 'uz', None)
+
+
+@dataclass(frozen=True)
+class Spec:
+    '''What to generate; sent to every worker'''
+    seed: int
+    users: int
+    channels: int
+    groups: int
+    days: int
+    until: datetime
+    categories: tuple = ()
+    group_size: int = 200
+    password: str = ''
+    copy: bool = False
+    # first primary keys of the generated rows
+    first_ids: dict = field(default_factory=dict)
+
+
+def _rng(spec: Spec, table: str, chunk: int) -> random.Random:
+    return random.Random(f'{spec.seed}:{table}:{chunk}')
+
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _user_rows(spec: Spec, chunk: int, start: int, stop: int) -> list:
+    rng = _rng(spec, 'users', chunk)
+    first = spec.first_ids['users']
+    rows = []
+    for i in range(start, stop):
+        pk = first + i
+        joined = spec.until - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        rows.append((
+            pk, spec.password, False, f'load-{pk}',
+            rng.choice(ADJECTIVES), rng.choice(NOUNS), f'load-{pk}@example.com',
+            rng.random() < STAFF_SHARE, True, joined, _text(rng, 0, 12),
+        ))
+    return rows
+
+
+USER_COLUMNS = (
+    'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name',
+    'email', 'is_staff', 'is_active', 'date_joined', 'bio',
+)
+
+
+def _posts(rng: random.Random, views: int) -> list:
+    return [
+        {
+            'post_id': post_id,
+            'post_text': _text(rng, 5, 30),
+            'post_views': max(0, int(rng.gauss(views, views / 4))),
+        }
+        for post_id in sorted(rng.sample(range(1, 100_000), POSTS_PER_CHANNEL))
+    ]
+
+
+def _channel_rows(spec: Spec, chunk: int, start: int, stop: int) -> tuple:
+    '''Channels start..stop and their stats, one a day for spec.days'''
+    rng = _rng(spec, 'channels', chunk)
+    first = spec.first_ids['channels']
+    channels, stats = [], []
+    # dates of the stats, oldest first, shared by every channel
+    dates = [
+        spec.until - timedelta(days=day) for day in range(spec.days, -1, -1)
+    ]
+    for i in range(start, stop):
+        pk = first + i
+        # subscribers: a few huge channels, a long tail of small ones
+        subscribers = min(int(rng.lognormvariate(7, 2)), 50_000_000)
+        trend = rng.gauss(0.001, 0.002)
+        # walk back from today's count, so the last stat matches the channel
+        counts = [subscribers]
+        for _ in range(spec.days):
+            count = counts[-1]
+            counts.append(max(0, count - int(count * rng.gauss(trend, 0.003))))
+        counts.reverse()
+        growths = [0, *map(int.__sub__, counts[1:], counts)]
+        stats.extend(zip(repeat(pk), counts, growths, dates))
+        growth = growths[-1]
+        views = max(1, subscribers // rng.randint(3, 20))
+        created = spec.until - timedelta(
+            days=spec.days + rng.randrange(3000), seconds=rng.randrange(86400),
+        )
+        channels.append((
+            pk, CHANNEL_ID_BASE + pk, f'load_{pk}',
+            f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {pk}',
+            _text(rng, 5, 60), subscribers, {}, spec.until,
+            [{'text': _text(rng, 3, 20), 'id': rng.randrange(1, 100_000)}],
+            created, _posts(rng, views), views, growth,
+            rng.choice(spec.categories) if spec.categories else None,
+            rng.choice(COUNTRIES), rng.choice(LANGUAGES),
+        ))
+    return channels, stats
+
+
+CHANNEL_COLUMNS = (
+    'id', 'channel_id', 'username', 'title', 'description',
+    'participants_count', 'photo_thumbs', 'parsed_at', 'pinned_messages',
+    'creation_date', 'last_messages', 'average_views', 'daily_growth',
+    'category', 'country', 'language',
+)
+STATS_COLUMNS = ('channel', 'participants_count', 'daily_growth', 'parsed_at')
+
+
+def _group_rows(spec: Spec, chunk: int, start: int, stop: int) -> tuple:
+    rng = _rng(spec, 'groups', chunk)
+    first = spec.first_ids['groups']
+    channels = range(
+        spec.first_ids['channels'], spec.first_ids['channels'] + spec.channels
+    )
+    users = range(spec.first_ids['users'], spec.first_ids['users'] + spec.users)
+    groups, members = [], []
+    for i in range(start, stop):
+        pk = first + i
+        size = min(
+            len(channels), int(rng.expovariate(1 / spec.group_size)) + 1
+        )
+        created = spec.until - timedelta(seconds=rng.randrange(365 * 86400))
+        groups.append((
+            pk, f'Load group {pk}', f'load-group-{pk}', _text(rng, 0, 15),
+            rng.choice(users), rng.random() < 0.05, i, size, '',
+            created, created,
+        ))
+        members.extend((pk, channel) for channel in rng.sample(channels, size))
+    return groups, members
+
+
+GROUP_COLUMNS = (
+    'id', 'name', 'slug', 'description', 'owner', 'is_editorial', 'order',
+    'channel_count', 'image_url', 'created_at', 'updated_at',
+)
+MEMBER_COLUMNS = ('group', 'telegramchannel')
+
+JSON_COLUMNS = {'photo_thumbs', 'pinned_messages', 'last_messages'}
+
+
+def _csv(rows: list, columns: tuple) -> str:
+    '''
+    Rows as CSV for COPY: strings are quoted, None stays an unquoted
+    empty field, which COPY reads as NULL
+    '''
+    json_at = [i for i, name in enumerate(columns) if name in JSON_COLUMNS]
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_STRINGS, lineterminator='\n')
+    for row in rows:
+        if json_at:
+            row = list(row)
+            for i in json_at:
+                row[i] = json.dumps(row[i], ensure_ascii=False)
+        writer.writerow(row)
+    return out.getvalue()
+
+
+def _generate(kind: str, spec: Spec, chunk: int, start: int,
+              stop: int) -> list:
+    '''Worker: [(table, columns, rows or CSV, number of rows), ...]'''
+    if kind == 'users':
+        parts = [('users', USER_COLUMNS, _user_rows(spec, chunk, start, stop))]
+    elif kind == 'channels':
+        channels, stats = _channel_rows(spec, chunk, start, stop)
+        parts = [
+            ('channels', CHANNEL_COLUMNS, channels),
+            ('stats', STATS_COLUMNS, stats),
+        ]
+    else:
+        groups, members = _group_rows(spec, chunk, start, stop)
+        parts = [
+            ('groups', GROUP_COLUMNS, groups),
+            ('members', MEMBER_COLUMNS, members),
+        ]
+    return [
+        (table, columns, _csv(rows, columns) if spec.copy else rows, len(rows))
+        for table, columns, rows in parts
+    ]
+
+
+def _chunks(kind: str, total: int, per_chunk: int) -> Iterator[tuple]:
+    for chunk, start in enumerate(range(0, total, per_chunk)):
+        yield kind, chunk, start, min(start + per_chunk, total)
+
+
+def _ordered(executor, fn: Callable, tasks: Iterable[tuple],
+             window: int) -> Iterator:
+    '''
+    executor.map that keeps at most window chunks in flight, so a slow
+    database doesn't pile generated chunks up in memory
+    '''
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, *task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _Inline:
+    '''Executor stand-in for workers=1'''
+
+    def submit(self, fn, *args):
+        class Done:
+            def result(self):
+                return fn(*args)
+        return Done()
+
+
+def _models() -> dict:
+    from config.group_channels.models import Group
+    from config.parser.models import ChannelStats, TelegramChannel
+    from config.users.models import User
+
+    return {
+        'users': User,
+        'channels': TelegramChannel,
+        'stats': ChannelStats,
+        'groups': Group,
+        'members': Group.channels.through,
+    }
+
+
+def _write(model, columns: tuple, payload, copy: bool) -> None:
+    from django.db import connection
+
+    fields = [model._meta.get_field(name) for name in columns]
+    if copy:
+        names = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)',
+                io.StringIO(payload),
+            )
+        return
+    attnames = [f.attname for f in fields]
+    # generated dates must not be replaced with now()
+    auto = [
+        (f, f.auto_now, f.auto_now_add) for f in fields
+        if getattr(f, 'auto_now_add', False) or getattr(f, 'auto_now', False)
+    ]
+    for f, _, _ in auto:
+        f.auto_now = f.auto_now_add = False
+    try:
+        # the base manager skips the cache invalidation of every chunk;
+        # build() invalidates once at the end
+        model._base_manager.bulk_create(
+            [model(**dict(zip(attnames, row))) for row in payload],
+            batch_size=2000,
+        )
+    finally:
+        for f, auto_now, auto_now_add in auto:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def build(seed: int = 1, users: int = 1000, channels: int = 10_000,
+          days: int = 365, groups: int = 100, group_size: int = 200,
+          until: Optional[datetime] = None, workers: Optional[int] = None,
+          chunk_rows: int = CHUNK_ROWS, copy: Optional[bool] = None,
+          verbose: bool = False) -> dict:
+    '''
+    Generate the dataset into the default database.
+    Returns {table: rows written, 'seconds': wall time}.
+    '''
+    from django.contrib.auth.hashers import make_password
+    from django.core.management.color import no_style
+    from django.db import connection, transaction
+    from django.db.models import Max
+
+    from config.cache import invalidate_model
+    from config.group_channels import services
+    from config.parser.models import Category
+
+    models = _models()
+    if copy is None:
+        copy = connection.vendor == 'postgresql'
+    if until is None:
+        until = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+    first_ids = {
+        table: 1 + (
+            models[table]._base_manager.aggregate(m=Max('pk'))['m'] or 0
+        )
+        for table in ('users', 'channels', 'groups')
+    }
+    spec = Spec(
+        seed=seed, users=users, channels=channels, groups=groups, days=days,
+        until=until, group_size=group_size, copy=copy, first_ids=first_ids,
+        categories=tuple(Category.objects.values_list('pk', flat=True)),
+        password=make_password(PASSWORD),
+    )
+    per_channel = days + 2
+    tasks = [
+        *_chunks('users', users, chunk_rows),
+        *_chunks('channels', channels, max(1, chunk_rows // per_channel)),
+        # groups go last: they point at users and channels
+        *_chunks('groups', groups, max(1, chunk_rows // (group_size + 1))),
+    ]
+    workers = workers or os.cpu_count() or 1
+    written = dict.fromkeys(models, 0)
+    start = time.perf_counter()
+    # spawn: workers need neither Django nor the parent's open connection
+    # and logging thread, which fork would copy
+    executor = (
+        ProcessPoolExecutor(workers, mp_context=get_context('spawn'))
+        if workers > 1 else _Inline()
+    )
+    try:
+        for parts in _ordered(
+            executor, _generate, ((k, spec, *rest) for k, *rest in tasks),
+            window=workers * 2,
+        ):
+            with transaction.atomic():
+                for table, columns, payload, rows in parts:
+                    _write(models[table], columns, payload, copy)
+                    written[table] += rows
+            if verbose:
+                elapsed = time.perf_counter() - start
+                total = sum(written.values())
+                print(f'\r{total:>12} rows {total / elapsed:>10.0f} rows/s',
+                      end='', flush=True)
+    finally:
+        if workers > 1:
+            executor.shutdown(cancel_futures=True)
+    if verbose:
+        print()
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), list(models.values())
+        ):
+            cursor.execute(sql)
+    # channels and members were written past the signals: bring existing
+    # materialised auto groups and auto group counters up to date (after
+    # the sequence reset: materialize_rules inserts through the ORM)
+    services.materialize_rules()
+    services.refresh_category_counts()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    for model in models.values():
+        invalidate_model(model)
+    written['seconds'] = time.perf_counter() - start
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--channels', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=730,
+                        help='days of ChannelStats per channel')
+    parser.add_argument('--groups', type=int, default=10_000)
+    parser.add_argument('--group-size', type=int, default=200,
+                        help='mean number of channels in a group')
+    parser.add_argument('--until', type=datetime.fromisoformat, default=None,
+                        help='date of the last stats (default: today)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--no-copy', dest='copy', action='store_const',
+                        const=False, default=None,
+                        help='bulk_create even on PostgreSQL')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    until = args.until
+    if until is not None and until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    written = build(
+        seed=args.seed, users=args.users, channels=args.channels,
+        days=args.days, groups=args.groups, group_size=args.group_size,
+        until=until, workers=args.workers, chunk_rows=args.chunk_rows,
+        copy=args.copy, verbose=True,
+    )
+    seconds = written.pop('seconds')
+    for table, rows in written.items():
+        print(f'{table:<10} {rows:>14}')
+    print(f'{sum(written.values())} rows in {seconds:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
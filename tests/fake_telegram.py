@@ -0,0 +1,317 @@
+'''
+Offline stand-in for telethon.TelegramClient.
+
+FakeTelegramClient implements what the parser uses — connect,
+disconnect, get_entity, get_messages, download_profile_photo and
+client(GetFullChannelRequest(...)) — over a generated channel corpus,
+so tg_parser, parse_channel, the import and ParserView run without a
+Telegram account:
+
+    TELEGRAM_CLIENT=tests.fake_telegram.FakeTelegramClient
+
+The corpus has the channels of tests/dataset.py: username load_<n>,
+Telegram id CHANNEL_ID_BASE + n, for n in 1..size. A channel is made on
+request from the seed and n, so it is the same on every call and in
+every process. A share of them does not exist or is private.
+
+Clients share a FakeTelegram "server" (the module-level `server` unless
+one is passed as telegram=) that holds the corpus, the behaviour — latency
+distributions per method, FloodWait and error rates — and counts every
+RPC. Like Telethon, a client sleeps through FloodWaits up to
+flood_sleep_threshold seconds itself and raises longer ones.
+'''
+import asyncio
+import io
+import math
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from PIL import Image
+from telethon.errors import (
+    ChannelInvalidError,
+    FloodWaitError,
+    UsernameNotOccupiedError,
+)
+from telethon.errors.rpcbaseerrors import ServerError
+from telethon.tl.functions.channels import GetFullChannelRequest
+
+from tests.dataset import ADJECTIVES, CHANNEL_ID_BASE, NOUNS, WORDS
+
+Latency = Callable[[random.Random], float]
+
+USERNAME_RE = re.compile(
+    r'^(?:https?://)?(?:www\.)?(?:t\.me/|telegram\.me/)?@?(\w+)/?$'
+)
+CORPUS_RE = re.compile(r'^load_(\d+)$')
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+# latency distributions: rng -> seconds
+
+def constant(seconds: float) -> Latency:
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> Latency:
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Latency:
+    '''Long right tail, like network round trips'''
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+@dataclass
+class Behaviour:
+    '''
+    How the fake Telegram answers. latency: {method: distribution},
+    'default' for methods without their own. Every RPC fails with
+    FloodWait (seconds drawn from flood_wait_seconds) with
+    flood_wait_rate probability, with a server error with error_rate.
+    '''
+    latency: dict = field(
+        default_factory=lambda: {'default': lognormal(0.05)}
+    )
+    flood_wait_rate: float = 0.0
+    flood_wait_seconds: tuple = (1, 5)
+    error_rate: float = 0.0
+
+    def delay(self, method: str, rng: random.Random) -> float:
+        latency = self.latency.get(method) or self.latency['default']
+        return max(0.0, latency(rng))
+
+
+@dataclass
+class Channel:
+    id: int
+    username: str
+    title: str
+    verified: bool
+    date: datetime
+    photo: Optional[SimpleNamespace]
+    participants_count: int
+    about: str
+    pinned_msg_id: Optional[int]
+    messages: list  # newest first
+
+
+class Corpus:
+    '''
+    Channels load_1..load_<size>; missing_rate of them don't exist,
+    private_rate are private
+    '''
+
+    def __init__(self, seed: int = 1, size: int = 100_000,
+                 messages: int = 30, missing_rate: float = 0.02,
+                 private_rate: float = 0.01) -> None:
+        self.seed = seed
+        self.size = size
+        self.messages = messages
+        self.missing_rate = missing_rate
+        self.private_rate = private_rate
+        self.channel = lru_cache(maxsize=10_000)(self._channel)
+
+    def usernames(self, count: int, start: int = 1) -> list:
+        return [f'load_{n}' for n in range(start, start + count)]
+
+    def status(self, n: int) -> str:
+        ''''ok', 'missing' or 'private' — the same for n on every call'''
+        roll = random.Random(f'{self.seed}:status:{n}').random()
+        if roll < self.missing_rate:
+            return 'missing'
+        if roll < self.missing_rate + self.private_rate:
+            return 'private'
+        return 'ok'
+
+    def _channel(self, n: int) -> Channel:
+        rng = random.Random(f'{self.seed}:telegram:{n}')
+        participants = min(int(rng.lognormvariate(7, 2)), 50_000_000)
+        views = max(1, participants // rng.randint(3, 20))
+        last_id = rng.randint(self.messages, 100_000)
+        messages = [
+            SimpleNamespace(
+                id=post_id,
+                message=' '.join(rng.choices(WORDS, k=rng.randint(3, 40))),
+                views=max(0, int(rng.gauss(views, views / 4))),
+            )
+            for post_id in range(last_id, last_id - self.messages, -1)
+        ]
+        for message in messages:
+            message.text = message.message
+        photo = (
+            SimpleNamespace(photo_id=rng.getrandbits(62))
+            if rng.random() < 0.8 else None
+        )
+        return Channel(
+            id=CHANNEL_ID_BASE + n,
+            username=f'load_{n}',
+            title=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n}',
+            verified=rng.random() < 0.01,
+            date=EPOCH - timedelta(seconds=rng.randrange(10 * 365 * 86400)),
+            photo=photo,
+            participants_count=participants,
+            about=' '.join(rng.choices(WORDS, k=rng.randint(0, 60))),
+            pinned_msg_id=(
+                rng.choice(messages).id if rng.random() < 0.5 else None
+            ),
+            messages=messages,
+        )
+
+    def find(self, username: str) -> tuple:
+        '''(status, Channel or None) for a username'''
+        match = CORPUS_RE.match(username or '')
+        n = int(match.group(1)) if match else 0
+        if not 1 <= n <= self.size:
+            return 'missing', None
+        status = self.status(n)
+        return status, self.channel(n) if status == 'ok' else None
+
+
+@lru_cache(maxsize=256)
+def _photo(photo_id: int) -> bytes:
+    color = (photo_id & 0xFF, photo_id >> 8 & 0xFF, photo_id >> 16 & 0xFF)
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 640), color).save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+class FakeTelegram:
+    '''Corpus, behaviour and RPC statistics shared by clients'''
+
+    def __init__(self, corpus: Optional[Corpus] = None,
+                 behaviour: Optional[Behaviour] = None,
+                 seed: int = 1) -> None:
+        self.corpus = corpus or Corpus(seed)
+        self.behaviour = behaviour or Behaviour()
+        self.random = random.Random(f'{seed}:behaviour')
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = Counter()
+        self.flood_waits = Counter()
+        self.errors = Counter()
+        self.latencies = defaultdict(list)
+
+    def rpc_count(self) -> int:
+        return sum(self.calls.values())
+
+    async def rpc(self, method: str) -> None:
+        '''One round trip: wait, then maybe fail'''
+        self.calls[method] += 1
+        behaviour = self.behaviour
+        start = time.perf_counter()
+        await asyncio.sleep(behaviour.delay(method, self.random))
+        self.latencies[method].append(time.perf_counter() - start)
+        roll = self.random.random()
+        if roll < behaviour.flood_wait_rate:
+            self.flood_waits[method] += 1
+            raise FloodWaitError(
+                request=None,
+                capture=self.random.randint(*behaviour.flood_wait_seconds),
+            )
+        if roll < behaviour.flood_wait_rate + behaviour.error_rate:
+            self.errors[method] += 1
+            raise ServerError(None, 'RPC_CALL_FAIL', 500)
+
+
+server = FakeTelegram()
+
+
+class FakeTelegramClient:
+    '''The part of telethon.TelegramClient the parser uses'''
+
+    def __init__(self, telegram: Optional[FakeTelegram] = None,
+                 flood_sleep_threshold: int = 60) -> None:
+        self.server = telegram or server
+        self.flood_sleep_threshold = flood_sleep_threshold
+        self._connected = False
+
+    async def __aenter__(self) -> 'FakeTelegramClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.disconnect()
+
+    async def connect(self) -> None:
+        if not self._connected:
+            await asyncio.sleep(
+                self.server.behaviour.delay('connect', self.server.random)
+            )
+            self._connected = True
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def _rpc(self, method: str) -> None:
+        if not self._connected:
+            raise ConnectionError('Cannot send requests while disconnected')
+        while True:
+            try:
+                return await self.server.rpc(method)
+            except FloodWaitError as e:
+                if e.seconds > self.flood_sleep_threshold:
+                    raise
+                await asyncio.sleep(e.seconds)
+
+    def _channel(self, entity) -> Channel:
+        if isinstance(entity, Channel):
+            return entity
+        match = USERNAME_RE.match(str(entity).strip())
+        status, channel = self.server.corpus.find(
+            match.group(1) if match else ''
+        )
+        if status == 'missing':
+            raise UsernameNotOccupiedError(request=None)
+        if status == 'private':
+            raise ChannelInvalidError(request=None)
+        return channel
+
+    async def get_entity(self, entity) -> Channel:
+        await self._rpc('get_entity')
+        return self._channel(entity)
+
+    async def get_messages(self, entity, limit: Optional[int] = None,
+                           ids=None):
+        '''
+        Newest messages first; ids=int — that message or None,
+        ids=list — a list with None for missing ones
+        '''
+        await self._rpc('get_messages')
+        channel = self._channel(entity)
+        if ids is not None:
+            by_id = {message.id: message for message in channel.messages}
+            if isinstance(ids, int):
+                return by_id.get(ids)
+            return [by_id.get(i) for i in ids]
+        return channel.messages[:limit]
+
+    async def download_profile_photo(self, entity, file=None,
+                                     download_big: bool = True):
+        await self._rpc('download_profile_photo')
+        channel = self._channel(entity)
+        if channel.photo is None:
+            return None
+        return _photo(channel.photo.photo_id)
+
+    async def __call__(self, request):
+        if not isinstance(request, GetFullChannelRequest):
+            raise NotImplementedError(type(request).__name__)
+        await self._rpc('GetFullChannelRequest')
+        channel = self._channel(request.channel)
+        return SimpleNamespace(full_chat=SimpleNamespace(
+            participants_count=channel.participants_count,
+            about=channel.about,
+            pinned_msg_id=channel.pinned_msg_id,
+        ))
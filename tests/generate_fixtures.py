@@ -1,11 +1,21 @@
-from typing import Dict, List, Tuple, Any
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, Iterator, Tuple
 
-from tests.data_generator import DataGenerator, NUM_OF_FIXTURES
+from tests.data_generator import (
+    FIXTURES_DIR_PATH,
+    NUM_OF_FIXTURES,
+    DataGenerator,
+)
 
 # Avoid importing Django app modules (which may require settings/db) just to get constants.
 # Use project defaults, falling back safely if not importable.
-from config.users.models import ROLE_MAXLENGTH, BIO_MAXLENGTH
+try:
+    from config.users.models import BIO_MAXLENGTH, ROLE_MAXLENGTH
+except Exception:  # settings not configured (CI step, pool workers)
+    ROLE_MAXLENGTH = 150
+    BIO_MAXLENGTH = 200
 
 logger = logging.getLogger(__name__)
 
@@ -17,24 +27,39 @@ class ModelAndFormFixtureGenerator:
     not all models and forms present, because some of them require foreign key etc.
     in future, need to connect to present DB or make local SQLite, populate it and test via it
     '''
-    def __init__(self, num: int = NUM_OF_FIXTURES) -> None:
-        self.gen = DataGenerator(num)
+    FAMILIES = (
+        'model_users_user',
+        'model_parser_telegram_channel',
+        'form_user_login',
+        'form_user_reg',
+        'form_user_update',
+        'form_user_avatar_change',
+        'form_restore_password_request',
+        'form_restore_password',
+        'form_group_create',
+        'form_group_update',
+        'form_parser_channel_parse',
+    )
+
+    def __init__(self, num: int = NUM_OF_FIXTURES, batch: bool = False,
+                 seed=None, path: str = FIXTURES_DIR_PATH) -> None:
+        self.gen = DataGenerator(num, batch=batch, seed=seed, path=path)
         self.size = self.gen.data_size
 
-    def _compose(self, field_values: Dict[str, Tuple[Any, ...]]) -> Tuple[Dict[str, Any], ...]:
+    def _compose(
+        self, field_values: Dict[str, Tuple[Any, ...]]
+    ) -> Iterator[Dict[str, Any]]:
         '''
-        Compose list of dicts from generated data
+        Compose dicts from generated data, one at a time
+        (save_fixture writes them as they come)
         '''
-        size = self.size
         keys = list(field_values.keys())
-        records: List[Dict[str, Any]] = []
-        for i in range(size):
+        for i in range(self.size):
             rec = {}
             for k in keys:
                 vals = field_values[k]
                 rec[k] = vals[i] if i < len(vals) else None
-            records.append(rec)
-        return tuple(records)
+            yield rec
 
     # make invalid data (its only strings, so _invalid_strings)
     def _invalid_strings(self) -> Tuple[str, ...]:
@@ -338,21 +363,29 @@ class ModelAndFormFixtureGenerator:
         self.gen.save_fixture('form_parser_channel_parse', valid, invalid)
 
     # can simply make obj and call this method to get every fixture file
-    def generate_all(self) -> None:
+    def generate_all(self, workers: int = 1) -> None:
         '''
         for now only includes forms and models that not require database relations.
+        workers > 1: families are independent (one file each), so they are
+        generated in parallel by a process pool
         '''
-        self.model_users_user()
-        self.model_parser_telegram_channel()
-
-        self.form_user_login()
-        self.form_user_reg()
-        self.form_user_update()
-        self.form_user_avatar_change()
-        self.form_restore_password_request()
-        self.form_restore_password()
-
-        self.form_group_create()
-        self.form_group_update()
-
-        self.form_parser_channel_parse()
+        gen = self.gen
+        if workers <= 1:
+            for name in self.FAMILIES:
+                _generate_family(name, self.size, gen.batch, gen.seed, gen.path)
+            return
+        with ProcessPoolExecutor(workers) as executor:
+            # list() to get exceptions from workers
+            list(executor.map(
+                _generate_family, self.FAMILIES, repeat(self.size),
+                repeat(gen.batch), repeat(gen.seed), repeat(gen.path),
+            ))
+
+
+def _generate_family(name: str, num: int, batch: bool, seed, path: str) -> None:
+    # pool worker: one fixture family, own random stream from the seed
+    seed = None if seed is None else f'{seed}:{name}'
+    generator = ModelAndFormFixtureGenerator(
+        num, batch=batch, seed=seed, path=path
+    )
+    getattr(generator, name)()
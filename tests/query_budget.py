@@ -0,0 +1,222 @@
+'''
+Query budgets for views.
+
+QueryRecorder records every SQL query run inside a block together with
+its shape (the SQL with literals and IN/VALUES lists collapsed) and
+where it came from: project frames of the Python stack and, for queries
+run while a template renders, the template name and line.
+
+assert_query_budget() fails when the block runs more queries than the
+budget, or when one shape repeats more than max_repeats times, which is
+how an N+1 looks from the database side. The failure lists the
+offending queries with their call stacks.
+
+Registered as a pytest plugin by tests/conftest.py, it also adds
+@pytest.mark.query_budget(max_queries, max_repeats=...), which puts the
+whole test body under a budget, and the query_budget fixture.
+'''
+import re
+import sys
+import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# one shape may run this many times in a block before it counts as N+1
+MAX_REPEATS = 2
+# distinct call stacks shown per offending shape
+MAX_STACKS = 3
+
+# transaction control and the test case's own checks are not work a view
+# asks for; they are neither counted nor recorded
+IGNORED_SHAPES = re.compile(
+    r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO|PRAGMA foreign_key_check)\b'
+)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_LISTS_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def query_shape(sql: str) -> str:
+    '''
+    SQL without values: literals become ?, parameter lists of any
+    length become (...), so the same query for other rows has the same
+    shape.
+    '''
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _LIST_RE.sub('(...)', shape)
+    shape = _LISTS_RE.sub('(...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+@dataclass
+class Query:
+    sql: str
+    shape: str
+    stack: tuple = field(default=())
+
+
+def _format_stack(stack: tuple) -> str:
+    return '\n'.join(f'    {line}' for line in stack) or '    ?'
+
+
+def _template_frames(frame) -> list:
+    '''
+    Template name and line for every template node being rendered,
+    innermost first
+    '''
+    found = []
+    while frame is not None:
+        code = frame.f_code
+        if (code.co_name == 'render_annotated'
+                and code.co_filename.endswith('template/base.py')):
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                location = f'{origin.template_name}:{token.lineno} (template)'
+                if location not in found:
+                    found.append(location)
+        frame = frame.f_back
+    return found
+
+
+def _project_frames(frame) -> list:
+    '''Python frames of the project code, innermost first'''
+    frames = []
+    for summary in reversed(traceback.extract_stack(frame)):
+        path = Path(summary.filename)
+        if path == Path(__file__) or not path.is_relative_to(BASE_DIR):
+            continue
+        if 'site-packages' in path.parts or '.venv' in path.parts:
+            continue
+        relative = path.relative_to(BASE_DIR)
+        frames.append(f'{relative}:{summary.lineno} in {summary.name}')
+    return frames
+
+
+class QueryRecorder:
+    '''
+    Records queries of one database connection inside a with block
+    '''
+
+    def __init__(self, using: str = 'default') -> None:
+        self.using = using
+        self.queries: list = []
+        self._wrapper = None
+
+    def __enter__(self) -> 'QueryRecorder':
+        from django.db import connections
+
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = query_shape(sql)
+        if not IGNORED_SHAPES.match(shape):
+            frame = sys._getframe(1)
+            stack = _template_frames(frame) + _project_frames(frame)
+            self.queries.append(Query(sql, shape, tuple(stack)))
+        return execute(sql, params, many, context)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def repeated(self, max_repeats: int = MAX_REPEATS) -> dict:
+        '''{shape: queries} for shapes run more than max_repeats times'''
+        by_shape = defaultdict(list)
+        for query in self.queries:
+            by_shape[query.shape].append(query)
+        return {
+            shape: queries for shape, queries in by_shape.items()
+            if len(queries) > max_repeats
+        }
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def check_budget(recorder: QueryRecorder, max_queries: Optional[int] = None,
+                 max_repeats: Optional[int] = MAX_REPEATS,
+                 label: str = '') -> list:
+    '''Problems found in the recorded queries, as lines of a report'''
+    problems = []
+    if max_queries is not None and len(recorder) > max_queries:
+        problems.append(
+            f'{len(recorder)} queries, budget {max_queries}:\n'
+            + '\n'.join(
+                f'  {i}. {query.shape}\n{_format_stack(query.stack[:2])}'
+                for i, query in enumerate(recorder.queries, 1)
+            )
+        )
+    if max_repeats is not None:
+        for shape, queries in recorder.repeated(max_repeats).items():
+            stacks = []
+            for query in queries:
+                if query.stack not in stacks:
+                    stacks.append(query.stack)
+            shown = '\n  ---\n'.join(
+                _format_stack(stack) for stack in stacks[:MAX_STACKS]
+            )
+            problems.append(
+                f'N+1: the same query ran {len(queries)} times '
+                f'(allowed {max_repeats}):\n  {shape}\n{shown}'
+            )
+    if problems and label:
+        problems.insert(0, label)
+    return problems
+
+
+@contextmanager
+def assert_query_budget(max_queries: Optional[int] = None,
+                        max_repeats: Optional[int] = MAX_REPEATS,
+                        label: str = '',
+                        using: str = 'default') -> Iterator[QueryRecorder]:
+    '''
+    Fail if the block runs more than max_queries queries or repeats a
+    query shape more than max_repeats times (None turns a check off)
+    '''
+    with QueryRecorder(using) as recorder:
+        yield recorder
+    problems = check_budget(recorder, max_queries, max_repeats, label)
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(problems))
+
+
+# pytest plugin
+
+def pytest_configure(config) -> None:
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries=None, max_repeats=2): fail the test if '
+        'its body runs more queries or repeats a query shape (N+1)',
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    if marker is None:
+        return (yield)
+    with assert_query_budget(*marker.args, label=item.nodeid, **marker.kwargs):
+        return (yield)
+
+
+@pytest.fixture
+def query_budget():
+    '''with query_budget(10): ... — assert_query_budget as a fixture'''
+    return assert_query_budget
@@ -0,0 +1,115 @@
+'''
+Channel photo thumbnails: replaced and orphaned files leave the media
+store, shared and counted-again ones stay; ParserView finds the stored
+photo id.
+'''
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from config import media
+from config.group_channels.models import Group
+from config.parser import avatars
+from config.parser.models import TelegramChannel, ThumbnailRef
+from config.parser.views import ParserView
+from tests.test_media import TempMediaMixin
+
+User = get_user_model()
+
+
+def thumbs(seed: bytes) -> dict:
+    # as the parser stores them: every call counts one more channel
+    return avatars.store_thumbnails({64: seed + b'-64', 320: seed + b'-320'})
+
+
+class DiscardThumbnailsTests(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.channel = TelegramChannel.objects.create(
+            channel_id=1001, username='Channel', title='Channel',
+            photo_id=1, photo_thumbs=thumbs(b'old'),
+        )
+        self.old = list(self.channel.photo_thumbs.values())
+
+    def stored(self, refs) -> list:
+        storage = media.get_storage()
+        return [storage.exists(media.ref_path(ref)) for ref in refs]
+
+    def replace_photo(self):
+        channel = TelegramChannel.objects.get(pk=self.channel.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            channel.photo_id = 2
+            channel.photo_thumbs = thumbs(b'new')
+            channel.save()
+        return channel
+
+    def test_replaced_thumbnails_are_removed(self):
+        channel = self.replace_photo()
+        self.assertEqual(self.stored(self.old), [False, False])
+        self.assertEqual(
+            self.stored(channel.photo_thumbs.values()), [True, True]
+        )
+
+    def test_unrelated_save_keeps_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.channel.title = 'Renamed'
+            self.channel.save()
+            TelegramChannel.objects.get(pk=self.channel.pk).save(
+                update_fields=['title']
+            )
+        self.assertEqual(self.stored(self.old), [True, True])
+
+    def test_shared_thumbnails_stay(self):
+        TelegramChannel.objects.create(
+            channel_id=1002, username='copy', title='Copy',
+            photo_thumbs={'64': avatars.store_thumbnail(b'old-64')},
+        )
+        owner = User.objects.create_user('owner', 'o@example.com', 'x')
+        Group.objects.create(name='Group', owner=owner, image_url=self.old[1])
+        self.replace_photo()
+        self.assertEqual(self.stored(self.old), [True, True])
+        self.assertEqual(ThumbnailRef.objects.get(ref=self.old[0]).count, 1)
+
+    def test_thumbnail_stored_while_replaced_stays(self):
+        # another channel gets the same photo before the replacement
+        # commits: the file the upload relies on must survive it
+        channel = TelegramChannel.objects.get(pk=self.channel.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            channel.photo_thumbs = thumbs(b'new')
+            channel.save()
+            upload = thumbs(b'old')
+        self.assertEqual(upload, dict(zip(('64', '320'), self.old)))
+        self.assertEqual(self.stored(self.old), [True, True])
+
+    def test_thumbnail_stored_again_after_removal(self):
+        self.replace_photo()
+        self.assertFalse(ThumbnailRef.objects.filter(ref=self.old[0]))
+        thumbs(b'old')
+        self.assertEqual(self.stored(self.old), [True, True])
+
+    def test_uncounted_files_are_kept(self):
+        ref = media.store(b'legacy', 'webp')
+        avatars.discard_thumbnails([ref])
+        self.assertEqual(self.stored([ref]), [True])
+
+    def test_deleted_channel_thumbnails_are_removed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.channel.delete()
+        self.assertEqual(self.stored(self.old), [False, False])
+
+
+class StoredPhotoIdTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        TelegramChannel.objects.create(
+            channel_id=1001, username='Channel', title='Channel', photo_id=7,
+        )
+
+    def test_lookup(self):
+        view = ParserView()
+        for identifier in ('channel', '@Channel', 'https://t.me/channel',
+                           '1001', '-1001001'):
+            self.assertEqual(view.stored_photo_id(identifier), 7, identifier)
+        self.assertIsNone(view.stored_photo_id('unknown'))
+        self.assertIsNone(view.stored_photo_id('not a channel'))
@@ -0,0 +1,61 @@
+'''
+ETag / 304 answers of ConditionalGetMixin views.
+'''
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from config.parser.models import Category, TelegramChannel
+
+
+class ChannelPagesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Before')
+        cls.channel = TelegramChannel.objects.create(
+            channel_id=1001, username='channel', title='Channel',
+            category=cls.category,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        '''(status of the first GET, status of a GET with its ETag)'''
+        first = self.client.get(url)
+        etag = first.headers['ETag']
+        again = self.client.get(url, headers={'If-None-Match': etag})
+        return first, again
+
+    def assert_category_rename_invalidates(self, url):
+        first, again = self.revalidate(url)
+        self.assertEqual((first.status_code, again.status_code), (200, 304))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'After'
+            self.category.save()
+        response = self.client.get(
+            url, headers={'If-None-Match': first.headers['ETag']}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'After')
+
+    def test_list(self):
+        self.assert_category_rename_invalidates(reverse('parser:list'))
+
+    def test_detail(self):
+        self.assert_category_rename_invalidates(
+            reverse('parser:detail', kwargs={'pk': self.channel.pk})
+        )
+
+    def test_new_channel_changes_list_etag(self):
+        url = reverse('parser:list')
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            TelegramChannel.objects.create(
+                channel_id=1002, username='second', title='Second'
+            )
+        response = self.client.get(
+            url, headers={'If-None-Match': first.headers['ETag']}
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,96 @@
+'''
+Shared counters (config/counters.py) and the per-endpoint timings built
+on them (config/timing.py).
+'''
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from config import counters, timing
+from config.users.models import PartnerProfile
+
+User = get_user_model()
+
+
+class CountersTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_add(self):
+        counters.add({'c:a': 2, 'c:b': 0})
+        counters.add({'c:a': 3})
+        self.assertEqual(cache.get('c:a'), 5)
+        self.assertIsNone(cache.get('c:b'))
+
+    def test_concurrent_register_keeps_every_name(self):
+        names = [f'name{n}' for n in range(50)]
+        with ThreadPoolExecutor(8) as pool:
+            # every name twice, from different threads
+            list(pool.map(
+                lambda name: counters.register('reg', [name]), names * 2
+            ))
+        registered = counters.names('reg')
+        self.assertEqual(sorted(registered), sorted(names))
+
+    def test_names_many_and_clear(self):
+        counters.register('one', ['a', 'b'])
+        counters.register('one', ['b', 'c'])
+        self.assertEqual(
+            counters.names_many(['one', 'two']),
+            {'one': ['a', 'b', 'c'], 'two': []},
+        )
+        self.assertEqual(counters.clear('one'), ['a', 'b', 'c'])
+        self.assertEqual(counters.names('one'), [])
+        counters.register('one', ['a'])
+        self.assertEqual(counters.names('one'), ['a'])
+
+
+class TimingTests(TestCase):
+
+    def setUp(self):
+        timing.flush()
+        cache.clear()
+
+    def record(self, endpoint, seconds):
+        timings = timing.Timings()
+        timings.total = seconds
+        timing.record(endpoint, timings)
+
+    def test_flush_runs_off_the_request(self):
+        with mock.patch.object(timing, 'FLUSH_EVERY', 2), \
+                mock.patch.object(timing, 'flush') as flush, \
+                mock.patch.object(timing, '_flusher') as flusher:
+            self.record('a', 0.003)
+            self.record('a', 0.003)
+            self.record('a', 0.003)
+        flush.assert_not_called()
+        # one flush is queued until it runs
+        flusher.submit.assert_called_once_with(flush)
+        timing.flush()
+
+    def test_stats(self):
+        self.record('a', 0.003)
+        self.record('b', 0.2)
+        self.record('b', 0.3)
+        stats = timing.get_stats()
+        self.assertEqual(stats['a']['count'], 1)
+        self.assertEqual(stats['a']['p50_ms'], 5)
+        self.assertEqual(stats['b']['count'], 2)
+        self.assertEqual(stats['b']['avg_ms'], 250.0)
+
+    def test_view_is_staff_only(self):
+        url = reverse('timing_stats')
+        partner = User.objects.create_user('partner', 'p@example.com', 'x')
+        PartnerProfile.objects.create(user=partner, status='active')
+        self.client.force_login(partner)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        staff = User.objects.create_user(
+            'staff', 's@example.com', 'x', is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,280 @@
+'''
+Group membership and the denormalised Group.channel_count.
+'''
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from config import cache as versioned_cache
+from config.group_channels import categories as category_sync
+from config.group_channels import pagination
+from config.group_channels.models import AutoGroupRule, Group
+from config.group_channels.services import (
+    add_channels_bulk,
+    group_channels,
+    materialize_rules,
+    refresh_category_counts,
+)
+from config.parser.export import export_queryset
+from config.parser.importer import save_resolved
+from config.parser.models import Category, TelegramChannel
+from tests import dataset
+
+User = get_user_model()
+
+
+def make_channels(count: int, start: int = 1, **fields) -> list:
+    return TelegramChannel.objects.bulk_create([
+        TelegramChannel(
+            channel_id=1000 + n, username=f'channel_{n}', title=f'Channel {n}',
+            **fields,
+        )
+        for n in range(start, start + count)
+    ])
+
+
+class AddChannelsBulkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        cls.channels = make_channels(5)
+        cls.group = Group.objects.create(name='Manual', owner=cls.owner)
+
+    def test_returns_inserted_rows(self):
+        self.group.channels.add(self.channels[0])
+        ids = [channel.pk for channel in self.channels]
+        # a duplicate id and an existing member are not counted
+        added = add_channels_bulk(self.group, channel_ids=ids + ids[:2])
+        self.assertEqual(added, 4)
+        self.assertEqual(self.group.channel_count, 5)
+
+    def test_stale_counter_does_not_skew_result(self):
+        self.group.channels.add(*self.channels[:2])
+        Group.objects.filter(pk=self.group.pk).update(channel_count=0)
+        self.group.refresh_from_db()
+        added = add_channels_bulk(
+            self.group, filters={'username__in': ['channel_3', 'channel_4']}
+        )
+        self.assertEqual(added, 2)
+        self.assertEqual(self.group.channel_count, 4)
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'x'
+        )
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:parser_telegramchannel_changelist'),
+            {
+                'action': 'add_to_group',
+                'group': self.group.pk,
+                '_selected_action': [c.pk for c in self.channels[:3]],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.group.channels.count(), 3)
+
+    def test_admin_action_skips_placeholders(self):
+        placeholder = TelegramChannel.objects.create(
+            username='imported', title='imported'
+        )
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'x'
+        )
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:parser_telegramchannel_changelist'),
+            {
+                'action': 'add_to_group',
+                'group': self.group.pk,
+                '_selected_action': [self.channels[0].pk, placeholder.pk],
+            },
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(
+            list(self.group.channels.values_list('pk', flat=True)),
+            [self.channels[0].pk],
+        )
+        self.assertEqual(self.group.channel_count, 1)
+
+
+class PlaceholderTests(TestCase):
+    '''Import placeholders (channel_id NULL) stay out of groups'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        cls.category = Category.objects.create(name='Placeholders')
+        cls.auto = Group.objects.create(name='Auto', owner=cls.owner)
+        AutoGroupRule.objects.create(
+            group=cls.auto, category=cls.category, materialize=True
+        )
+        cls.lazy = Group.objects.create(name='Lazy', owner=cls.owner)
+        AutoGroupRule.objects.create(
+            group=cls.lazy, category=cls.category, materialize=False
+        )
+        make_channels(2, category=cls.category)
+
+    def import_placeholder(self):
+        placeholder = TelegramChannel(
+            username='imported', title='imported', category=self.category
+        )
+        TelegramChannel.objects.bulk_create([placeholder])
+        materialize_rules()
+        refresh_category_counts()
+        return placeholder
+
+    def assert_groups(self, count):
+        for group in (self.auto, self.lazy):
+            group.refresh_from_db()
+            self.assertEqual(group.channel_count, count, group.name)
+            self.assertEqual(group_channels(group).count(), count, group.name)
+
+    def test_placeholder_is_not_a_member(self):
+        self.import_placeholder()
+        self.assert_groups(2)
+        self.assertEqual(export_queryset(category='Placeholders').count(), 2)
+
+    def test_placeholder_id_is_not_added(self):
+        placeholder = self.import_placeholder()
+        manual = Group.objects.create(name='Manual', owner=self.owner)
+        added = add_channels_bulk(manual, channel_ids=[placeholder.pk])
+        self.assertEqual(added, 0)
+        self.assertEqual(manual.channel_count, 0)
+        self.assertFalse(manual.channels.exists())
+
+    def test_resolved_placeholder_joins(self):
+        placeholder = self.import_placeholder()
+        save_resolved(placeholder.pk, {
+            'channel_id': 5000, 'title': 'Imported', 'username': 'imported',
+        })
+        self.assert_groups(3)
+
+
+class ChannelCountTests(TestCase):
+    '''Group.channel_count follows membership without a recount'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        cls.news = Category.objects.create(name='News')
+        cls.sport = Category.objects.create(name='Sport')
+        cls.channels = make_channels(3, category=cls.news)
+        cls.manual = Group.objects.create(name='Manual', owner=cls.owner)
+        cls.auto = {}
+        for category in (cls.news, cls.sport):
+            group = Group.objects.create(name=category.name, owner=cls.owner)
+            AutoGroupRule.objects.create(group=group, category=category)
+            cls.auto[category.name] = group
+
+    def counts(self):
+        groups = [self.manual, *self.auto.values()]
+        for group in groups:
+            group.refresh_from_db()
+        return [group.channel_count for group in groups]
+
+    def test_manual_add_remove_clear(self):
+        self.manual.channels.add(*self.channels)
+        self.assertEqual(self.counts()[0], 3)
+        self.manual.channels.remove(self.channels[0])
+        self.assertEqual(self.counts()[0], 2)
+        # from the channel side
+        self.channels[1].groups.clear()
+        self.assertEqual(self.counts()[0], 1)
+        self.manual.channels.clear()
+        self.assertEqual(self.counts()[0], 0)
+
+    def test_auto_groups_follow_category(self):
+        self.assertEqual(self.counts(), [0, 3, 0])
+        channel = TelegramChannel.objects.get(pk=self.channels[0].pk)
+        channel.category = self.sport
+        channel.save()
+        self.assertEqual(self.counts(), [0, 2, 1])
+        self.assertEqual(
+            list(self.auto['Sport'].channels.values_list('pk', flat=True)),
+            [channel.pk],
+        )
+
+    def test_channel_delete(self):
+        self.manual.channels.add(*self.channels)
+        TelegramChannel.objects.get(pk=self.channels[0].pk).delete()
+        self.assertEqual(self.counts(), [2, 2, 0])
+
+
+class GroupPageCacheTests(TestCase):
+    '''Only the first page of a group is cached, whatever the cursor'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        cls.group = Group.objects.create(name='Manual', owner=cls.owner)
+        cls.group.channels.add(*make_channels(pagination.PAGE_SIZE + 5))
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, cursor=None):
+        url = reverse('group_channels:group_channels_page',
+                      args=[self.group.slug])
+        params = {'cursor': cursor} if cursor else {}
+        with mock.patch.object(versioned_cache, 'get_or_set',
+                               wraps=versioned_cache.get_or_set) as cached:
+            data = self.client.get(url, params).json()
+        return data, cached.call_count
+
+    def test_cursor_pages_are_not_cached(self):
+        first, cached = self.page()
+        self.assertEqual(cached, 1)
+        second, cached = self.page(first['next_cursor'])
+        self.assertEqual(cached, 0)
+        self.assertEqual(len(second['channels']), 5)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_garbage_cursor_gets_the_cached_first_page(self):
+        first, _ = self.page()
+        again, cached = self.page('not-a-cursor')
+        self.assertEqual(cached, 1)
+        self.assertEqual(again, first)
+
+
+class DatasetBuildTests(TestCase):
+    '''tests/dataset.py writes past the signals and then catches up'''
+
+    def test_auto_groups_follow_generated_channels(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        category = Category.objects.first()
+        auto = Group.objects.create(name='Auto', owner=owner)
+        AutoGroupRule.objects.create(
+            group=auto, category=category, materialize=True
+        )
+        dataset.build(users=5, channels=200, days=1, groups=2, group_size=5,
+                      workers=1)
+        expected = TelegramChannel.objects.resolved().filter(
+            category=category
+        ).count()
+        self.assertGreater(expected, 0)
+        auto.refresh_from_db()
+        self.assertEqual(auto.channel_count, expected)
+        self.assertEqual(auto.channels.count(), expected)
+
+
+class CategorySyncTests(TestCase):
+    '''auto groups created by categories.apply_sync'''
+
+    def test_colliding_slugs_get_suffixes(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        Group.objects.create(name='Kino group', slug='kino', owner=owner)
+        new = Category.objects.bulk_create([
+            Category(name='Кино'), Category(name='Kino'), Category(name='!!!'),
+        ])
+        plan = category_sync.plan_sync(new)
+        category_sync.apply_sync(plan, owner)
+        slugs = dict(Group.objects.filter(
+            name__in=[cat.name for cat in new]
+        ).values_list('name', 'slug'))
+        self.assertEqual(slugs, {'Кино': 'kino-2', 'Kino': 'kino-3',
+                                 '!!!': 'group'})
@@ -0,0 +1,70 @@
+'''
+import_channels: placeholders, the report and the Celery hand-off.
+'''
+import csv
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from config.parser.importer import ImportReport
+from config.parser.models import TelegramChannel
+
+
+class ImportChannelsTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.source = os.path.join(self.dir.name, 'channels.csv')
+        self.report = os.path.join(self.dir.name, 'report.csv')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write('identifier,category\n@first_channel,News\n'
+                    'https://t.me/second_channel,News\nnot a username,\n')
+
+    def read_report(self) -> list:
+        with open(self.report, encoding='utf-8') as f:
+            return list(csv.reader(f))
+
+    def test_no_resolve_creates_placeholders(self):
+        call_command(
+            'import_channels', self.source, report=self.report,
+            no_resolve=True, stdout=io.StringIO(),
+        )
+        placeholders = TelegramChannel.objects.filter(channel_id__isnull=True)
+        self.assertEqual(
+            sorted(placeholders.values_list('username', flat=True)),
+            ['first_channel', 'second_channel'],
+        )
+        self.assertFalse(TelegramChannel.objects.resolved().exists())
+        statuses = [row[1] for row in self.read_report()[1:]]
+        self.assertEqual(sorted(statuses), ['created', 'created', 'invalid'])
+
+    def test_celery_task_gets_the_report(self):
+        with mock.patch(
+            'config.parser.management.commands.import_channels'
+            '.resolve_imported_channels.delay'
+        ) as delay:
+            call_command(
+                'import_channels', self.source, report=self.report,
+                celery=True, stdout=io.StringIO(),
+            )
+        delay.assert_called_once_with(
+            mock.ANY, report_path=os.path.abspath(self.report)
+        )
+
+    def test_report_append_keeps_stage_one(self):
+        report = ImportReport(self.report)
+        report.add('first_channel', 'created')
+        report.close()
+        report = ImportReport(self.report, append=True)
+        report.add('first_channel', 'resolved')
+        report.close()
+        self.assertEqual(self.read_report(), [
+            ['identifier', 'status', 'detail'],
+            ['first_channel', 'created', ''],
+            ['first_channel', 'resolved', ''],
+        ])
@@ -0,0 +1,107 @@
+'''
+QueueHandler (config/logging.py): records are written by a listener
+thread of the process, restarted in a forked child.
+'''
+import gc
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import unittest
+import warnings
+
+from django.test import SimpleTestCase
+
+from config import logging as log_config
+
+
+def make_handler(target):
+    '''QueueHandler wired as dictConfig does it'''
+    handler = log_config.QueueHandler(queue.SimpleQueue())
+    handler.listener = logging.handlers.QueueListener(
+        handler.queue, target, respect_handler_level=True
+    )
+    return handler
+
+
+def record(msg, args):
+    return logging.LogRecord('test', logging.INFO, __file__, 1, msg, args,
+                             None)
+
+
+class QueueHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.file = tempfile.NamedTemporaryFile('w+', suffix='.log')
+        self.addCleanup(self.file.close)
+        target = logging.StreamHandler(self.file)
+        target.setFormatter(logging.Formatter('%(process)d %(message)s'))
+        self.handler = make_handler(target)
+        self.addCleanup(self.handler._stop_listener)
+
+    def lines(self):
+        self.file.seek(0)
+        return self.file.read().splitlines()
+
+    def test_mutable_args_are_formatted_when_logged(self):
+        items = ['a']
+        self.handler.handle(record('items %s', (items,)))
+        items.append('b')
+        self.handler._stop_listener()
+        self.assertEqual(self.lines(), [f'{os.getpid()} items [\'a\']'])
+
+    def test_immutable_args_are_left_to_the_listener(self):
+        entry = self.handler.prepare(record('%s of %d', ('one', 2)))
+        self.assertEqual(entry.args, ('one', 2))
+        entry = self.handler.prepare(record('%(items)s', ({'items': [1]},)))
+        self.assertIsNone(entry.args)
+        self.assertEqual(entry.msg, '[1]')
+
+    def test_one_listener_per_process(self):
+        self.handler.handle(record('first', None))
+        listener = self.handler.listener
+        self.handler.handle(record('second', None))
+        self.assertIs(self.handler.listener, listener)
+        log_config._stop_listeners()
+        self.assertIsNone(self.handler._pid)
+        self.assertEqual(
+            self.lines(), [f'{os.getpid()} first', f'{os.getpid()} second']
+        )
+
+    def test_dropped_handlers_leave_the_fork_hook(self):
+        before = len(log_config._queue_handlers)
+        handler = make_handler(logging.NullHandler())
+        self.assertEqual(len(log_config._queue_handlers), before + 1)
+        del handler
+        gc.collect()
+        self.assertEqual(len(log_config._queue_handlers), before)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_listener_restarts_after_fork(self):
+        self.handler.handle(record('parent', None))
+        parent_listener = self.handler.listener
+        with warnings.catch_warnings():
+            # the listener threads of other handlers are running: the child
+            # only uses its own handler, which is what is being tested
+            warnings.simplefilter('ignore', DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:  # pragma: no cover - child
+            code = 1
+            try:
+                self.handler.handle(record('child', None))
+                self.handler._stop_listener()
+                code = 0 if self.handler.listener is not parent_listener else 1
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        # the fork hook stopped (and drained) the parent's listener
+        self.assertIsNone(self.handler._pid)
+        self.handler.handle(record('parent again', None))
+        self.assertEqual(self.handler._pid, os.getpid())
+        self.handler._stop_listener()
+        self.assertEqual(self.lines(), [
+            f'{os.getpid()} parent', f'{pid} child',
+            f'{os.getpid()} parent again',
+        ])
@@ -0,0 +1,136 @@
+'''
+Outbound mail queue (config/mail.py) and its Celery task
+(config/users/tasks.py).
+'''
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.core import mail as django_mail
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail.backends import locmem
+from django.test import SimpleTestCase, override_settings
+
+from config import mail
+from config.users import tasks
+
+FLAKY = 'tests.test_mail.FlakyBackend'
+
+
+class FlakyBackend(locmem.EmailBackend):
+    '''locmem backend that refuses every recipient listed in `failing`'''
+
+    failing = set()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.failing & set(message.recipients()):
+                raise ConnectionError('refused')
+        return super().send_messages(messages)
+
+
+def message(to, **kwargs):
+    return mail.serialize(EmailMultiAlternatives(
+        'Subject', 'Body', 'from@example.com', [to], **kwargs
+    ))
+
+
+class SerializeTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        original = EmailMultiAlternatives(
+            'Привет', 'text', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], bcc=['bcc@example.com'],
+            reply_to=['reply@example.com'], headers={'X-Tag': 'reset'},
+        )
+        original.attach_alternative('<p>html</p>', 'text/html')
+        original.attach('a.txt', 'текст', 'text/plain')
+        original.attach('a.bin', b'\x00\xff', 'application/octet-stream')
+
+        copy = mail.deserialize(mail.serialize(original))
+
+        for attr in ('subject', 'body', 'from_email', 'to', 'cc', 'bcc',
+                     'reply_to', 'extra_headers', 'content_subtype'):
+            self.assertEqual(getattr(copy, attr), getattr(original, attr))
+        self.assertEqual(
+            [tuple(alt) for alt in copy.alternatives],
+            [('<p>html</p>', 'text/html')],
+        )
+        self.assertEqual(
+            [tuple(att) for att in copy.attachments],
+            [('a.txt', 'текст', 'text/plain'),
+             ('a.bin', b'\x00\xff', 'application/octet-stream')],
+        )
+        self.assertIn('X-Tag: reset', copy.message().as_string())
+
+
+@override_settings(MAIL_DELIVERY_BACKEND=FLAKY)
+class DeliverTests(SimpleTestCase):
+
+    def test_returns_only_failed_messages(self):
+        messages = [message(f'{n}@example.com') for n in range(5)]
+        with mock.patch.object(FlakyBackend, 'failing',
+                               {'1@example.com', '3@example.com'}), \
+                mock.patch.object(mail, 'BATCH_SIZE', 2):
+            sent, failed, error = mail.deliver(messages)
+        self.assertEqual(sent, 3)
+        self.assertEqual(failed, [messages[1], messages[3]])
+        self.assertIsInstance(error, ConnectionError)
+        self.assertEqual(
+            [m.to for m in django_mail.outbox],
+            [['0@example.com'], ['2@example.com'], ['4@example.com']],
+        )
+
+
+@override_settings(EMAIL_BACKEND='config.mail.CeleryEmailBackend',
+                   MAIL_DELIVERY_BACKEND=FLAKY,
+                   CELERY_TASK_ALWAYS_EAGER=True)
+class SendQueuedMailTests(SimpleTestCase):
+
+    def setUp(self):
+        # the Celery app reads CELERY_* once, switch the loaded conf too
+        conf = tasks.send_queued_mail.app.conf
+        saved = conf.task_always_eager, conf.task_eager_propagates
+        conf.task_always_eager = conf.task_eager_propagates = True
+
+        def restore():
+            conf.task_always_eager, conf.task_eager_propagates = saved
+
+        self.addCleanup(restore)
+        deliver = mock.patch.object(mail, 'deliver', wraps=mail.deliver)
+        self.deliver = deliver.start()
+        self.addCleanup(deliver.stop)
+
+    def test_backend_queues_and_task_sends(self):
+        self.assertEqual(
+            send_mail('Subject', 'Body', None, ['a@example.com']), 1
+        )
+        self.assertEqual([m.to for m in django_mail.outbox],
+                         [['a@example.com']])
+
+    def test_retries_only_failed_messages(self):
+        messages = [message(f'{n}@example.com') for n in range(3)]
+        with mock.patch.object(FlakyBackend, 'failing', {'1@example.com'}):
+            # an eager task raises Retry instead of scheduling the retry
+            with self.assertRaises(Retry) as retry:
+                tasks.send_queued_mail.delay(messages)
+        self.deliver.assert_called_once_with(messages)
+        self.assertEqual(tuple(retry.exception.sig.args), ([messages[1]],))
+        self.assertEqual(len(django_mail.outbox), 2)
+
+        # the retry, now that the server accepts the message
+        self.assertEqual(retry.exception.sig.apply().get(), 1)
+        self.deliver.assert_called_with([messages[1]])
+        self.assertEqual(
+            sorted(m.to[0] for m in django_mail.outbox),
+            ['0@example.com', '1@example.com', '2@example.com'],
+        )
+
+    def test_gives_up_after_max_retries(self):
+        messages = [message('a@example.com'), message('b@example.com')]
+        with mock.patch.object(FlakyBackend, 'failing', {'b@example.com'}):
+            result = tasks.send_queued_mail.apply(
+                args=(messages,), retries=tasks.MAX_RETRIES
+            )
+        self.assertEqual(result.get(), 1)
+        self.assertEqual([m.to for m in django_mail.outbox],
+                         [['a@example.com']])
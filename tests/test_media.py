@@ -0,0 +1,82 @@
+'''
+ImageRefField: pasted data: URIs are verified and stored, storage URLs
+turn back into references.
+'''
+import base64
+import io
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from config import media
+
+
+def data_uri(content: bytes, mime: str = 'image/png') -> str:
+    return f'data:{mime};base64,{base64.b64encode(content).decode()}'
+
+
+def png(color=(200, 10, 10)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class TempMediaMixin:
+    '''STORAGES['media'] in a temporary directory'''
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        storages = {**settings.STORAGES, media.STORAGE_ALIAS: {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': root.name, 'base_url': '/media/'},
+        }}
+        override = override_settings(STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class ImageRefFieldTests(TempMediaMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.field = media.ImageRefField(required=False)
+
+    def test_stores_verified_image(self):
+        content = png()
+        # the extension comes from the content, not the declared type
+        ref = self.field.clean(data_uri(content, 'image/jpeg'))
+        self.assertTrue(media.is_ref(ref))
+        self.assertTrue(ref.endswith('.png'))
+        storage = media.get_storage()
+        with storage.open(media.ref_path(ref)) as f:
+            self.assertEqual(f.read(), content)
+
+    def test_rejects_non_image(self):
+        with self.assertRaises(ValidationError) as error:
+            self.field.clean(data_uri(b'<script>alert(1)</script>'))
+        self.assertEqual(error.exception.code, 'invalid_image')
+
+    def test_rejects_truncated_image(self):
+        with self.assertRaises(ValidationError):
+            self.field.clean(data_uri(png()[:40]))
+
+    def test_rejects_large_image(self):
+        with mock.patch.object(media, 'MAX_IMAGE_SIZE', 16):
+            with self.assertRaises(ValidationError) as error:
+                self.field.clean(data_uri(png()))
+        self.assertEqual(error.exception.code, 'image_too_large')
+
+    def test_storage_url_becomes_ref(self):
+        ref = self.field.clean(data_uri(png()))
+        self.assertEqual(self.field.clean(media.url(ref)), ref)
+
+    def test_external_url_is_kept(self):
+        url = 'https://example.com/a.jpg'
+        self.assertEqual(self.field.clean(url), url)
+        self.assertEqual(self.field.clean(''), '')
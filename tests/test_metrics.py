@@ -0,0 +1,74 @@
+'''
+Parser metrics (config/parser/metrics.py) and MetricsView access.
+'''
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from config import cache as versioned_cache
+from config.parser import metrics
+from config.users.models import PartnerProfile
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_render(self):
+        metrics.FLOOD_WAITS.inc(method='get_entity')
+        metrics.FLOOD_WAITS.inc(method='get_entity')
+        metrics.PERSIST_SECONDS.observe(0.02)
+        text = metrics.render()
+        self.assertIn(
+            'tgms_parser_flood_waits_total{method="get_entity"} 2.0', text
+        )
+        self.assertIn('tgms_parser_persist_seconds_count 1', text)
+        metrics.reset()
+        self.assertNotIn('get_entity', metrics.render())
+
+    def test_cache_stats(self):
+        versioned_cache.reset_stats()
+        versioned_cache._count('channel_list', 'miss')
+        versioned_cache._count('channel_list', 'hit')
+        self.assertEqual(
+            versioned_cache.get_stats(),
+            {'channel_list': {'hit': 1, 'miss': 1}},
+        )
+        versioned_cache.reset_stats()
+        self.assertEqual(versioned_cache.get_stats(), {})
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsViewTests(TestCase):
+    url = reverse('parser:metrics')
+
+    def test_token(self):
+        response = self.client.get(
+            self.url, headers={'Authorization': 'Bearer secret'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE tgms_parser_rpc_seconds')
+
+    def test_no_login_redirect_for_scrapers(self):
+        for headers in ({}, {'Authorization': 'Bearer wrong'}):
+            response = self.client.get(self.url, headers=headers)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(
+                response.headers['WWW-Authenticate'], 'Bearer realm="metrics"'
+            )
+
+    def test_staff_only(self):
+        partner = User.objects.create_user('partner', 'p@example.com', 'x')
+        PartnerProfile.objects.create(user=partner, status='active')
+        self.client.force_login(partner)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        staff = User.objects.create_user(
+            'staff', 's@example.com', 'x', is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
@@ -0,0 +1,90 @@
+'''
+Access rules of the role mixins (config/mixins.py).
+'''
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import resolve_url
+from django.test import RequestFactory, TestCase
+from django.views import View
+
+from config.mixins import (
+    StaffOnlyMixin,
+    StaffRequiredMixin,
+    UserRequiredMixin,
+)
+
+User = get_user_model()
+
+
+class UserView(UserRequiredMixin, View):
+    def get(self, request):
+        return HttpResponse('ok')
+
+
+class StaffView(StaffRequiredMixin, View):
+    def get(self, request):
+        return HttpResponse('ok')
+
+
+class StaffOnlyView(StaffOnlyMixin, View):
+    def get(self, request):
+        return HttpResponse('ok')
+
+
+class RoleMixinTests(TestCase):
+
+    def get(self, view, user, role):
+        request = RequestFactory().get('/private/')
+        request.user = user
+        request.role = role  # as RoleMiddleware sets it
+        return view.as_view()(request)
+
+    def test_guest_is_redirected_to_login(self):
+        response = self.get(UserView, AnonymousUser(), 'guest')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            response.url,
+            f'{resolve_url(settings.LOGIN_URL)}?next=/private/',
+        )
+
+    def test_user_is_admitted(self):
+        user = User.objects.create_user('user', 'user@example.com', 'x')
+        self.assertEqual(self.get(UserView, user, 'user').status_code, 200)
+
+    def test_staff_view_denies_user(self):
+        user = User.objects.create_user('user', 'user@example.com', 'x')
+        with self.assertRaises(PermissionDenied):
+            self.get(StaffView, user, 'user')
+
+    def test_staff_view_admits_staff(self):
+        staff = User.objects.create_user(
+            'staff', 'staff@example.com', 'x', is_staff=True
+        )
+        self.assertEqual(self.get(StaffView, staff, 'user').status_code, 200)
+
+    def test_staff_view_admits_superuser(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'x'
+        )
+        self.assertEqual(self.get(StaffView, admin, 'user').status_code, 200)
+
+    def test_staff_only_view_denies_partner(self):
+        partner = User.objects.create_user(
+            'partner', 'partner@example.com', 'x'
+        )
+        self.assertEqual(
+            self.get(StaffView, partner, 'partner').status_code, 200
+        )
+        with self.assertRaises(PermissionDenied):
+            self.get(StaffOnlyView, partner, 'partner')
+
+    def test_staff_only_view_admits_staff(self):
+        staff = User.objects.create_user(
+            'staff', 'staff@example.com', 'x', is_staff=True
+        )
+        self.assertEqual(
+            self.get(StaffOnlyView, staff, 'user').status_code, 200
+        )
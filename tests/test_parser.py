@@ -0,0 +1,156 @@
+'''
+tg_parser, parse_channel, ParserView and the import over the offline
+Telegram stand-in (tests/fake_telegram.py).
+'''
+import asyncio
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from config.parser import parser
+from config.parser.importer import ImportReport, resolve_placeholders
+from config.parser.models import Category, ChannelStats, TelegramChannel
+from config.parser.tasks import parse_channel
+from tests import fake_telegram
+from tests.fake_telegram import (
+    Behaviour,
+    Corpus,
+    FakeTelegram,
+    FakeTelegramClient,
+    constant,
+)
+
+FAKE_CLIENT = 'tests.fake_telegram.FakeTelegramClient'
+
+
+class FakeTelegramMixin:
+    '''Every test talks to a fresh, instant fake Telegram'''
+    behaviour = {}
+
+    def setUp(self):
+        self.telegram = FakeTelegram(
+            Corpus(seed=1, size=1000, missing_rate=0, private_rate=0),
+            Behaviour(latency={'default': constant(0)}, **self.behaviour),
+        )
+        for patch in (
+            mock.patch.object(fake_telegram, 'server', self.telegram),
+            mock.patch.object(parser, 'ANTI_FLOOD_PAUSE', 0),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def ok_username(self):
+        '''A corpus channel that has a photo and a pinned message'''
+        for n in range(1, self.telegram.corpus.size + 1):
+            channel = self.telegram.corpus.channel(n)
+            if channel.photo and channel.pinned_msg_id:
+                return channel
+        raise AssertionError('no such channel in the corpus')
+
+    def parse(self, username, **kwargs):
+        async def run():
+            async with FakeTelegramClient() as client:
+                return await parser.tg_parser(username, client, **kwargs)
+        return asyncio.run(run())
+
+
+class TgParserTests(FakeTelegramMixin, TestCase):
+
+    def test_parses_channel(self):
+        channel = self.ok_username()
+        data = self.parse(f'https://t.me/{channel.username}', limit=5)
+        self.assertEqual(data['channel_id'], channel.id)
+        self.assertEqual(data['title'], channel.title)
+        self.assertEqual(data['participants_count'], channel.participants_count)
+        self.assertEqual(len(data['last_messages']), 5)
+        pinned = data['pinned_messages'][0]
+        self.assertEqual(pinned['id'], channel.pinned_msg_id)
+        self.assertTrue(data['photo'])
+        self.assertEqual(self.telegram.calls, {
+            'get_entity': 1, 'get_messages': 2,
+            'GetFullChannelRequest': 1, 'download_profile_photo': 1,
+        })
+
+    def test_known_photo_is_not_downloaded(self):
+        channel = self.ok_username()
+        data = self.parse(
+            channel.username, photo_id=channel.photo.photo_id
+        )
+        self.assertNotIn('photo', data)
+        self.assertNotIn('download_profile_photo', self.telegram.calls)
+
+    def test_missing_channel(self):
+        self.assertEqual(self.parse('load_999999'), {})
+
+
+class FloodWaitTests(FakeTelegramMixin, TestCase):
+    behaviour = {'flood_wait_rate': 0.5, 'flood_wait_seconds': (0, 0)}
+
+    def test_short_flood_waits_are_slept_through(self):
+        channel = self.ok_username()
+        data = self.parse(channel.username)
+        self.assertEqual(data['channel_id'], channel.id)
+        self.assertTrue(self.telegram.flood_waits)
+
+
+@override_settings(TELEGRAM_CLIENT=FAKE_CLIENT)
+class PipelineTests(FakeTelegramMixin, TransactionTestCase):
+    # the parser saves from sync_to_async threads, outside a test
+    # transaction; serialized_rollback brings back the migrated categories
+    serialized_rollback = True
+
+    def test_parse_channel(self):
+        source = self.ok_username()
+        channel = TelegramChannel.objects.create(
+            channel_id=source.id, username=source.username, title='?',
+        )
+        parse_channel(source.id)
+        channel.refresh_from_db()
+        self.assertEqual(channel.title, source.title)
+        self.assertEqual(channel.participants_count, source.participants_count)
+        self.assertEqual(channel.photo_id, source.photo.photo_id)
+        self.assertTrue(ChannelStats.objects.filter(channel=channel).exists())
+
+    def post_parser_form(self, identifier):
+        return self.client.post(reverse('parser:parser'), {
+            'channel_identifier': identifier,
+            'category': Category.objects.first().pk,
+            'country': 'RU',
+            'language': 'ru',
+            'limit': 3,
+        })
+
+    def test_parser_view(self):
+        source = self.ok_username()
+        response = self.post_parser_form(f'@{source.username}')
+        self.assertRedirects(
+            response, reverse('parser:list'), fetch_redirect_response=False
+        )
+        channel = TelegramChannel.objects.get(channel_id=source.id)
+        self.assertEqual(len(channel.last_messages), 3)
+
+    def test_parser_view_keeps_known_photo(self):
+        source = self.ok_username()
+        self.post_parser_form(f'https://t.me/{source.username}')
+        self.telegram.calls.clear()
+        self.post_parser_form(f'@{source.username}')
+        self.assertEqual(self.telegram.calls['get_entity'], 1)
+        self.assertNotIn('download_profile_photo', self.telegram.calls)
+        channel = TelegramChannel.objects.get(channel_id=source.id)
+        self.assertEqual(channel.photo_id, source.photo.photo_id)
+        self.assertTrue(channel.photo_thumbs)
+
+    def test_resolve_placeholders(self):
+        usernames = self.telegram.corpus.usernames(5)
+        TelegramChannel.objects.bulk_create([
+            TelegramChannel(username=username, title=username)
+            for username in usernames + ['load_999999']
+        ])
+        report = ImportReport()
+
+        async def run():
+            async with FakeTelegramClient() as client:
+                await resolve_placeholders(client, report, concurrency=3)
+        asyncio.run(run())
+        self.assertEqual(report.counts, {'resolved': 5, 'failed': 1})
@@ -0,0 +1,101 @@
+'''
+Moderator permission map (config/parser/permissions.py): one query per
+request whatever the number of checks.
+'''
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from django.views import View
+
+from config.mixins import ChannelPermissionRequiredMixin
+from config.parser import permissions
+from config.parser.models import ChannelModerator, TelegramChannel
+from config.users import roles
+from tests.query_budget import assert_query_budget
+
+User = get_user_model()
+
+CHANNELS = 300
+
+TEMPLATE = Template(
+    '{% load channel_perms %}'
+    '{% for channel in channels %}'
+    '{% channel_can channel "edit" as can_edit %}'
+    '{% channel_can channel "delete" as can_delete %}'
+    '{% if can_edit %}e{% endif %}{% if can_delete %}d{% endif %}'
+    '{% endfor %}'
+)
+
+
+class EditView(ChannelPermissionRequiredMixin, View):
+    channel_permission = 'edit'
+
+    def get(self, request, pk):
+        return HttpResponse('ok')
+
+
+class PermissionMapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user('mod', 'm@example.com', 'x')
+        cls.user = User.objects.create_user('user', 'u@example.com', 'x')
+        cls.channels = TelegramChannel.objects.bulk_create([
+            TelegramChannel(channel_id=1000 + n, username=f'c{n}', title='C')
+            for n in range(CHANNELS)
+        ])
+        ChannelModerator.objects.bulk_create(
+            [ChannelModerator(user=cls.moderator, channel=channel)
+             for channel in cls.channels[:-2]]
+            + [ChannelModerator(user=cls.moderator, channel=cls.channels[-2],
+                                is_owner=True, can_edit=False)]
+        )
+        cls.owned, cls.foreign = cls.channels[-2], cls.channels[-1]
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        roles.get_role(user)  # warm role cache, as on every page
+        return request
+
+    def test_masks(self):
+        perms = permissions.ChannelPermissions.for_user(self.moderator)
+        channel = self.channels[0]
+        self.assertTrue(perms.has(channel.pk, 'edit'))
+        self.assertFalse(perms.has(channel.pk, 'delete'))
+        self.assertTrue(perms.has(self.owned.pk, 'manage_moderators'))
+        self.assertFalse(perms.has(self.foreign.pk))
+        self.assertNotIn(self.foreign.pk, perms)
+        self.assertEqual(len(perms.channel_ids('owner')), 1)
+        with self.assertRaises(ValueError):
+            perms.has(channel.pk, 'fly')
+
+    def test_template_checks_cost_one_query(self):
+        request = self.request(self.moderator)
+        with assert_query_budget(1, label='600 checks'):
+            html = TEMPLATE.render(Context({
+                'request': request, 'channels': self.channels,
+            }))
+        self.assertEqual(html.count('e'), CHANNELS - 1)
+        self.assertEqual(html.count('d'), 1)
+
+    def test_non_moderator_costs_no_query(self):
+        request = self.request(self.user)
+        with assert_query_budget(0, label='non-moderator'):
+            html = TEMPLATE.render(Context({
+                'request': request, 'channels': self.channels,
+            }))
+        self.assertEqual(html, '')
+
+    def test_mixin(self):
+        view = EditView.as_view()
+        request = self.request(self.moderator)
+        self.assertEqual(view(request, pk=self.owned.pk).status_code, 200)
+        with self.assertRaises(PermissionDenied):
+            view(self.request(self.moderator), pk=self.foreign.pk)
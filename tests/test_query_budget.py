@@ -0,0 +1,68 @@
+'''
+Tests of the query budget utility itself (tests/query_budget.py).
+'''
+import pytest
+from django.template import Context, Template
+from django.test import TestCase
+
+from config.parser.models import ChannelStats, TelegramChannel
+from tests.query_budget import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+    query_shape,
+)
+
+
+def test_query_shape_ignores_values():
+    assert query_shape(
+        'SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\' LIMIT 21'
+    ) == query_shape(
+        'SELECT * FROM t WHERE id IN (%s)  AND name = \'y\' LIMIT 1'
+    )
+    assert query_shape(
+        'INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'
+    ) == 'INSERT INTO t (a, b) VALUES (...)'
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        TelegramChannel.objects.bulk_create([
+            TelegramChannel(channel_id=i, username=f'c{i}', title=f'C {i}')
+            for i in range(5)
+        ])
+        ChannelStats.objects.bulk_create([
+            ChannelStats(channel=channel, participants_count=1)
+            for channel in TelegramChannel.objects.all()
+        ])
+
+    def test_n_plus_one_in_template_is_reported_with_location(self):
+        template = Template(
+            '{% for c in channels %}'
+            '{{ c.channelstats_set.first.pk }}'
+            '{% endfor %}'
+        )
+        with self.assertRaises(QueryBudgetExceeded) as failure:
+            with assert_query_budget():
+                template.render(Context({
+                    'channels': TelegramChannel.objects.all(),
+                }))
+        message = str(failure.exception)
+        self.assertIn('N+1: the same query ran 5 times', message)
+        self.assertIn('parser_channelstats', message)
+        self.assertIn('(template)', message)
+
+    def test_budget_counts_queries(self):
+        with assert_query_budget(2) as recorder:
+            list(TelegramChannel.objects.all())
+            list(ChannelStats.objects.all())
+        self.assertEqual(len(recorder), 2)
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                list(TelegramChannel.objects.all())
+                list(ChannelStats.objects.all())
+
+    @pytest.mark.query_budget(2)
+    def test_marker_puts_the_test_under_budget(self):
+        list(TelegramChannel.objects.prefetch_related('channelstats_set'))
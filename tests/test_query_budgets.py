@@ -0,0 +1,265 @@
+'''
+Query budgets for every URL of config/urls.py.
+
+The database is filled from the generated fixtures (tests/fixtures, see
+tests/generate_fixtures.py; generated here if CI hasn't done it yet).
+Every URL has a budget: the number of queries one request may run.
+A request that goes over it, or runs the same query shape more than
+MAX_REPEATS times (N+1), fails with the queries and their call stacks.
+A new URL without a budget fails test_every_url_has_budget.
+'''
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.db import models
+from django.test import Client, TestCase
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from config.group_channels.models import Group
+from config.parser import categories
+from config.parser.models import ChannelStats, TelegramChannel
+from config.users.models import User
+from tests.data_generator import FIXTURES_DIR_PATH
+from tests.generate_fixtures import ModelAndFormFixtureGenerator
+from tests.query_budget import assert_query_budget
+
+PASSWORD = 'budget-Pa55word'
+STATS_PER_CHANNEL = 3
+
+
+def load_fixture(name: str) -> list:
+    '''Valid records of a generated fixture, generating it if missing'''
+    path = os.path.join(FIXTURES_DIR_PATH, f'{name}.json')
+    if not os.path.exists(path):
+        getattr(ModelAndFormFixtureGenerator(batch=True, seed=name), name)()
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['valid']
+
+
+def fixture_objects(model, name: str, **extra) -> list:
+    '''
+    Unsaved model objects from a fixture: keys that are not model fields
+    are dropped, strings are cut to max_length
+    '''
+    fields = {f.name: f for f in model._meta.concrete_fields}
+    objects = []
+    for i, record in enumerate(load_fixture(name)):
+        values = {}
+        for key, value in record.items():
+            model_field = fields.get(key)
+            if model_field is None or value is None:
+                continue
+            if isinstance(value, str) and model_field.max_length:
+                value = value[:model_field.max_length]
+            if isinstance(model_field, models.DateTimeField):
+                # the generator doesn't validate dates of model fixtures
+                try:
+                    value = timezone.make_aware(
+                        timezone.datetime.fromisoformat(value)
+                    )
+                except ValueError:
+                    continue
+            values[key] = value
+        values.update({k: v(i) if callable(v) else v for k, v in extra.items()})
+        objects.append(model(**values))
+    return objects
+
+
+@dataclass
+class Budget:
+    '''
+    One request, how many queries it may run and the status it must
+    answer with (None — not checked).
+    '''
+    queries: int
+    method: str = 'get'
+    user: Optional[str] = None  # 'owner' | 'staff'
+    kwargs: Callable = lambda t: {}
+    data: Callable = lambda t: {}
+    headers: dict = field(default_factory=dict)
+    status: Optional[int] = 200
+    url: Optional[str] = None  # for patterns without a name
+
+
+MEDIA_REF = 'ab' * 32 + '.png'
+
+BUDGETS = {
+    'main_index': Budget(3),
+    'robots.txt': Budget(0, url='/robots.txt'),
+    'media': Budget(
+        0,
+        kwargs=lambda t: {'path': f'ab/ab/{MEDIA_REF}'},
+        headers={'If-None-Match': f'"{MEDIA_REF[:-4]}"'},
+        status=304,
+    ),
+    'timing_stats': Budget(2, user='staff'),
+
+    'users:logout': Budget(2, user='owner', status=302),
+    'users:login': Budget(0),
+    'users:profile': Budget(3, user='owner'),
+    'users:user_create': Budget(0),
+    'users:restore_password_request': Budget(0),
+    'users:restore_password': Budget(
+        1,
+        kwargs=lambda t: {
+            'uidb64': urlsafe_base64_encode(force_bytes(t.owner.pk)),
+            'token': default_token_generator.make_token(t.owner),
+        },
+    ),
+    'users:avatar_update': Budget(
+        4, method='post', user='owner',
+        kwargs=lambda t: {'username': t.owner.username},
+        data=lambda t: {'avatar_image': 'https://example.com/a.png'},
+        status=302,
+    ),
+    'users:user_update': Budget(
+        2, user='owner',
+        kwargs=lambda t: {'username': t.owner.username},
+    ),
+
+    'group_channels:group_create': Budget(
+        4, method='post', user='owner',
+        data=lambda t: {'name': 'Budget new group'},
+        status=302,
+    ),
+    'group_channels:group_update': Budget(
+        5, method='post', user='owner',
+        kwargs=lambda t: {'slug': t.group.slug},
+        data=lambda t: {'name': 'Budget group renamed'},
+        status=302,
+    ),
+    'group_channels:group_delete': Budget(
+        6, method='post', user='owner',
+        kwargs=lambda t: {'slug': t.group.slug},
+        status=302,
+    ),
+    'group_channels:group_add_channels': Budget(
+        8, method='post', user='owner',
+        kwargs=lambda t: {'slug': t.group.slug},
+        data=lambda t: {'channels': [t.free_channel.pk]},
+        status=302,
+    ),
+    'group_channels:group_channel_search': Budget(
+        4, user='owner',
+        kwargs=lambda t: {'slug': t.group.slug},
+        data=lambda t: {'q': 'a'},
+    ),
+    'group_channels:group_channels_page': Budget(
+        3, kwargs=lambda t: {'slug': t.group.slug},
+    ),
+    'group_channels:group_detail': Budget(
+        3, kwargs=lambda t: {'slug': t.group.slug},
+    ),
+
+    'parser:parser': Budget(1),  # category choices, once per process
+    'parser:list': Budget(2),
+    'parser:export': Budget(4, user='staff', data=lambda t: {'history': '1'}),
+    'parser:metrics': Budget(2, user='staff'),
+    'parser:detail': Budget(2, kwargs=lambda t: {'pk': t.channel.pk}),
+}
+
+# third-party URLconfs included in config/urls.py
+SKIPPED_URLCONFS = ('allauth.', 'django.contrib.admin')
+
+
+def project_url_names(patterns=None, namespace=''):
+    '''Names (or routes, for unnamed ones) of the project's URL patterns'''
+    names = set()
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            module = getattr(pattern.urlconf_module, '__name__', '')
+            if isinstance(pattern.urlconf_module, list) or module.startswith(
+                SKIPPED_URLCONFS
+            ):
+                continue
+            prefix = f'{pattern.namespace}:' if pattern.namespace else ''
+            names |= project_url_names(pattern.url_patterns, namespace + prefix)
+        elif isinstance(pattern, URLPattern):
+            names.add(namespace + (pattern.name or str(pattern.pattern)))
+    return names
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = fixture_objects(
+            User, 'model_users_user',
+            username=lambda i: f'fixture-{i}',
+            email=lambda i: f'fixture-{i}@example.com',
+        )
+        User.objects.bulk_create(users)
+        cls.owner = User.objects.create_user(
+            'budget-owner', 'owner@example.com', PASSWORD
+        )
+        cls.staff = User.objects.create_user(
+            'budget-staff', 'staff@example.com', PASSWORD, is_staff=True
+        )
+
+        channels = fixture_objects(
+            TelegramChannel, 'model_parser_telegram_channel'
+        )
+        TelegramChannel.objects.bulk_create(channels)
+        channels = list(TelegramChannel.objects.order_by('pk'))
+        now = timezone.now()
+        ChannelStats.objects.bulk_create([
+            ChannelStats(
+                channel=channel,
+                participants_count=channel.participants_count + day,
+                daily_growth=day,
+                parsed_at=now - timedelta(days=STATS_PER_CHANNEL - day),
+            )
+            for channel in channels
+            for day in range(STATS_PER_CHANNEL)
+        ])
+        cls.channel = channels[0]
+        cls.free_channel = channels[-1]
+
+        cls.group = Group.objects.create(
+            name='Budget group', owner=cls.owner, is_editorial=True
+        )
+        cls.group.channels.add(*channels[:-1])
+
+    def setUp(self):
+        # budgets are for a cold cache: cached pages must not hide queries
+        for alias in ('default', 'sessions'):
+            caches[alias].clear()
+        categories.clear_cache()
+
+    def request(self, budget: Budget, name: str):
+        client = Client(raise_request_exception=False)
+        if budget.user:
+            client.force_login(getattr(self, budget.user))
+        url = budget.url or reverse(name, kwargs=budget.kwargs(self))
+        method = getattr(client, budget.method)
+        with assert_query_budget(budget.queries, label=f'{name} {url}'):
+            response = method(url, budget.data(self), headers=budget.headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if budget.status is not None:
+            self.assertEqual(response.status_code, budget.status, name)
+
+    def test_every_url_has_budget(self):
+        self.assertEqual(set(BUDGETS), project_url_names())
+
+
+def _budget_test(name, budget):
+    def test(self):
+        self.request(budget, name)
+    test.__doc__ = f'{name}: at most {budget.queries} queries, no N+1'
+    return test
+
+
+for _name, _budget in BUDGETS.items():
+    _attr = 'test_' + _name.replace(':', '_').replace('.', '_')
+    setattr(QueryBudgetTests, _attr, _budget_test(_name, _budget))
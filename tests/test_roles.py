@@ -0,0 +1,80 @@
+'''
+Cached user roles (config/users/roles.py) and their invalidation.
+'''
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from config.parser.models import ChannelModerator, TelegramChannel
+from config.users import roles
+from config.users.models import PartnerProfile
+
+User = get_user_model()
+
+
+class RoleCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('partner', 'p@example.com', 'x')
+        cls.profile = PartnerProfile.objects.create(
+            user=cls.user, status='active'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def role(self):
+        # a fresh instance, as on every request
+        return roles.get_role(User.objects.get(pk=self.user.pk))
+
+    def test_role_is_cached(self):
+        self.assertEqual(self.role(), roles.PARTNER)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.get_role(user), roles.PARTNER)
+
+    def test_save_invalidates_after_commit(self):
+        self.assertEqual(self.role(), roles.PARTNER)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.profile.status = 'suspended'
+            self.profile.save()
+            # not committed yet: the cached role is still there
+            self.assertEqual(self.role(), roles.PARTNER)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.role(), roles.USER)
+
+    def test_queryset_update_invalidates(self):
+        self.assertEqual(self.role(), roles.PARTNER)
+        with self.captureOnCommitCallbacks(execute=True):
+            PartnerProfile.objects.filter(pk=self.profile.pk).update(
+                status='suspended'
+            )
+        self.assertEqual(self.role(), roles.USER)
+
+    def test_admin_deactivate_action(self):
+        self.assertEqual(self.role(), roles.PARTNER)
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'x')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('admin:users_partnerprofile_changelist'),
+                {
+                    'action': 'deactivate_selected',
+                    '_selected_action': [self.profile.pk],
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.role(), roles.USER)
+
+    def test_moderator_assignment(self):
+        self.profile.delete()
+        channel = TelegramChannel.objects.create(
+            channel_id=1001, username='channel', title='Channel'
+        )
+        self.assertEqual(self.role(), roles.USER)
+        with self.captureOnCommitCallbacks(execute=True):
+            ChannelModerator.objects.create(user=self.user, channel=channel)
+        self.assertEqual(self.role(), roles.CHANNEL_MODERATOR)
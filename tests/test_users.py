@@ -0,0 +1,64 @@
+'''
+Inertia props of the users pages: forms and models go out as plain
+JSON-ready dicts.
+'''
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from config.group_channels.models import Group
+from config.users.forms import UserLoginForm
+from config.users.views import form_props
+
+User = get_user_model()
+
+
+def inertia_props(response) -> dict:
+    return json.loads(response.context['page'])['props']
+
+
+class FormPropsTests(TestCase):
+
+    def test_bound_form_errors_and_hidden_password(self):
+        form = UserLoginForm(data={'username': 'nobody', 'password': 'x'})
+        self.assertFalse(form.is_valid())
+        props = form_props(form)
+        self.assertEqual(
+            props['values'], {'username': 'nobody', 'password': ''}
+        )
+        self.assertTrue(props['errors'])
+        json.dumps(props)
+
+    def test_unbound_form(self):
+        self.assertEqual(
+            form_props(UserLoginForm()),
+            {'values': {'username': None, 'password': ''}, 'errors': {}},
+        )
+
+
+class ProfilePageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'o@example.com', 'x')
+        Group.objects.create(name='Mine', owner=cls.user)
+
+    def test_profile_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('users:profile'))
+        self.assertEqual(response.status_code, 200)
+        props = inertia_props(response)
+        self.assertEqual(props['user']['username'], 'owner')
+        self.assertNotIn('password', props['user'])
+        self.assertEqual(props['groups'][0]['name'], 'Mine')
+        self.assertTrue(props['groups'][0]['image_url'])
+        self.assertEqual(props['create_form']['errors'], {})
+
+    def test_login_post_shows_errors(self):
+        response = self.client.post(
+            reverse('users:login'), {'username': 'owner', 'password': 'bad'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(inertia_props(response)['form']['errors'])